@@ -0,0 +1,109 @@
+'''
+Auction page extraction of `get_sold_players` over a multi decade synthetic archive served by the local stub, the
+per era branches with BeautifulSoup it used to run (the baseline) vs the `auction` schema registry parser at
+different concurrency levels. Both must produce the same frame.
+
+    python benchmarks/bench_auction.py --seasons 40 --latency 0.05 --workers 1 4 8
+'''
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from model.crawlers import auction, fetch
+from model.crawlers.ipl import get_current_teams, get_sold_players
+from stub import StubServer
+
+LEGACY_TEAMS = {
+    'kings-xi-punjab': 'punjab-kings',
+    'deccan-chargers': 'sunrisers-hyderabad',
+    'delhi-daredevils': 'delhi-capitals',
+    'rising-pune-supergiant': 'lucknow-super-giants',
+    'pune-warriors-india': 'lucknow-super-giants',
+    'royal-challengers-bangalore': 'royal-challengers-bengaluru',
+    'gujarat-lions': 'gujarat-titans',
+}
+
+def legacy_price(price):
+    return int(price[1:].replace(',', '')) if price.startswith('₹') else int(price.replace(',', ''))
+
+def legacy_sold_players(years):
+    # the per era branches of the old get_sold_players, kept as the baseline
+    current_teams = get_current_teams()
+    d = {'player': [], 'role': [], 'team': [], 'year': [], 'price': []}
+    for start_year in years:
+        r = fetch.get(auction.AUCTION_URL.format(start_year))
+        if r.status_code != 200:
+            continue
+        bs = BeautifulSoup(r.content, 'lxml')
+        for player_list in bs.select('.ih-pt-tab-bg :nth-child(1) tbody')[:-1]:
+            team = player_list.fetchPrevious(name='h2', limit=1)
+            if len(team) == 0:
+                continue
+            team_name = team[0].text.lower().strip().replace(' ', '-')
+            team_name = LEGACY_TEAMS.get(team_name, team_name)
+            if team_name not in current_teams:
+                continue
+            players_per_team = player_list.find_all('td')
+            start = 1 if players_per_team[0].text.strip().isdigit() else 0
+            if start_year < 2022:
+                for i in range(start, len(players_per_team), start+3):
+                    d['player'].append(players_per_team[i].text.strip())
+                    d['role'].append(players_per_team[i+1].text.strip())
+                    price = players_per_team[i+2].text.strip()
+                    if start_year == 2013:
+                        price = int(price.replace(',', '')) * 58
+                    elif start_year < 2019:
+                        price = int(price.replace(',', ''))
+                    else:
+                        price = legacy_price(price)
+                    d['team'].append(team_name)
+                    d['year'].append(start_year)
+                    d['price'].append(price)
+            elif start_year < 2025:
+                for i in range(start, len(players_per_team), start+4):
+                    d['player'].append(players_per_team[i].text.strip())
+                    d['role'].append(players_per_team[i+2].text.strip())
+                    d['team'].append(team_name)
+                    d['year'].append(start_year)
+                    d['price'].append(legacy_price(players_per_team[i+3].text.strip()))
+            else:
+                for i in range(start, len(players_per_team), start+5):
+                    d['player'].append(players_per_team[i].text.strip())
+                    d['role'].append('')
+                    d['team'].append(team_name)
+                    d['year'].append(start_year)
+                    d['price'].append(legacy_price(players_per_team[i+2].text.strip()))
+    df = pd.DataFrame(d)
+    df['player'] = df['player'].str.replace(r'\s+', ' ', regex=True).str.strip()
+    df['role'] = df['role'].str.replace(r'\s+', ' ', regex=True).str.strip()
+    return df
+
+def timed(label, fn, n_years):
+    start = time.perf_counter()
+    df = fn()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<16} {df.shape[0]:>7} sales {elapsed:8.2f} s {n_years / elapsed:8.1f} seasons/s')
+    return df
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seasons', type=int, default=40, help='auction seasons from 2013 on')
+    parser.add_argument('--latency', type=float, default=0.05, help='stub server response delay in seconds')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+    years = list(range(2013, 2013 + args.seasons))
+    with StubServer(args.latency) as server:
+        auction.AUCTION_URL = server.url + '/auction/{}'
+        expected = timed('legacy', lambda: legacy_sold_players(years), len(years))
+        for workers in args.workers:
+            df = timed(f'{workers} workers', lambda: get_sold_players(years, workers), len(years))
+            pd.testing.assert_frame_equal(expected, df)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+'''
+Crawl throughput of `crawl_players` against a local stub profile server at different concurrency levels
+
+    python benchmarks/bench_crawl.py --rows 600 --players 200 --latency 0.05 --workers 1 2 4 8 16 32
+'''
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from model.crawlers import cricbuzz
+from model.crawlers.cricbuzz import Player
+from model.crawlers.crawl import crawl_players
+from model.crawlers.ipl import extract_player_feature_vector
+from stub import StubServer
+
+def run(rows, players, workers, rate):
+    rng = random.Random(0)
+    names = [f'player {rng.randrange(players)}' for _ in range(rows)]
+    start = time.perf_counter()
+    cache = {}
+    for name, p in crawl_players(names, workers, rate, fetch=lambda n: Player(link=f'/profiles/{n.split()[-1]}/x')):
+        if p is not None and p.bat_stats is not None:
+            cache[name] = extract_player_feature_vector(p, 2025)
+    data = [cache[name] for name in names if name in cache]
+    elapsed = time.perf_counter() - start
+    return len(data), elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=600)
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help='stub server response delay in seconds')
+    parser.add_argument('--rate', type=float, default=None, help='requests per second per host, unlimited by default')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+    with StubServer(args.latency) as server:
+        cricbuzz.PROFILE_URL = server.url + '/profiles/{}'
+        print(f'{"workers":>8} {"rows":>6} {"seconds":>8} {"rows/s":>8}')
+        for workers in args.workers:
+            n, elapsed = run(args.rows, args.players, workers, args.rate)
+            print(f'{workers:>8} {n:>6} {elapsed:>8.2f} {n / elapsed:>8.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+'''
+Micro benchmarks of `features.preprocess` for a single serving row and the full training table
+
+    python benchmarks/bench_features.py --repeat 200
+'''
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from model.crawlers import features
+
+def legacy_preprocess(df: pd.DataFrame) -> pd.DataFrame:
+    # the per column implementation that features.preprocess replaced, kept as the baseline
+    processed_df = df.drop(['name'] + features.DROP_COLUMNS, axis=1)
+    processed_df = processed_df.replace('-', 0.0)
+    for col in processed_df.columns[3:15]:
+        processed_df[col] = pd.to_numeric(processed_df[col], errors='coerce')
+    processed_df['total_runs'] = processed_df['t20_runs'] + processed_df['ipl_runs']
+    processed_df['total_6s'] = processed_df['t20_6s'] + processed_df['ipl_6s']
+    processed_df['total_sr'] = processed_df['t20_sr'] / 2 + processed_df['ipl_sr'] / 2
+    processed_df['total_wkts'] = processed_df['t20_wkts'] + processed_df['ipl_wkts']
+    processed_df['total_bowl_econ'] = processed_df['t20_bowl_econ'] / 2 + processed_df['ipl_bowl_econ'] / 2
+    processed_df['total_bowl_sr'] = processed_df['t20_bowl_sr'] / 2 + processed_df['ipl_bowl_sr'] / 2
+    return processed_df.drop(features.STAT_COLUMNS, axis=1)
+
+def bench(label, fn, repeat):
+    times = timeit.repeat(fn, number=1, repeat=repeat)
+    print(f'{label:<28} median {np.median(times) * 1e3:8.3f} ms   min {np.min(times) * 1e3:8.3f} ms')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=os.path.join(ROOT, 'data', 'data.csv'))
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    table = pd.read_csv(args.data, dtype={c: object for c in features.STAT_COLUMNS})
+    row = table.drop(features.AUCTION_COLUMNS, axis=1).head(1).assign(year=2025)
+
+    # both implementations must agree up to float32 rounding
+    expected, got = legacy_preprocess(table), features.preprocess(table)
+    assert list(expected.columns) == list(got.columns)
+    np.testing.assert_allclose(expected[list(features.MERGED_COLUMNS)].to_numpy(float), got[list(features.MERGED_COLUMNS)].to_numpy(float), rtol=1e-6)
+
+    print(f'single row (serving), {args.repeat} runs')
+    bench('legacy preprocess', lambda: legacy_preprocess(row), args.repeat)
+    bench('features.preprocess', lambda: features.preprocess(row), args.repeat)
+    print(f'full table (training) {table.shape[0]} rows, {args.repeat} runs')
+    bench('legacy preprocess', lambda: legacy_preprocess(table), args.repeat)
+    bench('features.preprocess', lambda: features.preprocess(table), args.repeat)
+
+if __name__ == '__main__':
+    main()
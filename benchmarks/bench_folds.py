@@ -0,0 +1,79 @@
+'''
+The k sweeps of rfe.py and feature_selection.py as one cross_val_score of a Pipeline per k (the baseline) vs
+`folds.FoldEngine`, which scales, encodes and scores the features of every fold once. The scores must be equal.
+
+    python benchmarks/bench_folds.py --repeats 3
+'''
+import argparse
+import functools
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.feature_selection import RFE, SelectKBest, mutual_info_regression
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import RepeatedKFold, RepeatedStratifiedKFold, cross_val_score
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeClassifier
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from model.crawlers.features import build_preprocessor, preprocess
+from model.crawlers.folds import FoldEngine, rfe_ranking
+from model.crawlers.utils import load_data
+
+def baseline(make_pipeline, X, y, cv, ks, scoring):
+    return {k: cross_val_score(make_pipeline(k), X, y, scoring=scoring, cv=cv, n_jobs=-1) for k in ks}
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f'{label:<24} {time.perf_counter() - start:8.2f} s')
+    return result
+
+def check(expected, actual):
+    assert list(expected) == list(actual)
+    for k in expected:
+        assert np.array_equal(expected[k], actual[k]), (k, expected[k], actual[k])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=os.path.join(ROOT, 'data', 'data.csv'))
+    parser.add_argument('--repeats', type=int, default=3, help='repeats of the 10 fold cross validation')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+    df = preprocess(load_data(args.data)).dropna()
+    X = df.drop(['team', 'price'], axis=1)
+    n_features = build_preprocessor().fit_transform(X).shape[1]
+
+    # rfe.py, team classifier with RFE
+    cv = RepeatedStratifiedKFold(n_splits=10, n_repeats=args.repeats, random_state=1)
+    tree = DecisionTreeClassifier(class_weight='balanced', random_state=1)
+    ks = range(5, n_features + 1)
+    make = lambda k: Pipeline([('pre', build_preprocessor()), ('s', RFE(tree, n_features_to_select=k)), ('m', tree)])
+    expected = timed('rfe cross_val_score', lambda: baseline(make, X, df.team, cv, ks, 'accuracy'))
+    def engine_rfe():
+        with FoldEngine(X, df.team, cv, build_preprocessor(), args.workers) as engine:
+            engine.feature_scores('rfe', functools.partial(rfe_ranking, estimator=tree))
+            return engine.select_k(tree, 'rfe', ks, 'accuracy')
+    check(expected, timed('rfe FoldEngine', engine_rfe))
+
+    # feature_selection.py, price regressor with mutual information, both metrics of the sweep
+    cv = RepeatedKFold(n_splits=10, n_repeats=args.repeats, random_state=1)
+    mutual_info = functools.partial(mutual_info_regression, random_state=1)
+    ks = range(1, n_features + 1)
+    make = lambda k: Pipeline([('pre', build_preprocessor()), ('sel', SelectKBest(mutual_info, k=k)), ('lr', LinearRegression())])
+    metrics = ['neg_mean_squared_error', 'neg_mean_absolute_error']
+    expected = timed('mi cross_val_score', lambda: {m: baseline(make, X, df.price, cv, ks, m) for m in metrics})
+    def engine_mi():
+        with FoldEngine(X, df.price, cv, build_preprocessor(), args.workers) as engine:
+            engine.feature_scores('mutual_info', mutual_info)
+            return engine.select_k(LinearRegression(), 'mutual_info', ks, metrics)
+    actual = timed('mi FoldEngine', engine_mi)
+    for m in metrics:
+        check(expected[m], actual[m])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+'''
+Parse time of cricbuzz profile pages, the BeautifulSoup selector cascade vs the lxml fast path of `cricbuzz.Player`
+
+The corpus is every profile page saved in a page cache (--page-cache), every *.html file of a directory (--pages)
+and synthetic pages of all stats table layouts of benchmarks/stub.py (--synthetic), including layouts whose
+selectors match outside the stats tables. Both parsers have to produce the same info, stats and year of birth for
+every page before anything is timed. --chrome pads the synthetic pages with navigation and footer elements, real
+profile pages are mostly page chrome around the stats tables.
+
+    python benchmarks/bench_parse.py --synthetic 300
+    python benchmarks/bench_parse.py --synthetic 100 --chrome 2000
+    python benchmarks/bench_parse.py --page-cache model/page_cache --pages saved_profiles/
+'''
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from model.crawlers.cricbuzz import Player, parse_page
+from model.crawlers.page_cache import PageCache
+from stub import FORMATS, LAYOUTS, profile_page
+
+# selector cascade of the BeautifulSoup implementation, kept as the baseline
+SOUP_INFO = '.cb-font-40 , .cb-col-60:nth-child(7) , .cb-lst-itm-sm:nth-child(13) , .cb-lst-itm-sm:nth-child(9) , .cb-lst-itm-sm:nth-child(11) , .cb-lst-itm-sm:nth-child(3) , .cb-font-18'
+SOUP_STATS = [
+    '.cb-plyr-th , tr~ tr+ tr .text-right , tr~ tr+ tr b',
+    '.cb-font-12 .text-right , tr+ tr .text-right , tr+ tr .cb-col-8',
+    '.cb-plyr-thead .text-right , .cb-col-8',
+]
+
+class SoupPlayer(Player):
+    def _select_info(self):
+        return [i.get_text().lower().strip() for i in self._doc.select(SOUP_INFO)]
+
+    def _select_stats(self):
+        for pattern in SOUP_STATS:
+            stats = [i.get_text().lower().strip() for i in self._doc.select(pattern)]
+            if len(stats) >= 79:
+                break
+        return stats
+
+def parse(cls, doc):
+    p = cls()
+    p._doc = doc
+    p.info = p.get_info()
+    p.bat_stats, p.bowl_stats = p.get_stats()
+    return p
+
+def parse_lxml(content):
+    return parse(Player, parse_page(content))
+
+def parse_soup(content):
+    return parse(SoupPlayer, BeautifulSoup(content, 'lxml'))
+
+def outcome(fn, content):
+    # pages that the cascade can not make sense of raise, both parsers have to fail alike
+    try:
+        return fn(content)
+    except Exception as e:
+        return type(e).__name__
+
+def same(a, b):
+    if isinstance(a, str) or isinstance(b, str):
+        return a == b
+    frames = [(a.bat_stats, b.bat_stats), (a.bowl_stats, b.bowl_stats)]
+    if any((x is None) != (y is None) or (x is not None and not x.equals(y)) for x, y in frames):
+        return False
+    return (a.info, a.yob, a.name, a.country) == (b.info, b.yob, b.name, b.country)
+
+def corpus(args):
+    pages = []
+    if args.page_cache:
+        cache = PageCache(args.page_cache)
+        pages += [cache.lookup(key).content for key in cache.keys('%cricbuzz.com/profiles/%')]
+    if args.pages:
+        for path in sorted(glob.glob(os.path.join(args.pages, '*.html'))):
+            with open(path, 'rb') as f:
+                pages.append(f.read())
+    rng = random.Random(0)
+    synthetic = []
+    for n in range(args.synthetic):
+        # every layout, players without an ipl / t20i record and non ascii names
+        formats = rng.choice([FORMATS, FORMATS[:3], ('Test', 'ODI', 'IPL')])
+        synthetic.append(profile_page(f'{"josé " if n % 7 == 0 else ""}{n}', layout=LAYOUTS[n % len(LAYOUTS)], formats=formats))
+    synthetic += edge_pages(args.synthetic // 10)
+    return pages + [with_chrome(page, args.chrome) for page in synthetic]
+
+def with_chrome(page, n):
+    # navigation before and a footer after the profile, n items each
+    if not n:
+        return page
+    items = ''.join(f'<div class="cb-nav-item"><a href="/nav/{i}"><span>item {i}</span></a></div>' for i in range(n)).encode()
+    return page.replace(b'<body>', b'<body><nav>' + items + b'</nav>', 1).replace(b'</body>', b'<footer>' + items + b'</footer></body>', 1)
+
+def edge_pages(n):
+    # layouts whose selectors reach outside the stats tables: the .cb-font-12 ancestor class on a wrapper above
+    # both tables and .cb-col-8 div grid cells next to them
+    pages = []
+    for i in range(n):
+        page = profile_page(f'edge {i}', layout='font-12').replace(b'<thead class="cb-font-12">', b'<thead class="">')
+        pages.append(page.replace(b'<div class="cb-col cb-col-67 cb-prfl-stats">', b'<div class="cb-font-12"><div class="cb-col cb-col-67 cb-prfl-stats">')
+                     .replace(b'</body>', b'</div></body>'))
+        grid = ''.join(f'<div class="cb-col cb-col-8">{c}</div>' for c in ('Format', 'M', 'Runs')).encode()
+        pages.append(profile_page(f'grid {i}', layout='col-8').replace(b'<div class="cb-font-16 text-bold">Batting', grid + b'<div class="cb-font-16 text-bold">Batting'))
+    return pages
+
+def bench(label, fn, pages, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in pages:
+            fn(content)
+        times.append((time.perf_counter() - start) / len(pages))
+    print(f'{label:<24} {np.median(times) * 1e3:8.3f} ms / page   {1 / np.median(times):8.1f} pages/s')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--page-cache', help='page cache directory of a crawl')
+    parser.add_argument('--pages', help='directory of saved profile pages')
+    parser.add_argument('--synthetic', type=int, default=300, help='synthetic pages across all table layouts')
+    parser.add_argument('--chrome', type=int, default=0, help='navigation / footer items around every synthetic page')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    pages = corpus(args)
+    if not pages:
+        sys.exit('empty corpus')
+    outcomes = [(outcome(parse_soup, content), outcome(parse_lxml, content)) for content in pages]
+    mismatched = [n for n, (a, b) in enumerate(outcomes) if not same(a, b)]
+    assert not mismatched, f'{len(mismatched)} pages parse differently, first: {mismatched[:10]}'
+    failed = sum(isinstance(a, str) for a, _ in outcomes)
+    print(f'{len(pages)} pages ({failed} unparseable), both parsers agree on all of them')
+    pages = [content for content, (a, _) in zip(pages, outcomes) if not isinstance(a, str)]
+    bench('BeautifulSoup cascade', parse_soup, pages, args.repeat)
+    bench('lxml fast path', parse_lxml, pages, args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+'''
+Time and peak memory of every pipeline stage on synthetic data at growing scales: generate, load, preprocess,
+aggregate (the dashboard cube), train (price regressor and team classifier on a fixed budget) and batch predict.
+Results are written as JSON next to the commit they were measured on, so runs of two commits can be compared.
+
+    python benchmarks/bench_pipeline.py --scales 1 10 100
+    python benchmarks/bench_pipeline.py --scales 1 100 --compare benchmarks/results/pipeline-1766754.json
+    python benchmarks/bench_pipeline.py --compare OLD.json NEW.json --threshold 1.2
+
+Times are the median of --repeat runs, the peak is the tracemalloc peak (Python objects and numpy / pandas
+buffers, not pyarrow's own allocator) of one more run. The train stage fits the autosklearn pipelines with a
+--train-budget seconds search when autosklearn is installed and the random forest stand-ins of bench_predict
+otherwise, on at most --train-rows rows so that it stays a fixed budget at every scale. With IPL_TRACE set every
+stage is also a `bench.<stage>` span of the trace export.
+'''
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [ROOT, BENCH]
+
+from model.crawlers import aggregates, features, storage, trace
+from model.crawlers.predictor import Predictor
+import synthetic
+
+RESULTS_DIR = os.path.join(BENCH, 'results')
+
+def git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    import sklearn
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'versions': {'numpy': np.__version__, 'pandas': pd.__version__, 'sklearn': sklearn.__version__},
+    }
+
+def train_models(df, budget, seed):
+    X = df.drop(['name', 'team', 'price'], axis=1, errors='ignore')
+    try:
+        from autosklearn.classification import AutoSklearnClassifier
+        from autosklearn.regression import AutoSklearnRegressor
+    except ImportError:
+        from bench_predict import stand_in_models
+        return stand_in_models(df.drop(['name'], axis=1, errors='ignore'))
+    from sklearn.pipeline import Pipeline
+    per_run = max(budget // 4, 5)
+    reg = Pipeline([('feat_pre', features.build_preprocessor()), ('automl', AutoSklearnRegressor(
+        time_left_for_this_task=budget, per_run_time_limit=per_run, n_jobs=1, seed=seed))])
+    clf = Pipeline([('feat_pre', features.build_preprocessor()), ('auto_clf', AutoSklearnClassifier(
+        time_left_for_this_task=budget, per_run_time_limit=per_run, n_jobs=1, seed=seed))])
+    return reg.fit(X, df['price']), clf.fit(X, df['team'])
+
+def measure(stage, fn, repeat, memory, rows):
+    '''
+    (result, {'seconds', 'peak_bytes'}) of `fn`, timed `repeat` times and traced once more for its peak
+    '''
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with trace.span(f'bench.{stage}', rows=rows):
+            result = fn()
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, {'seconds': float(np.median(times)), 'peak_bytes': peak}
+
+def run_scale(scale, args, work_dir):
+    out_dir = os.path.join(work_dir, f'scale-{scale:g}')
+    data_csv = os.path.join(out_dir, 'data.csv')
+    rows = int(round(args.source_rows * scale))
+    results = []
+
+    def add(stage, fn, n=rows, repeat=args.repeat):
+        result, stats = measure(stage, fn, repeat, args.memory, n)
+        stats.update(scale=scale, stage=stage, rows=n, rows_per_second=n / stats['seconds'] if stats['seconds'] else None)
+        results.append(stats)
+        peak = '' if stats['peak_bytes'] is None else f'   peak {stats["peak_bytes"] / 2**20:9.1f} MiB'
+        print(f'{scale:>8g}x {stage:<11} {n:>10} rows {stats["seconds"]:>10.3f} s{peak}', flush=True)
+        return result
+
+    # generated once, the files are the input of every other stage
+    add('generate', lambda: synthetic.write_synthetic(out_dir, scale, args.seed, args.chunk_rows), repeat=1)
+    raw = add('load', lambda: storage.load(data_csv))
+    processed = add('preprocess', lambda: features.preprocess(raw, keep_name=True))
+    add('aggregate', lambda: aggregates.build_cube(processed))
+    sample = processed.dropna()
+    if len(sample) > args.train_rows:
+        sample = sample.sample(args.train_rows, random_state=args.seed)
+    reg, clf = add('train', lambda: train_models(sample, args.train_budget, args.seed), n=len(sample), repeat=1)
+    predictor = Predictor(reg, clf)
+    X = processed.drop(['name', 'team', 'price'], axis=1).dropna()
+    add('predict', lambda: predictor.predict_batch(X), n=len(X))
+    for r in results:
+        r['format'] = os.path.splitext(storage.source(data_csv))[1].lstrip('.')
+    shutil.rmtree(out_dir, ignore_errors=True)
+    return results
+
+def compare(base, new, threshold, min_seconds=0.05):
+    '''
+    Prints the time and peak ratios of `new` against `base` per (scale, stage), returns the regressions
+    '''
+    old = {(r['scale'], r['stage']): r for r in base['results']}
+    print(f'base {base["environment"]["commit"]} vs {new["environment"]["commit"]}')
+    print(f'{"scale":>9} {"stage":<11} {"base s":>10} {"new s":>10} {"time":>7} {"peak":>7}')
+    regressions = []
+    for r in new['results']:
+        b = old.get((r['scale'], r['stage']))
+        if b is None:
+            continue
+        time_ratio = r['seconds'] / b['seconds'] if b['seconds'] else float('nan')
+        peak_ratio = r['peak_bytes'] / b['peak_bytes'] if r['peak_bytes'] and b['peak_bytes'] else float('nan')
+        # training is bounded by its budget, only its memory is comparable
+        # and stages of a few milliseconds are timer noise
+        slower = r['stage'] != 'train' and time_ratio > threshold and r['seconds'] >= min_seconds
+        flag = '  REGRESSION' if slower or peak_ratio > threshold else ''
+        if flag:
+            regressions.append((r['scale'], r['stage']))
+        print(f'{r["scale"]:>8g}x {r["stage"]:<11} {b["seconds"]:>10.3f} {r["seconds"]:>10.3f} '
+              f'{time_ratio:>6.2f}x {peak_ratio:>6.2f}x{flag}')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', nargs='+', type=float, default=[1, 10, 100], help='multiples of the real row counts')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='skip the tracemalloc runs')
+    parser.add_argument('--train-budget', type=int, default=60, help='autosklearn search seconds per model')
+    parser.add_argument('--train-rows', type=int, default=20000)
+    parser.add_argument('--chunk-rows', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help=f'results file, {RESULTS_DIR}/pipeline-<commit>.json by default')
+    parser.add_argument('--compare', nargs='+', metavar='JSON', help='BASE to compare this run against, or BASE NEW')
+    parser.add_argument('--threshold', type=float, default=1.2, help='time / peak ratio reported as a regression')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='faster stages are never time regressions')
+    args = parser.parse_args()
+    args.source_rows = len(pd.read_csv(synthetic.DATA))
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as f, open(args.compare[1]) as g:
+            sys.exit(1 if compare(json.load(f), json.load(g), args.threshold, args.min_seconds) else 0)
+
+    run = {'environment': environment(), 'config': {k: v for k, v in vars(args).items() if k not in ('out', 'compare', 'threshold', 'min_seconds')}}
+    work_dir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    try:
+        run['results'] = [r for scale in args.scales for r in run_scale(scale, args, work_dir)]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    out = args.out or os.path.join(RESULTS_DIR, f'pipeline-{(run["environment"]["commit"] or "unknown")[:7]}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f'Results written to {out}')
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            sys.exit(1 if compare(json.load(f), run, args.threshold, args.min_seconds) else 0)
+
+if __name__ == '__main__':
+    main()
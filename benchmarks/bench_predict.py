@@ -0,0 +1,82 @@
+'''
+Single player prediction latency (p50 / p99) of the DataFrame pipeline path vs `predictor.Predictor`
+
+    python benchmarks/bench_predict.py --runs 2000
+    python benchmarks/bench_predict.py --models model/auto_reg_v1.joblib model/auto_clf_v1.joblib
+
+Without --models, stand-in pipelines with the same ColumnTransformer and small random forests are fitted on
+data.csv, so the numbers isolate the transform overhead from the cost of the autosklearn ensembles
+'''
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from model.crawlers import features
+from model.crawlers.predictor import Predictor
+
+def stand_in_models(df):
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+    from sklearn.pipeline import Pipeline
+    X = df.drop(['team', 'price'], axis=1)
+    reg = Pipeline([('feat_pre', features.build_preprocessor()), ('automl', RandomForestRegressor(n_estimators=20, random_state=0))])
+    clf = Pipeline([('feat_pre', features.build_preprocessor()), ('auto_clf', RandomForestClassifier(n_estimators=20, random_state=0))])
+    return reg.fit(X, df['price']), clf.fit(X.sample(frac=1, random_state=1), df['team'].sample(frac=1, random_state=1))
+
+def percentiles(fn, records, runs):
+    times = []
+    for i in range(runs):
+        record = records[i % len(records)]
+        start = time.perf_counter()
+        fn(record)
+        times.append(time.perf_counter() - start)
+    return np.percentile(times, 50) * 1e3, np.percentile(times, 99) * 1e3
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=os.path.join(ROOT, 'data', 'data.csv'))
+    parser.add_argument('--models', nargs=2, metavar=('REG', 'CLF'))
+    parser.add_argument('--runs', type=int, default=2000)
+    args = parser.parse_args()
+    raw = pd.read_csv(args.data)
+    if args.models:
+        import joblib
+        reg, clf = joblib.load(args.models[0]), joblib.load(args.models[1])
+    else:
+        reg, clf = stand_in_models(features.preprocess(raw))
+    predictor = Predictor(reg, clf)
+    columns = features.PLAYER_COLUMNS + ['year']
+    records = raw[columns].head(200).to_dict('records')
+
+    def pipeline_path(record):
+        X = features.preprocess(pd.DataFrame([record], columns=columns))
+        return reg.predict(X)[0], clf.predict(X)[0]
+
+    for record in records[:50]:
+        price, team = pipeline_path(record)
+        fast_price, fast_team = predictor.predict(record)
+        assert team == fast_team and np.isclose(price, fast_price), (record, price, fast_price, team, fast_team)
+    # profiles without a birth date have no age, the record and batch paths have to agree on them too
+    for record in records[:20]:
+        record = {**record, 'age': None}
+        row = features.featurize_record(record)
+        assert np.array_equal(predictor._reg_pre.transform_record(row), predictor._reg_pre.transform(pd.DataFrame([row])), equal_nan=True)
+        price, team = pipeline_path(record)
+        fast_price, fast_team = predictor.predict(record)
+        batch_prices, batch_teams = predictor.predict_batch(pd.DataFrame([row]))
+        assert team == fast_team == batch_teams[0] and np.isclose(price, fast_price) and np.isclose(price, batch_prices[0]), record
+
+    print(f'shared transform: {predictor.shared}, {args.runs} runs')
+    print(f'{"path":<24} {"p50 ms":>8} {"p99 ms":>8}')
+    for label, fn in (('DataFrame pipeline', pipeline_path), ('Predictor.predict', predictor.predict)):
+        p50, p99 = percentiles(fn, records, args.runs)
+        print(f'{label:<24} {p50:>8.3f} {p99:>8.3f}')
+
+if __name__ == '__main__':
+    main()
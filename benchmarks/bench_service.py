@@ -0,0 +1,99 @@
+'''
+Throughput of the async prediction service against the local stub profile server: one request at a time the way
+main.py predicts (the baseline) vs `serving.PredictionService` with concurrent clients, without and with micro
+batching, and with the prediction cache (players are requested repeatedly). Predictions must match the baseline. --http also runs the requests through the FastAPI app of service.py.
+
+    python benchmarks/bench_service.py --requests 400 --clients 32 --latency 0.05
+'''
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from model.crawlers import cricbuzz, features, prediction_cache, serving, utils
+from model.crawlers.predictor import Predictor
+from bench_predict import stand_in_models
+from stub import StubServer
+
+def baseline(model, urls, year):
+    results = []
+    for url in urls:
+        record, _ = utils.get_player_record(url, year)
+        results.append(model.predict(record))
+    return results
+
+async def concurrent(model, urls, year, clients, max_batch, cache=None):
+    service = serving.PredictionService(model, workers=clients, max_batch=max_batch, cache=cache, model_version='bench')
+    await service.start()
+    semaphore = asyncio.Semaphore(clients)
+
+    async def one(url):
+        async with semaphore:
+            return await service.predict_url(url, year)
+
+    try:
+        results = await asyncio.gather(*[one(url) for url in urls])
+    finally:
+        await service.stop()
+    return [(r['price'], r['team']) for r in results], service.stats()
+
+def timed(label, fn, n):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<28} {elapsed:8.2f} s {n / elapsed:8.1f} req/s')
+    return result
+
+def check(expected, actual):
+    assert [team for _, team in expected] == [team for _, team in actual]
+    assert np.allclose([price for price, _ in expected], [price for price, _ in actual])
+
+def http_check(model, urls, year):
+    from fastapi.testclient import TestClient
+    import service
+    with TestClient(service.create_app(serving.PredictionService(model))) as client:
+        r = client.post('/predict/url', json={'url': urls[0], 'year': year})
+        assert r.status_code == 200, r.text
+        record = r.json()['features']
+        assert client.post('/predict/record', json={'record': record}).json()['team'] == r.json()['team']
+        assert client.post('/predict/record', json={'record': {'age': 30}}).status_code == 422
+        assert client.post('/predict/url', json={'url': 'https://www.cricbuzz.com/profiles/'}).status_code == 404
+        print(f'http ok, metrics {client.get("/metrics").json()["requests"]} requests')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=os.path.join(ROOT, 'data', 'data.csv'))
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=32, help='concurrent requests')
+    parser.add_argument('--latency', type=float, default=0.05, help='stub server response delay in seconds')
+    parser.add_argument('--year', type=int, default=2026)
+    parser.add_argument('--http', action='store_true', help='check the endpoints of the FastAPI app as well')
+    args = parser.parse_args()
+    model = Predictor(*stand_in_models(features.preprocess(pd.read_csv(args.data)).dropna()))
+    urls = [f'https://www.cricbuzz.com/profiles/{i % args.players}/player-{i % args.players}' for i in range(args.requests)]
+    with StubServer(args.latency) as server:
+        cricbuzz.PROFILE_URL = server.url + '/profiles/{}'
+        n = min(args.requests, 100)
+        expected = timed(f'sequential ({n} requests)', lambda: baseline(model, urls[:n], args.year), n)
+        for max_batch, cache in ((1, None), (32, None), (32, prediction_cache.PredictionCache())):
+            actual, metrics = timed(
+                f'{args.clients} clients, batch {max_batch}{", cache" if cache is not None else ""}',
+                lambda: asyncio.run(concurrent(model, urls, args.year, args.clients, max_batch, cache)), len(urls),
+            )
+            check(expected, actual[:n])
+            print(f'{"":<28} {metrics["batches"]} predict calls, mean batch {metrics["mean_batch_size"]:.1f}')
+            if cache is not None:
+                print(f'{"":<28} cache {metrics["cache"]}')
+        if args.http:
+            http_check(model, urls, args.year)
+
+if __name__ == '__main__':
+    main()
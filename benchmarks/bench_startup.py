@@ -0,0 +1,108 @@
+'''
+Cold start of the Streamlit app per MODEL_LOAD mode (eager, background, lazy): time to the first rendered
+dashboard and to the first prediction after it (a visitor pastes a link `--think` seconds after the page has
+rendered), every run in a fresh interpreter so that nothing is imported yet.
+Also prints the import time profile of the modules main.py imports up front, before and after deferring the
+crawl and model stacks.
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --model-dir model --modes eager background
+
+Without --model-dir, stand-in pipelines (random forests on data.csv) are exported into a temporary directory, with
+the autosklearn ensembles the eager mode additionally pays for the autosklearn / smac imports.
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BENCH = os.path.dirname(os.path.abspath(__file__))
+
+# runs main.py through AppTest in a fresh process, the start is taken before any import
+RUN = '''
+import time
+start = time.perf_counter()
+import json, sys
+sys.path[:0] = [{root!r}, {bench!r}]
+from streamlit.testing.v1 import AppTest
+from stub import StubServer
+from model.crawlers import cricbuzz
+with StubServer(0.0) as server:
+    cricbuzz.PROFILE_URL = server.url + '/profiles/{{}}'
+    at = AppTest.from_file('main.py', default_timeout=300).run()
+    render = time.perf_counter() - start
+    assert not at.exception, at.exception
+    time.sleep({think})
+    start = time.perf_counter()
+    at.text_input[0].input('https://www.cricbuzz.com/profiles/7/player-7').run()
+    predict = time.perf_counter() - start
+    assert at.success, [e.value for e in at.error] + list(at.exception)
+print(json.dumps({{'render': render, 'predict': predict}}))
+'''
+
+EAGER_IMPORTS = 'import streamlit, pandas, altair; from babel.numbers import format_currency; ' \
+    'from model.crawlers import utils, features, predictor, artifacts, aggregates, storage, prediction_cache'
+DEFERRED_IMPORTS = 'import streamlit, pandas, altair; ' \
+    'from model.crawlers import features, aggregates, storage, prediction_cache'
+
+def stand_in_dir(data):
+    import pandas as pd
+    sys.path[:0] = [ROOT, BENCH]
+    from bench_predict import stand_in_models
+    from model.crawlers import artifacts, features
+    model_dir = tempfile.mkdtemp(prefix='bench_startup_')
+    reg, clf = stand_in_models(features.preprocess(pd.read_csv(data)).dropna())
+    artifacts.export_artifact(reg, os.path.join(model_dir, 'auto_reg_v1.joblib'))
+    artifacts.export_artifact(clf, os.path.join(model_dir, 'auto_clf_v1.joblib'))
+    return model_dir
+
+def run(mode, model_dir, think):
+    env = dict(os.environ, MODEL_LOAD=mode, MODEL_DIR=model_dir)
+    out = subprocess.run([sys.executable, '-c', RUN.format(root=ROOT, bench=BENCH, think=think)], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def import_profile(statement, top, repeat=3):
+    # fastest of `repeat` fresh interpreters per module
+    modules = {}
+    for _ in range(repeat):
+        err = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stderr
+        for line in err.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            # top level imports only, nested ones are part of their importer's cumulative time
+            if not name.startswith('  '):
+                modules[name.strip()] = min(int(cumulative) / 1e6, modules.get(name.strip(), float('inf')))
+    total = sum(modules.values())
+    print(f'  total {total:.3f} s, ' + ', '.join(f'{m} {t:.3f}' for m, t in sorted(modules.items(), key=lambda i: -i[1])[:top]))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=os.path.join(ROOT, 'data', 'data.csv'))
+    parser.add_argument('--model-dir', help='directory of the artifacts, stand-in models by default')
+    parser.add_argument('--modes', nargs='+', default=['eager', 'background', 'lazy'])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--think', type=float, default=2.0, help='seconds between the first render and the prediction')
+    parser.add_argument('--top', type=int, default=8)
+    args = parser.parse_args()
+    print('import profile, all main.py imports up front')
+    import_profile(EAGER_IMPORTS, args.top)
+    print('import profile, dashboard imports only')
+    import_profile(DEFERRED_IMPORTS, args.top)
+    model_dir = os.path.abspath(args.model_dir) if args.model_dir else stand_in_dir(args.data)
+    print(f'{"mode":<12} {"first render":>14} {"first prediction":>18}   (median of {args.runs} cold starts)')
+    for mode in args.modes:
+        runs = [run(mode, model_dir, args.think) for _ in range(args.runs)]
+        render = np.median([r['render'] for r in runs])
+        predict = np.median([r['predict'] for r in runs])
+        print(f'{mode:<12} {render:>12.3f} s {predict:>16.3f} s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+'''
+Memory and throughput of the per player stat containers, the 2 row DataFrames `Player.get_stats` used to build
+vs `cricbuzz.StatTable`, for building the tables and reading a feature vector out of them
+
+    python benchmarks/bench_stats.py --players 5000
+'''
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from model.crawlers.cricbuzz import StatTable
+from stub import BAT_COLS, BOWL_COLS
+
+BAT_FEATURES = ['no', 'runs', 'avg', 'sr', '50', '4s', '6s']
+BOWL_FEATURES = ['wkts', 'econ', 'avg', 'sr']
+
+def legacy_frame(columns, t20i, ipl):
+    # the dict of columns DataFrame of the old get_stats, kept as the baseline
+    d = {}
+    for i in range(len(columns)):
+        for row in (t20i, ipl):
+            d.setdefault(columns[i], []).append(row[i])
+    return pd.DataFrame(d, index=['t20i', 'ipl'])
+
+def legacy_vector(bat, bowl):
+    features = []
+    for fmt in ('t20i', 'ipl'):
+        features += list(bat.loc[fmt][BAT_FEATURES])
+    for fmt in ('t20i', 'ipl'):
+        features += list(bowl.loc[fmt][BOWL_FEATURES])
+    return features
+
+def table_vector(bat, bowl):
+    features = []
+    for fmt in ('t20i', 'ipl'):
+        features += bat.values(fmt, BAT_FEATURES)
+    for fmt in ('t20i', 'ipl'):
+        features += bowl.values(fmt, BOWL_FEATURES)
+    return features
+
+def raw_players(n):
+    rng = random.Random(0)
+    cell = lambda: rng.choice(['-', str(rng.randint(0, 9000)), f'{rng.uniform(0, 200):.2f}'])
+    bat_cols, bowl_cols = [c.lower() for c in BAT_COLS], [c.lower() for c in BOWL_COLS]
+    return [
+        ((bat_cols, [cell() for _ in bat_cols], [cell() for _ in bat_cols]),
+         (bowl_cols, [cell() for _ in bowl_cols], [cell() for _ in bowl_cols]))
+        for _ in range(n)
+    ]
+
+def build(make, raw):
+    # stats are stored as str copies, like the text cells of a parsed page
+    return [(make(*[list(map(str, r)) for r in bat]), make(*[list(map(str, r)) for r in bowl])) for bat, bowl in raw]
+
+def measure(label, make, vector, raw):
+    tracemalloc.start()
+    start = time.perf_counter()
+    tables = build(make, raw)
+    build_s = time.perf_counter() - start
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    vectors = [vector(bat, bowl) for bat, bowl in tables]
+    vector_s = time.perf_counter() - start
+    n = len(raw)
+    print(f'{label:<12} build {n / build_s:10.0f} players/s   vector {n / vector_s:10.0f} players/s   '
+          f'retained {retained / n:8.0f} B/player')
+    return vectors
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=5000)
+    args = parser.parse_args()
+    raw = raw_players(args.players)
+    expected = measure('DataFrame', legacy_frame, legacy_vector, raw)
+    actual = measure('StatTable', StatTable, table_vector, raw)
+    assert expected == actual
+    # the compatibility view is the DataFrame the old code built
+    for bat, bowl in raw[:100]:
+        assert StatTable(*bat).to_frame().equals(legacy_frame(*bat))
+        assert StatTable(*bowl).to_frame().equals(legacy_frame(*bowl))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+'''
+Load time and memory of data.csv vs its typed Parquet copy (`crawlers.storage`), full reads, projected reads
+and the preprocessed frame that training and the dashboard build from them
+
+    python benchmarks/bench_storage.py --repeat 20
+'''
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from model.crawlers import aggregates, features, storage
+
+def peak_bytes(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def bench(label, fn, repeat):
+    times = timeit.repeat(fn, number=1, repeat=repeat)
+    df = fn()
+    print(f'{label:<36} median {np.median(times) * 1e3:8.2f} ms   peak {peak_bytes(fn) / 2**20:7.2f} MiB   '
+          f'frame {df.memory_usage(deep=True).sum() / 2**20:7.2f} MiB')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=os.path.join(ROOT, 'data', 'data.csv'))
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    if not storage.available():
+        sys.exit('pyarrow is required for the parquet side of this benchmark')
+    tmp = tempfile.mkdtemp()
+    try:
+        csv_path = os.path.join(tmp, 'data.csv')
+        shutil.copy(args.data, csv_path)
+        pq_path = storage.parquet_path(csv_path)
+        storage.write_parquet(pd.read_csv(csv_path), pq_path)
+        csv_size = os.path.getsize(csv_path)
+        pq_size = os.path.getsize(pq_path)
+        print(f'csv {csv_size / 1024:.1f} KiB, parquet {pq_size / 1024:.1f} KiB on disk')
+
+        # the typed copy has to give the same model inputs as the csv
+        expected = features.preprocess(pd.read_csv(csv_path))
+        actual = features.preprocess(storage.read_parquet(pq_path))
+        assert list(expected.columns) == list(actual.columns)
+        for col in expected.columns:
+            if expected[col].dtype == object:
+                assert (expected[col].astype(str).values == actual[col].astype(str).values).all(), col
+            else:
+                assert np.allclose(expected[col].astype(float), actual[col].astype(float), equal_nan=True), col
+
+        columns = aggregates.SOURCE_COLUMNS
+        bench('csv read', lambda: pd.read_csv(csv_path), args.repeat)
+        bench('parquet read', lambda: storage.read_parquet(pq_path), args.repeat)
+        bench('csv read, dashboard columns', lambda: pd.read_csv(csv_path, usecols=columns), args.repeat)
+        bench('parquet read, dashboard columns', lambda: storage.read_parquet(pq_path, columns), args.repeat)
+        bench('parquet read, last season', lambda: storage.read_parquet(pq_path, years=[int(expected.year.max())]), args.repeat)
+        bench('csv read + preprocess', lambda: features.preprocess(pd.read_csv(csv_path)), args.repeat)
+        bench('parquet read + preprocess', lambda: features.preprocess(storage.read_parquet(pq_path)), args.repeat)
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+'''
+Overhead of the trace instrumentation on the featurize path: the undecorated functions against the traced ones
+with tracing disabled (the default) and enabled, with and without the JSON lines export.
+
+    python benchmarks/bench_trace.py --number 2000
+'''
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from model.crawlers import features, trace
+
+def best(fn, number, repeat=5):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=os.path.join(ROOT, 'data', 'data.csv'))
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+    raw = pd.read_csv(args.data)
+    record = raw.iloc[0].to_dict()
+    small = raw.head(50)
+    cases = [
+        ('featurize_record', lambda: features.featurize_record.__wrapped__(record), lambda: features.featurize_record(record), args.number),
+        ('preprocess (50 rows)', lambda: features.preprocess.__wrapped__(small), lambda: features.preprocess(small), args.number // 20),
+    ]
+    jsonl = os.path.join(tempfile.mkdtemp(prefix='bench_trace_'), 'trace.jsonl')
+    print(f'{"stage":<22} {"untraced":>10} {"disabled":>10} {"enabled":>10} {"+jsonl":>10}   (us per call)')
+    for name, raw_fn, traced_fn, number in cases:
+        trace.configure(False)
+        base = best(raw_fn, number)
+        off = best(traced_fn, number)
+        trace.configure(True)
+        on = best(traced_fn, number)
+        trace.configure(True, jsonl)
+        on_jsonl = best(traced_fn, number)
+        trace.configure(False)
+        print(f'{name:<22} {base * 1e6:>10.1f} {off * 1e6:>10.1f} {on * 1e6:>10.1f} {on_jsonl * 1e6:>10.1f}')
+    print(f'span() disabled: {best(lambda: trace.span("x"), 100000) * 1e9:.0f} ns, '
+          f'count() disabled: {best(lambda: trace.count("x"), 100000) * 1e9:.0f} ns')
+    os.remove(jsonl)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+'''
+Throughput of `crawlers.workqueue` with several crawler processes sharing one queue file against the local stub
+profile server, one worker is killed halfway (--crash) so that its leased tasks have to be reclaimed, and a few
+players always fail (--broken) to end up in the dead letters. Checks that every player is finished exactly once.
+
+Workers run like `python -m crawlers.workqueue work`: every process preloads the shared identity index file from
+a page cache of the profiles at the same time, and players are fetched by `crawl.fetch_player` through that index.
+Broken players are unknown to the index, their search fails against the stub and they are dead lettered after
+max_attempts attempts. With --hang one fetch stalls for that many seconds (instead of the crash), its lease has to
+run out and another worker finishes the player.
+
+    python benchmarks/bench_workqueue.py --players 400 --processes 1 2 4 --workers 4 --latency 0.05
+    python benchmarks/bench_workqueue.py --players 200 --processes 2 --hang 10
+'''
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import traceback
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+
+from model.crawlers import crawl, cricbuzz, identity, workqueue
+from model.crawlers.fetch import Page
+from model.crawlers.page_cache import PageCache
+from stub import StubServer, profile_page
+
+def fill_page_cache(cache_dir, players, profile_url):
+    # the stub profile of id i is 'Player i', the queued name 'player i' resolves to it through the index
+    cache = PageCache(cache_dir)
+    for i in range(players):
+        url = profile_url.format(i)
+        cache.store(url, Page(url, 200, profile_page(str(i)), {'Content-Type': 'text/html; charset=utf-8'}))
+
+def work(run_dir, worker, workers, lease, server_url, crash_after, hang):
+    cricbuzz.PROFILE_URL = server_url + '/profiles/{}'
+    cricbuzz.SERP_URL = server_url + '/search'
+    try:
+        # concurrent preloads of one index file, as every `work` process does at start
+        identity.preload(None, PageCache(os.path.join(run_dir, 'page_cache')), os.path.join(run_dir, 'data.csv'),
+                         os.path.join(run_dir, 'player_ids.db'))
+    except Exception:
+        traceback.print_exc()
+        sys.exit(3)
+    fetched = [0]
+
+    def fetch(name):
+        fetched[0] += 1
+        if crash_after and fetched[0] > crash_after:
+            # a crashed host, its leases are never released or heartbeaten again
+            os._exit(1)
+        if hang and name == 'player 1':
+            try:
+                # only the first fetch of the player stalls
+                os.close(os.open(os.path.join(run_dir, 'hung'), os.O_CREAT | os.O_EXCL))
+                time.sleep(hang)
+            except FileExistsError:
+                pass
+        return crawl.fetch_player(name)
+
+    try:
+        with workqueue.WorkQueue(os.path.join(run_dir, 'queue.db'), lease=lease, max_attempts=3, retry_delay=0.1) as queue:
+            summary = workqueue.run_worker(queue, worker, workers, rate=None, poll=0.2, fetch_player=fetch)
+        identity.index.close()
+    except Exception:
+        traceback.print_exc()
+        sys.exit(3)
+    # a fetch of the hung player that finished after its lease was reclaimed
+    sys.exit(2 if summary['lost'] else 0)
+
+def run(players, broken, processes, workers, lease, crash, hang, server_url):
+    run_dir = tempfile.mkdtemp(prefix='bench_workqueue_')
+    path = os.path.join(run_dir, 'queue.db')
+    names = [f'player {i}' for i in range(players)] + [f'broken{i}' for i in range(broken)]
+    fill_page_cache(os.path.join(run_dir, 'page_cache'), players, server_url + '/profiles/{}')
+    pd.DataFrame({'name': [f'Player {i}' for i in range(players)]}).to_csv(os.path.join(run_dir, 'data.csv'), index=False)
+    with workqueue.WorkQueue(path) as queue:
+        queue.enqueue((name, 2025) for name in names)
+    start = time.perf_counter()
+    procs = []
+    for i in range(processes):
+        # a crash would also kill a hung fetch, the two are not combined
+        crash_after = players // (2 * processes) if crash and not hang and i == 0 and processes > 1 else 0
+        procs.append(multiprocessing.Process(target=work, args=(run_dir, f'worker-{i}', workers, lease, server_url,
+                                                                crash_after, hang if processes > 1 else 0)))
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+    with workqueue.WorkQueue(path) as queue:
+        counts = queue.counts()
+        results = queue.results()
+        dead = queue.dead_letters()
+        throughput = queue.throughput()
+    assert counts == {'pending': 0, 'leased': 0, 'done': players, 'dead': broken}, counts
+    assert sorted(name for name, _, _ in results) == sorted(names[:players])
+    # failed searches are retried, never dead lettered as empty stats at the first attempt
+    assert all(attempts == 3 and error == 'profile could not be fetched' for _, attempts, error in dead), dead
+    exitcodes = [p.exitcode for p in procs]
+    assert 3 not in exitcodes, 'a worker failed, e.g. database is locked'
+    if hang and processes > 1:
+        # the hung fetch lost its lease to another worker
+        assert 2 in exitcodes, exitcodes
+    return elapsed, throughput, exitcodes
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=400)
+    parser.add_argument('--broken', type=int, default=5, help='players whose fetch always fails')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--workers', type=int, default=4, help='fetch threads per process')
+    parser.add_argument('--latency', type=float, default=0.05, help='stub server response delay in seconds')
+    parser.add_argument('--lease', type=float, default=2.0)
+    parser.add_argument('--no-crash', dest='crash', action='store_false')
+    parser.add_argument('--hang', type=float, default=0, help='seconds the first fetch of one player stalls')
+    args = parser.parse_args()
+    with StubServer(args.latency) as server:
+        print(f'{"processes":>9} {"seconds":>8} {"players/s":>10}   per worker')
+        for processes in args.processes:
+            elapsed, throughput, exitcodes = run(args.players, args.broken, processes, args.workers, args.lease,
+                                                 args.crash, args.hang, server.url)
+            workers = ', '.join(f'{w} {s["done"]}' for w, s in sorted(throughput['workers'].items()))
+            crashed = f' (crashed: {exitcodes.count(1)})' if 1 in exitcodes else ''
+            hung = f' (lost a hung fetch: {exitcodes.count(2)})' if 2 in exitcodes else ''
+            print(f'{processes:>9} {elapsed:>8.2f} {args.players / elapsed:>10.1f}   {workers}{crashed}{hung}')
+
+if __name__ == '__main__':
+    main()
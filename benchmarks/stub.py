@@ -0,0 +1,154 @@
+'''
+Local stub of the cricbuzz profile and iplt20.com auction pages used by the benchmarks, serves synthetic pages over
+http
+'''
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BAT_COLS = ['M', 'Inn', 'NO', 'Runs', 'HS', 'Avg', 'BF', 'SR', '100', '200', '50', '4s', '6s']
+BOWL_COLS = ['M', 'Inn', 'B', 'Runs', 'Wkts', 'BBI', 'BBM', 'Econ', 'Avg', 'SR', '5w', '10w']
+ROLES = ['Batsman', 'Bowler', 'Batting Allrounder', 'Bowling Allrounder', 'WK-Batsman']
+COUNTRIES = ['India', 'Australia', 'England', 'South Africa', 'New Zealand', 'West Indies', 'Sri Lanka', 'Afghanistan']
+
+# stats table layouts matched by the first, second and third selector of `cricbuzz.STATS_SELECTORS`
+LAYOUTS = ('plyr-th', 'font-12', 'col-8')
+FORMATS = ('Test', 'ODI', 'T20', 'IPL')
+
+def _stat_row(label, n, rng, layout):
+    cells = ''.join(f'<td class="text-right">{rng.choice([rng.randint(0, 500), "-"]) if rng.random() < 0.1 else rng.randint(0, 500)}</td>' for _ in range(n))
+    label = f'<td><b>{label}</b></td>' if layout == 'plyr-th' else f'<td class="cb-col-8">{label}</td>'
+    return f'<tr>{label}{cells}</tr>'
+
+def _stat_table(cols, rng, layout, formats):
+    if layout == 'plyr-th':
+        head = ''.join(f'<th class="cb-plyr-th text-right">{c}</th>' for c in cols)
+        thead = f'<thead><tr><th></th>{head}</tr></thead>'
+    else:
+        head = ''.join(f'<th class="text-right">{c}</th>' for c in cols)
+        thead = f'<thead class="{"cb-font-12" if layout == "font-12" else ""}"><tr><th></th>{head}</tr></thead>'
+    rows = ''.join(_stat_row(label, len(cols), rng, layout) for label in formats)
+    return f'<table class="table cb-col-100 cb-plyr-thead">{thead}<tbody>{rows}</tbody></table>'
+
+def profile_page(pid, seed=None, layout='plyr-th', formats=FORMATS):
+    '''
+    Synthetic profile page with the same DOM structure that `Player.get_info` and `Player.get_stats` select on
+    '''
+    rng = random.Random(pid if seed is None else seed)
+    yob = rng.randint(1980, 2004)
+    personal = [
+        ('Born', f'Jan {rng.randint(1, 28)}, {yob} ({2025 - yob} years)'),
+        ('Birth Place', 'Somewhere'),
+        ('Height', f'{rng.randint(5, 6)} ft {rng.randint(0, 11)} in'),
+        ('Role', rng.choice(ROLES)),
+        ('Batting Style', rng.choice(['Right Handed Bat', 'Left Handed Bat'])),
+        ('Bowling Style', rng.choice(['Right-arm fast-medium', 'Legbreak', 'Left-arm orthodox'])),
+    ]
+    items = ''.join(
+        f'<div class="cb-col cb-col-40 text-bold cb-lst-itm-sm">{k}</div><div class="cb-col cb-col-60 cb-lst-itm-sm">{v}</div>'
+        for k, v in personal
+    )
+    return f'''<html><body>
+<div class="cb-col cb-col-100 cb-bg-white">
+<h1 itemprop="name" class="cb-font-40">Player {pid}</h1>
+<h3 class="cb-font-18 text-gray">{rng.choice(COUNTRIES)}</h3>
+</div>
+<div class="cb-col cb-col-33 text-black"><div class="cb-font-16 text-bold">Personal Information</div>{items}</div>
+<div class="cb-col cb-col-67 cb-prfl-stats">
+<div class="cb-font-16 text-bold">Batting Career Summary</div>{_stat_table(BAT_COLS, rng, layout, formats)}
+<div class="cb-font-16 text-bold">Bowling Career Summary</div>{_stat_table(BOWL_COLS, rng, layout, formats)}
+</div>
+</body></html>'''.encode()
+
+# current franchises, former names and a defunct team that the auction parser skips
+TEAMS = ['Chennai Super Kings', 'Mumbai Indians', 'Kolkata Knight Riders', 'Sunrisers Hyderabad', 'Rajasthan Royals',
+         'Delhi Capitals', 'Punjab Kings', 'Lucknow Super Giants', 'Gujarat Titans', 'Royal Challengers Bengaluru']
+OLD_TEAMS = ['Kings XI Punjab', 'Deccan Chargers', 'Delhi Daredevils', 'Pune Warriors India', 'Gujarat Lions',
+             'Royal Challengers Bangalore', 'Kochi Tuskers Kerala']
+AUCTION_ROLES = ['Batsman', 'Bowler', 'All-Rounder', 'Wicket Keeper']
+
+def _auction_row(rng, year, n, serial):
+    player = f'Player  {rng.randrange(5000)}' if rng.random() < 0.1 else f'Player {rng.randrange(5000)}'
+    price = rng.randrange(20, 2000) * 100000
+    if year == 2013:
+        # usd
+        price = f'{price // 58:,}'
+    elif year < 2019:
+        price = f'{price:,}'
+    else:
+        price = f'{"₹" if rng.random() < 0.5 else ""}{price:,}'
+    if year < 2022:
+        cells = [player, rng.choice(AUCTION_ROLES), price]
+    elif year < 2025:
+        cells = [player, rng.choice(['Indian', 'Overseas']), f' {rng.choice(AUCTION_ROLES)}\n', price]
+    else:
+        cells = [player, rng.choice(['Capped', 'Uncapped']), price, rng.choice(AUCTION_ROLES), str(rng.randint(0, 2))]
+    cells = ([str(n)] if serial else []) + cells
+    return '<tr>' + ''.join(f'<td>{c}</td>' for c in cells) + '</tr>'
+
+def auction_page(year, seed=None, players=(3, 20)):
+    '''
+    Synthetic auction page with the DOM structure and the era table layouts of the iplt20.com auction pages
+    '''
+    rng = random.Random(year if seed is None else seed)
+    teams = TEAMS + OLD_TEAMS if year < 2022 else TEAMS
+    serial = rng.random() < 0.5
+    tables = []
+    # the last table is the unsold players
+    for team in rng.sample(teams, rng.randint(len(teams) // 2, len(teams))) + ['Unsold Players']:
+        rows = ''.join(_auction_row(rng, year, n, serial) for n in range(1, rng.randint(*players) + 1))
+        tables.append(f'<h2 class="ih-t-name">{team}</h2><div class="ih-td-tab"><table><tbody>{rows}</tbody></table></div>')
+    return f'''<html><head><meta charset="utf-8"></head><body>
+<div class="ih-pt-tab-bg">{''.join(tables)}</div>
+</body></html>'''.encode()
+
+class StubServer:
+    '''
+    Threaded http server answering /profiles/{id} with a synthetic profile and /auction/{year} with a synthetic
+    auction page after `latency` seconds
+    '''
+    def __init__(self, latency=0.05, host='127.0.0.1', port=0):
+        latency_s = latency
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = self.path.strip('/').split('/')
+                if len(parts) < 2 or parts[0] not in ('profiles', 'auction'):
+                    self.send_error(404)
+                    return
+                time.sleep(latency_s)
+                body = profile_page(parts[1]) if parts[0] == 'profiles' else auction_page(int(parts[1]))
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,128 @@
+'''
+Synthetic data.csv / auction_data.csv at any multiple of the real row counts
+
+Rows are bootstrapped from the real files, so the country / role / team / year mix and the joint distribution of
+the stats are kept, and the numbers are jittered (lognormal noise, counts stay integers, '-' cells stay '-').
+Bootstrapped copies of a player get a replica suffix ('virat kohli 3'), the same player keeps appearing in a
+handful of seasons like in the real data. The same seed always gives the same rows.
+
+    python benchmarks/synthetic.py --scale 100 --out /tmp/synthetic
+    python benchmarks/synthetic.py --scale 10000 --out /tmp/synthetic --chunk-rows 1000000
+
+Datasets that fit in one chunk are written with `storage.save` (CSV and its Parquet copy), larger ones are
+appended to the CSV chunk by chunk and are read from the CSV.
+'''
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from model.crawlers import storage
+
+DATA = os.path.join(ROOT, 'data', 'data.csv')
+AUCTION_DATA = os.path.join(ROOT, 'data', 'auction_data.csv')
+# stats that are counts, the others are averages / rates with two decimals
+COUNT_SUFFIXES = ('_no', '_runs', '_50', '_4s', '_6s', '_wkts')
+NOISE = 0.1
+PRICE_STEP = 100000
+
+def jitter(rng, values, sigma=NOISE):
+    return values * rng.lognormal(0.0, sigma, len(values))
+
+def stat_column(rng, raw: pd.Series, count: bool):
+    # '-' (not played) and missing cells are kept, numbers are jittered
+    numbers = pd.to_numeric(raw, errors='coerce').to_numpy(np.float64)
+    numbers = jitter(rng, numbers)
+    numbers = np.round(numbers) if count else np.round(numbers, 2)
+    if count and not np.isnan(numbers).any():
+        numbers = numbers.astype(np.int64)
+    dash = (raw.astype(str) == '-').to_numpy()
+    if not dash.any():
+        return numbers
+    out = numbers.astype(object)
+    out[dash] = '-'
+    return out
+
+def replica_names(names: pd.Series, start, n_source):
+    replica = (np.arange(start, start + len(names)) // n_source).astype(str)
+    # the first copy keeps the real names
+    return names.where(replica == '0', names + ' ' + replica)
+
+def bootstrap(rng, source: pd.DataFrame, n):
+    rows = source.iloc[rng.integers(0, len(source), n)].reset_index(drop=True)
+    # stable, one run of rows per auction year like the real files (and the Parquet row groups)
+    return rows.sort_values('year', kind='stable').reset_index(drop=True)
+
+def synthetic_players(n, seed=0, source=None, start=0) -> pd.DataFrame:
+    '''
+    `n` rows in the data.csv schema, `start` is the row offset of a chunk within a larger dataset
+    '''
+    source = pd.read_csv(DATA) if source is None else source
+    rng = np.random.default_rng([seed, start])
+    df = bootstrap(rng, source, n)
+    df['name'] = replica_names(df['name'], start, len(source))
+    df['age'] = np.round(df['age'] + rng.normal(0.0, 1.0, n), 1)
+    stats = list(source.columns[source.columns.get_loc('bowl_style') + 1:source.columns.get_loc('team')])
+    for col in stats:
+        df[col] = stat_column(rng, df[col], col.endswith(COUNT_SUFFIXES))
+    df['price'] = (np.round(jitter(rng, df['price'].to_numpy(np.float64)) / PRICE_STEP) * PRICE_STEP).astype(np.int64)
+    return df
+
+def synthetic_auction(n, seed=0, source=None, start=0) -> pd.DataFrame:
+    '''
+    `n` rows in the auction_data.csv schema
+    '''
+    source = pd.read_csv(AUCTION_DATA) if source is None else source
+    rng = np.random.default_rng([seed, start])
+    df = bootstrap(rng, source, n)
+    df['player'] = replica_names(df['player'], start, len(source))
+    df['price'] = (np.round(jitter(rng, df['price'].to_numpy(np.float64)) / PRICE_STEP) * PRICE_STEP).astype(np.int64)
+    return df
+
+def write_dataset(make, source, csv_path, n, seed=0, chunk_rows=1000000):
+    '''
+    Write `n` rows of `make` (synthetic_players / synthetic_auction) to `csv_path`, returns the file readers read
+    '''
+    if n <= chunk_rows:
+        storage.save(make(n, seed, source), csv_path)
+        return storage.source(csv_path)
+    tmp = f'{csv_path}.tmp'
+    for start in range(0, n, chunk_rows):
+        chunk = make(min(chunk_rows, n - start), seed, source, start)
+        chunk.to_csv(tmp, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    os.replace(tmp, csv_path)
+    # a stale Parquet copy of an earlier, smaller dataset would be read instead
+    if os.path.isfile(storage.parquet_path(csv_path)):
+        os.remove(storage.parquet_path(csv_path))
+    return csv_path
+
+def write_synthetic(out_dir, scale, seed=0, chunk_rows=1000000):
+    '''
+    data.csv and auction_data.csv at `scale` times the real row counts in `out_dir`, returns their csv paths
+    '''
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for make, path in ((synthetic_players, DATA), (synthetic_auction, AUCTION_DATA)):
+        source = pd.read_csv(path)
+        csv_path = os.path.join(out_dir, os.path.basename(path))
+        write_dataset(make, source, csv_path, int(round(len(source) * scale)), seed, chunk_rows)
+        paths.append(csv_path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=float, default=100, help='multiple of the real row counts')
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-rows', type=int, default=1000000)
+    args = parser.parse_args()
+    for path in write_synthetic(args.out, args.scale, args.seed, args.chunk_rows):
+        print(f'{storage.source(path)}: {os.path.getsize(storage.source(path)) / 2**20:.1f} MiB')
+
+if __name__ == '__main__':
+    main()
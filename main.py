@@ -1,28 +1,89 @@
-import joblib
+import os
 import streamlit as st
 import pandas as pd
 import altair as alt
-from model.crawlers import utils
-from babel.numbers import format_currency
+from concurrent.futures import ThreadPoolExecutor
+# only the modules the dashboard needs are imported up front, the crawl stack (requests, lxml, googlesearch), babel
+# and the model stack (joblib, sklearn, autosklearn on unpickling) are imported with the first prediction
+from model.crawlers import features, aggregates, storage, prediction_cache, trace
 from datetime import datetime
 from urllib.parse import urlparse
 
+# eager: load the models before rendering (the old behaviour), background: load them on a thread once the dashboard
+# is rendered, lazy: load them with the first prediction request
+MODEL_LOAD = os.environ.get('MODEL_LOAD', 'background')
+MODEL_DIR = os.environ.get('MODEL_DIR', './model')
+
 # Use the full page instead of a narrow central column
 st.set_page_config(layout="wide")
 
+def data_version(file_name):
+    # changes when the csv or its parquet copy is rewritten
+    path = storage.source(file_name)
+    stat = os.stat(path)
+    return f'{path}-{stat.st_mtime_ns}-{stat.st_size}'
+
 # @st.cache(persist=True)
 @st.cache_data
-def get_data(file_name):
-    df = pd.read_csv(file_name)
+def get_data(file_name, version):
+    # storage.load is what utils.load_data reads with, without importing the crawlers
+    df = storage.load(file_name, aggregates.SOURCE_COLUMNS)
     return df
 
-# @st.cache(persist=True, allow_output_mutation=True)
-@st.cache_resource
+@st.cache_data
+def get_cube(file_name, version):
+    # all chart aggregates are computed once per data version
+    return aggregates.build_cube(features.preprocess(get_data(file_name, version), keep_name=True))
+
 def load_models():
-    reg = joblib.load('./model/auto_reg_v1.joblib')
-    clf = joblib.load('./model/auto_clf_v1.joblib')
+    from model.crawlers import artifacts
+    reg_path, clf_path = artifacts.model_paths(MODEL_DIR)
+    with trace.span('predict.load_models', mode=MODEL_LOAD):
+        reg = artifacts.load_artifact(reg_path)
+        clf = artifacts.load_artifact(clf_path)
     return reg, clf
 
+def build_predictor():
+    from model.crawlers import predictor
+    reg, clf = load_models()
+    return predictor.Predictor(reg, clf)
+
+# @st.cache(persist=True, allow_output_mutation=True)
+@st.cache_resource
+def start_model_load():
+    # one load per server, sessions that start while it runs wait for the same future
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-load')
+    future = executor.submit(build_predictor)
+    executor.shutdown(wait=False)
+    return future
+
+def load_predictor():
+    try:
+        return start_model_load().result()
+    except Exception:
+        # a failed load is retried by the next request instead of being cached
+        start_model_load.clear()
+        raise
+
+@st.cache_resource
+def model_version():
+    from model.crawlers import artifacts
+    return '-'.join(artifacts.model_version(path) for path in artifacts.model_paths(MODEL_DIR))
+
+@st.cache_resource
+def get_prediction_cache():
+    # one cache for every session, reruns and other analysts scoring the same player skip the crawl and the models
+    return prediction_cache.PredictionCache(max_entries=1024, ttl=3600)
+
+def predict_player(player_url, auction_yr):
+    from model.crawlers import utils
+    player_record, player = utils.get_player_record(player_url, auction_yr)
+    if player is None:
+        return None
+    # the profile is fetched before waiting on the models, a background load keeps running meanwhile
+    price, team = load_predictor().predict(player_record)
+    return {'record': player_record, 'name': player.name, 'price': price, 'team': team}
+
 def is_valid_url(url: str) -> bool:
     """
     Validate a URL by checking if it has a scheme and a netloc.
@@ -33,40 +94,11 @@ def is_valid_url(url: str) -> bool:
     except Exception:
         return False
 
-def preprocess(df: pd.DataFrame) -> pd.DataFrame:
-    processed_df = None
-    # Drop unwanted columns
-    processed_df = df.drop(['height', 'bat_style', 'bowl_style', 't20_no', 't20_avg', 't20_50', 
-    't20_4s', 'ipl_no', 'ipl_avg', 'ipl_50', 'ipl_4s', 't20_bowl_avg', 'ipl_bowl_avg'], axis=1)
-    # convert all stats column to numeric
-    processed_df = processed_df.replace('-', 0.0)
-    for col in processed_df.columns[4:16]:
-        processed_df[col] = pd.to_numeric(processed_df[col], errors='coerce')
-    # merge columns together
-    processed_df['total_runs'] = processed_df['t20_runs'] + processed_df['ipl_runs']
-    processed_df['total_6s'] = processed_df['t20_6s'] + processed_df['ipl_6s']
-    processed_df['total_sr'] = processed_df['t20_sr'] / 2 + processed_df['ipl_sr'] / 2
-    processed_df['total_wkts'] = processed_df['t20_wkts'] + processed_df['ipl_wkts']
-    processed_df['total_bowl_econ'] = processed_df['t20_bowl_econ'] / 2 + processed_df['ipl_bowl_econ'] / 2
-    processed_df['total_bowl_sr'] = processed_df['t20_bowl_sr'] / 2 + processed_df['ipl_bowl_sr'] / 2
-
-    # drop all merged cols
-    processed_df = processed_df.drop(['t20_runs', 'ipl_runs', 't20_6s', 'ipl_6s', 'ipl_sr', 
-    't20_sr', 'ipl_wkts', 't20_wkts', 'ipl_bowl_econ', 't20_bowl_econ', 't20_bowl_sr', 'ipl_bowl_sr'], axis=1)
-    
-    return processed_df
-
-def show_price_spent_vs_six_hitting_ability_plot(df):
-    tdf = pd.DataFrame({
-        'sixes_count':df.groupby(["year", "team"])['total_6s'].sum(),
-        'total_price': df.groupby(["year", "team"])['price'].sum()
-        }).reset_index()
-    
-    tdf['total_price'] = tdf['total_price'] / 10000000
-
+def show_price_spent_vs_six_hitting_ability_plot(cube):
+    tdf = cube['team'][['year', 'team', 'sixes_count', 'total_price']]
 
     c = alt.Chart(tdf).mark_trail().encode(
-        x=alt.X('year', bin = False, scale=alt.Scale(domain=[2013, 2025]), axis=alt.Axis(format='d')), y='sixes_count', size='total_price', color='team', tooltip=['team', 'year', 'total_price', 'sixes_count']
+        x=alt.X('year', bin = False, scale=alt.Scale(domain=cube['years']), axis=alt.Axis(format='d')), y='sixes_count', size='total_price', color='team', tooltip=['team', 'year', 'total_price', 'sixes_count']
         )
     
     # Create a selection that chooses the nearest point & selects based on x-value
@@ -106,16 +138,11 @@ def show_price_spent_vs_six_hitting_ability_plot(df):
 
     st.altair_chart(final, use_container_width=True)
 
-def show_price_spent_vs_crucial_roles_plot(df):
-    tdf = pd.DataFrame({
-        'role_count':df.groupby(["year", "role"])['role'].count(),
-        'total_price': df.groupby(["year", "role"])['price'].sum()
-        }).reset_index()
-    
-    tdf['total_price'] = tdf['total_price'] / 10000000
+def show_price_spent_vs_crucial_roles_plot(cube):
+    tdf = cube['role'][['year', 'role', 'count', 'total_price']].rename(columns={'count': 'role_count'})
 
     c = alt.Chart(tdf).mark_trail().encode(
-        x=alt.X('year', bin = False, scale=alt.Scale(domain=[2013, 2025]), axis=alt.Axis(format='d')), y='total_price', size='role_count', color='role', 
+        x=alt.X('year', bin = False, scale=alt.Scale(domain=cube['years']), axis=alt.Axis(format='d')), y='total_price', size='role_count', color='role', 
         tooltip=['year', 'role', 'role_count', 'total_price']
         )
     
@@ -156,16 +183,11 @@ def show_price_spent_vs_crucial_roles_plot(df):
 
     st.altair_chart(final, use_container_width=True)
 
-def show_avg_age_per_team_over_the_years_plot(df):
-    tdf = df.copy()
-    # update age col offset vs curr year and curr age
-    # tdf['age'] = tdf['age'] - (2025 - tdf['year'])
-    tdf = pd.DataFrame({
-        'avg_age': df.groupby(["year", "team"])['age'].mean()
-        }).reset_index()
+def show_avg_age_per_team_over_the_years_plot(cube):
+    tdf = cube['team'][['year', 'team', 'avg_age']]
 
     c = alt.Chart(tdf).mark_trail().encode(
-        x=alt.X('year', bin = False, scale=alt.Scale(domain=[2013, 2025]), axis=alt.Axis(format='d')), 
+        x=alt.X('year', bin = False, scale=alt.Scale(domain=cube['years']), axis=alt.Axis(format='d')), 
         y=alt.Y('avg_age', bin = False, scale=alt.Scale(domain=[20, 35]), axis=alt.Axis(format='d')), color='team', 
         tooltip=['year', 'team', 'avg_age']
         )
@@ -206,25 +228,22 @@ def show_avg_age_per_team_over_the_years_plot(df):
 
     st.altair_chart(final, use_container_width=True)
 
-def show_top_batsr_price_over_the_years_plot(df):
-    tdf = df.copy()
-    tdf['price'] = tdf['price'] / 10000000
-    bat = tdf[tdf.role.isin(['bowling-allrounder', 'batting-allrounder', 'batsman', 'wk-batsman'])][tdf['total_runs'] >= 500]
-    top_5_df = bat.drop_duplicates('name').nlargest(5, 'total_sr')
+def show_top_batsr_price_over_the_years_plot(cube):
+    bat = cube['bat']
     players = st.multiselect(
-        "Choose batsman / all-rounder", list(bat['name'].unique()), top_5_df['name'].to_list()
+        "Choose batsman / all-rounder", list(bat['name'].unique()), cube['bat_top']
     )
     if not players:
         st.error("Please select at least one batsman / all-rounder")
     else:
         data = bat[bat.name.isin(players)]
         c = alt.Chart(data).mark_circle().encode(
-            x=alt.X('year', bin = False, scale=alt.Scale(domain=[2013, 2025]), axis=alt.Axis(format='d')), 
+            x=alt.X('year', bin = False, scale=alt.Scale(domain=cube['years']), axis=alt.Axis(format='d')), 
             y='price', 
             color='name',
             size='total_sr',
             # size=alt.Size('total_sr', scale=alt.Scale(domain=[100, 300])),
-            tooltip=['name', 'year', 'price', 'total_sr']
+            tooltip=['name', 'year', 'price', alt.Tooltip('total_sr', format='.2f')]
         )
         
         # Create a selection that chooses the nearest point & selects based on x-value
@@ -263,25 +282,22 @@ def show_top_batsr_price_over_the_years_plot(df):
 
         st.altair_chart(final, use_container_width=True)
 
-def show_top_bowlsr_price_over_the_years_plot(df):
-    tdf = df.copy()
-    tdf['price'] = tdf['price'] / 10000000
-    bowl = tdf[tdf.role.isin(['bowling-allrounder', 'bowler'])][tdf['total_wkts'] >= 100]
-    top_5_df = bowl.drop_duplicates('name').nsmallest(5, 'total_bowl_econ')
+def show_top_bowlsr_price_over_the_years_plot(cube):
+    bowl = cube['bowl']
     players = st.multiselect(
-        "Choose bowler / all-rounder", list(bowl['name'].unique()), top_5_df['name'].to_list()
+        "Choose bowler / all-rounder", list(bowl['name'].unique()), cube['bowl_top']
     )
     if not players:
         st.error("Please select at least one bowler / all-rounder")
     else:
         data = bowl[bowl.name.isin(players)]
         c = alt.Chart(data).mark_circle().encode(
-            x=alt.X('year', bin = False, scale=alt.Scale(domain=[2013, 2025]), axis=alt.Axis(format='d')), 
+            x=alt.X('year', bin = False, scale=alt.Scale(domain=cube['years']), axis=alt.Axis(format='d')), 
             y='price', 
             color='name',
             size='total_bowl_econ',
             # size=alt.Size('total_sr', scale=alt.Scale(domain=[100, 300])),
-            tooltip=['name', 'year', 'price', 'total_bowl_econ']
+            tooltip=['name', 'year', 'price', alt.Tooltip('total_bowl_econ', format='.2f')]
         )
         
         # Create a selection that chooses the nearest point & selects based on x-value
@@ -321,8 +337,9 @@ def show_top_bowlsr_price_over_the_years_plot(df):
         st.altair_chart(final, use_container_width=True)
 
 try:
-    df = preprocess(get_data('./data/data.csv'))
-    reg_model, clf_model = load_models()
+    if MODEL_LOAD == 'eager':
+        load_predictor()
+    cube = get_cube('./data/data.csv', data_version('./data/data.csv'))
 
     st.title('IPL Auction Prediction')
     col1, col2 = st.columns(2)
@@ -331,30 +348,39 @@ try:
         auction_yr = st.number_input('Year of auction', datetime.now().year, datetime.now().year+2)
         
     with col2:
-        player = None
-        with st.spinner(text='Fetching player info...'):
-            player_feat, player = utils.get_player_features(player_url, auction_yr)
-            if player_url != '' and player is None:
-                st.error(f'Oops! Could not fetch player')
-        with st.spinner(text=f'Making predictions for player'):
-            if player_url != '' and player is not None:
-                predicted_price = format_currency(reg_model.predict(player_feat)[0] / 10000000, 'INR', locale='en_IN', format=u"₹#,##0.00 'Cr'")
-                predicted_team = clf_model.predict(player_feat)[0].replace('-', ' ').title()
-                player_copy = player_feat.copy()
-                player_copy['name'] = player.name.title()
-                st.write('Player Stats Summary')
-                st.write(player_copy.set_index('name'))
-                st.success(f'**{predicted_team}** could place a bid of **{predicted_price}** for **{player.name.title()}** in the **{auction_yr}** IPL auction')
-
-    st.title('IPL Auction Data Analysis [2013 - 2025](https://www.iplt20.com/auction/2025)')
-    show_price_spent_vs_six_hitting_ability_plot(df)
+        result = None
+        cache = get_prediction_cache()
+        with st.spinner(text='Fetching player info and making predictions...'):
+            if player_url != '':
+                key = prediction_cache.cache_key(player_url, auction_yr, model_version())
+                result = cache.get_or_compute(key, lambda: predict_player(player_url, auction_yr))
+                if result is None:
+                    st.error(f'Oops! Could not fetch player')
+        if result is not None:
+            from babel.numbers import format_currency
+            player_name = result['name'].title()
+            predicted_price = format_currency(result['price'] / 10000000, 'INR', locale='en_IN', format=u"₹#,##0.00 'Cr'")
+            predicted_team = result['team'].replace('-', ' ').title()
+            player_copy = features.preprocess(pd.DataFrame([result['record']]))
+            player_copy['name'] = player_name
+            st.write('Player Stats Summary')
+            st.write(player_copy.set_index('name'))
+            st.success(f'**{predicted_team}** could place a bid of **{predicted_price}** for **{player_name}** in the **{auction_yr}** IPL auction')
+        st.sidebar.caption(f'Prediction cache: {cache.stats()}')
+
+    first_year, last_year = cube['years']
+    st.title(f'IPL Auction Data Analysis [{first_year} - {last_year}](https://www.iplt20.com/auction/{last_year})')
+    show_price_spent_vs_six_hitting_ability_plot(cube)
     col3, col4 = st.columns(2)
     with col3:
-        show_price_spent_vs_crucial_roles_plot(df)
-        show_top_batsr_price_over_the_years_plot(df)
+        show_price_spent_vs_crucial_roles_plot(cube)
+        show_top_batsr_price_over_the_years_plot(cube)
     with col4:
-        show_avg_age_per_team_over_the_years_plot(df)
-        show_top_bowlsr_price_over_the_years_plot(df)
+        show_avg_age_per_team_over_the_years_plot(cube)
+        show_top_bowlsr_price_over_the_years_plot(cube)
+    if MODEL_LOAD == 'background':
+        # started after the charts, unpickling would otherwise compete with rendering for the GIL
+        start_model_load()
 except Exception as e:
     st.error(
         """
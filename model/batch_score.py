@@ -0,0 +1,108 @@
+'''
+Batch scoring of a whole auction pool with the price regressor and team classifier
+
+Input is a CSV / Parquet file with either a `url` column of cricbuzz profile links or already extracted feature
+rows (raw data.csv columns or preprocessed ones). An optional `year` column overrides --year per row.
+Predictions are written chunk by chunk so memory stays flat for large pools.
+
+    python batch_score.py pool.csv -o predictions.csv --year 2026 --workers 8
+'''
+import argparse
+import time
+import pandas as pd
+from crawlers import fetch
+from crawlers.artifacts import load_artifact
+from crawlers.crawl import crawl_players
+from crawlers.features import MERGED_COLUMNS, PLAYER_COLUMNS, preprocess
+from crawlers.predictor import Predictor
+from crawlers.utils import get_player_record
+
+def read_chunks(path, chunk_size):
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+class ChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self._parquet = None
+        self._first = True
+
+    def write(self, df):
+        if self.path.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+def resolve_urls(chunk, workers, rate):
+    # fetch every (url, year) once, rows keep their input order
+    keys = list(zip(chunk['url'], chunk['year']))
+    records = {}
+    for key, result in crawl_players(keys, workers, rate, fetch=lambda key: get_player_record(*key)):
+        if result is not None and result[0] is not None:
+            records[key] = result[0]
+    resolved = [key in records for key in keys]
+    return pd.DataFrame([records[key] for key in keys if key in records], columns=PLAYER_COLUMNS + ['year']), resolved
+
+def score_chunk(predictor, chunk, workers, rate):
+    out = chunk[[c for c in ('url', 'name', 'year') if c in chunk.columns]].reset_index(drop=True)
+    if 'url' in chunk.columns:
+        raw, resolved = resolve_urls(chunk, workers, rate)
+    else:
+        raw, resolved = chunk.reset_index(drop=True), [True] * chunk.shape[0]
+    out['status'] = ['ok' if r else 'failed' for r in resolved]
+    out['predicted_price'] = None
+    out['predicted_team'] = None
+    if raw.shape[0] > 0:
+        X = raw if all(c in raw.columns for c in MERGED_COLUMNS) else preprocess(raw, keep_name='name' in raw.columns)
+        prices, teams = predictor.predict_batch(X)
+        out.loc[resolved, 'predicted_price'] = prices
+        out.loc[resolved, 'predicted_team'] = teams
+    # typed even when every row failed, all-None columns would give a chunk a null parquet schema
+    return out.astype({'predicted_price': 'float64', 'predicted_team': 'string'})
+
+def score(input_path, output_path, reg_path, clf_path, year, chunk_size=256, workers=8, rate=2.0):
+    predictor = Predictor(load_artifact(reg_path), load_artifact(clf_path))
+    writer = ChunkWriter(output_path)
+    rows = failed = 0
+    start = time.perf_counter()
+    try:
+        for chunk in read_chunks(input_path, chunk_size):
+            if 'year' not in chunk.columns:
+                chunk = chunk.assign(year=year)
+            out = score_chunk(predictor, chunk, workers, rate)
+            writer.write(out)
+            rows += out.shape[0]
+            failed += int((out['status'] != 'ok').sum())
+            elapsed = time.perf_counter() - start
+            print(f'Scored {rows} rows ({failed} failed) in {elapsed:.1f}s, {rows / elapsed:.1f} rows/s')
+    finally:
+        writer.close()
+    print(f'Fetch stats: {fetch.session.stats.snapshot()}')
+    return rows, failed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score a pool of players with auto_reg_v1 / auto_clf_v1')
+    parser.add_argument('input', help='csv or parquet with a url column or feature rows')
+    parser.add_argument('-o', '--output', default='predictions.csv', help='csv or parquet output path')
+    parser.add_argument('--year', type=int, default=pd.Timestamp.now().year, help='auction year of rows without a year column')
+    parser.add_argument('--reg', default='./auto_reg_v1.joblib')
+    parser.add_argument('--clf', default='./auto_clf_v1.joblib')
+    parser.add_argument('--chunk-size', type=int, default=256)
+    parser.add_argument('--workers', type=int, default=8, help='concurrent profile fetches')
+    parser.add_argument('--rate', type=float, default=2.0, help='profile requests per second per host')
+    args = parser.parse_args()
+    score(args.input, args.output, args.reg, args.clf, args.year, args.chunk_size, args.workers, args.rate)
@@ -1,17 +1,21 @@
 import sys
 sys.path.append('../')
-import joblib
 from autosklearn.classification import AutoSklearnClassifier
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import StandardScaler, OrdinalEncoder
-from sklearn.compose import ColumnTransformer
-from crawlers.utils import load_data, preprocess
+from crawlers.utils import load_data
+from crawlers.features import preprocess, build_preprocessor
+from crawlers.artifacts import export_artifact
+from crawlers import trace
+from distill import distill
 
-def train():
-    df = preprocess(load_data('../data/data.csv'))
-    
-    # shuffle rows
-    df = df.sample(frac=1)
+def train(df=None, time_left_for_this_task=600, n_jobs=-1, tmp_folder=None, get_smac_object_callback=None, seed=1):
+    '''
+    Search, export and distill the model, `df` is the preprocessed and shuffled data.csv when it is not given
+    '''
+    if df is None:
+        df = preprocess(load_data('../data/data.csv'))
+        # shuffle rows
+        df = df.sample(frac=1)
 
     y_train = df['team']
     df = df.drop(['team', 'price'], axis=1)
@@ -21,18 +25,13 @@ def train():
     # print(f'Train Data: {(X_train_clf.shape, y_train_clf.shape)}, Test Data: {(X_test_clf.shape, y_test_clf.shape)}')
     print(f'Train Data: {(df.shape, y_train.shape)}')
 
-    # ord cols
-    ord_cols = ['country', 'role']
-    # num cols
-    num_cols = ['age', 'year', 'total_runs', 'total_6s', 'total_sr', 'total_wkts', 'total_bowl_econ', 'total_bowl_sr']
-
     # feature preprocess
-    pre = ColumnTransformer([
-        ('num_std_scaler', StandardScaler(), num_cols),
-        ('str_ord_enc', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1), ord_cols)
-    ])
+    pre = build_preprocessor()
 
-    automl = AutoSklearnClassifier(time_left_for_this_task=600, per_run_time_limit=60, n_jobs=-1, max_models_on_disc=50, ensemble_size=50)
+    # a given tmp_folder is kept after the search, its run history warm starts a resumed search
+    automl = AutoSklearnClassifier(time_left_for_this_task=time_left_for_this_task, per_run_time_limit=60, n_jobs=n_jobs, max_models_on_disc=50, ensemble_size=50,
+                   tmp_folder=tmp_folder, delete_tmp_folder_after_terminate=tmp_folder is None,
+                   get_smac_object_callback=get_smac_object_callback, seed=seed)
     # rf = RandomForestClassifier(verbose=2, n_jobs=-1)
 
     # train pipeline
@@ -43,12 +42,17 @@ def train():
     verbose=True)
 
     # train
-    pipe.fit(df, y_train)
+    with trace.span('train.fit', task='clf', rows=df.shape[0]):
+        pipe.fit(df, y_train)
 
     # test
     # print(pipe.score(X_test_clf, y_test_clf))
 
-    joblib.dump(pipe, 'auto_clf_v1.joblib')
+    with trace.span('train.export', task='clf'):
+        export_artifact(pipe, 'auto_clf_v1.joblib')
+    # compact student that the app can serve without autosklearn
+    with trace.span('train.distill', task='clf'):
+        distill(pipe, df, 'clf', y_train, 'student_clf_v1.joblib')
 
     print(y_train.head())
     print(pipe.predict(df.head()))
@@ -56,6 +60,7 @@ def train():
     print(automl.leaderboard())
     print(automl.show_models())
     print(automl.sprint_statistics())
+    return pipe, automl
 
 if __name__ == '__main__':
     train()
\ No newline at end of file
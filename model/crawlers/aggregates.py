@@ -0,0 +1,37 @@
+'''
+Aggregates behind the dashboard charts, computed once per data version so charts never touch the raw rows
+'''
+import pandas as pd
+from .features import STAT_COLUMNS
+
+# crores
+PRICE_UNIT = 10000000
+BAT_ROLES = ['bowling-allrounder', 'batting-allrounder', 'batsman', 'wk-batsman']
+BOWL_ROLES = ['bowling-allrounder', 'bowler']
+# raw data.csv columns the cube is built from
+SOURCE_COLUMNS = ['name', 'age', 'role', 'team', 'year', 'price'] + STAT_COLUMNS
+
+def build_cube(df: pd.DataFrame) -> dict:
+    '''
+    year x team and year x role sums / counts / means plus the candidate players of the top batsman and bowler charts
+    '''
+    cube = {'years': [int(df['year'].min()), int(df['year'].max())]}
+    for dim in ('team', 'role'):
+        # observed, dictionary encoded columns would otherwise add every unsold (year, category) pair
+        agg = df.groupby(['year', dim], observed=True).agg(
+            count=('price', 'size'),
+            total_price=('price', 'sum'),
+            sixes_count=('total_6s', 'sum'),
+            avg_age=('age', 'mean'),
+        ).reset_index()
+        agg['total_price'] = agg['total_price'] / PRICE_UNIT
+        cube[dim] = agg
+    players = df[['name', 'role', 'year', 'price', 'total_runs', 'total_sr', 'total_wkts', 'total_bowl_econ']].copy()
+    players['price'] = players['price'] / PRICE_UNIT
+    bat = players[players.role.isin(BAT_ROLES) & (players['total_runs'] >= 500)]
+    cube['bat'] = bat[['name', 'year', 'price', 'total_sr']].reset_index(drop=True)
+    cube['bat_top'] = bat.drop_duplicates('name').nlargest(5, 'total_sr')['name'].to_list()
+    bowl = players[players.role.isin(BOWL_ROLES) & (players['total_wkts'] >= 100)]
+    cube['bowl'] = bowl[['name', 'year', 'price', 'total_bowl_econ']].reset_index(drop=True)
+    cube['bowl_top'] = bowl.drop_duplicates('name').nsmallest(5, 'total_bowl_econ')['name'].to_list()
+    return cube
@@ -0,0 +1,110 @@
+'''
+Model artifacts stored uncompressed with a metadata sidecar so that their numpy arrays can be memory mapped
+
+Pages of a memory mapped artifact live in the OS page cache and are shared by every server process that loads
+the same file, instead of each process unpickling a private copy. Arrays that an estimator copies on unpickling
+(e.g. sklearn tree nodes) still end up private to the process.
+
+    python -m crawlers.artifacts auto_reg_v1.joblib auto_clf_v1.joblib
+'''
+import hashlib
+import json
+import os
+import sys
+import time
+import joblib
+
+# path -> {'load_seconds', 'rss_delta_bytes', 'dropped_members'} of every artifact loaded in this process
+load_stats = {}
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def prune_ensemble(model) -> int:
+    '''
+    Drop the autosklearn ensemble members with zero weight, they are never used for predictions
+    '''
+    est = model.steps[-1][1] if hasattr(model, 'steps') else model
+    automl = getattr(est, 'automl_', None)
+    ensemble = getattr(automl, 'ensemble_', None)
+    if ensemble is None:
+        return 0
+    selected = set(ensemble.get_selected_model_identifiers())
+    dropped = 0
+    for attr in ('models_', 'cv_models_'):
+        members = getattr(automl, attr, None)
+        if not isinstance(members, dict):
+            continue
+        for identifier in [i for i in members if i not in selected]:
+            del members[identifier]
+            dropped += 1
+    return dropped
+
+def meta_path(path):
+    return f'{path}.json'
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def export_artifact(model, path, prune=True, extra=None):
+    dropped = prune_ensemble(model) if prune else 0
+    # no compression, compressed arrays can not be memory mapped
+    joblib.dump(model, path, compress=0)
+    meta = {
+        'sha256': file_digest(path),
+        'size_bytes': os.path.getsize(path),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'dropped_members': dropped,
+    }
+    meta.update(extra or {})
+    with open(meta_path(path), 'w') as f:
+        json.dump(meta, f, indent=4)
+    return meta
+
+def read_meta(path):
+    if not os.path.isfile(meta_path(path)):
+        return None
+    with open(meta_path(path)) as f:
+        return json.load(f)
+
+def model_version(path):
+    meta = read_meta(path)
+    return meta['sha256'][:12] if meta is not None else file_digest(path)[:12]
+
+def model_paths(model_dir='./model'):
+    '''
+    (regressor, classifier) artifact paths, the distilled students are served without importing autosklearn and
+    the full ensembles are the fallback
+    '''
+    reg_path, clf_path = os.path.join(model_dir, 'student_reg_v1.joblib'), os.path.join(model_dir, 'student_clf_v1.joblib')
+    if not (os.path.isfile(reg_path) and os.path.isfile(clf_path)):
+        reg_path, clf_path = os.path.join(model_dir, 'auto_reg_v1.joblib'), os.path.join(model_dir, 'auto_clf_v1.joblib')
+    return reg_path, clf_path
+
+def load_artifact(path, mmap_mode='r', prune=True):
+    rss = rss_bytes()
+    start = time.perf_counter()
+    model = joblib.load(path, mmap_mode=mmap_mode)
+    # members of older artifacts that were exported before pruning are dropped after loading
+    dropped = prune_ensemble(model) if prune else 0
+    load_stats[path] = {
+        'load_seconds': time.perf_counter() - start,
+        'rss_delta_bytes': rss_bytes() - rss,
+        'dropped_members': dropped,
+    }
+    print(f'Loaded {path}: {load_stats[path]}')
+    return model
+
+if __name__ == '__main__':
+    # re-export existing artifacts in the memory mappable format
+    for path in sys.argv[1:]:
+        print(path, export_artifact(joblib.load(path), path))
@@ -0,0 +1,134 @@
+'''
+Streaming parser of the iplt20.com auction pages, yields one typed `Sale` per sold player, year by year
+
+The layout of the sold players tables changed over the seasons, every era is a `TableSchema` in SCHEMAS keyed by
+its first auction year, a new layout is a new entry rather than a new branch. Years are fetched and parsed
+concurrently and yielded in order, `sales_frame` collects the records straight into the auction frame.
+'''
+import bisect
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+import pandas as pd
+from lxml.cssselect import CSSSelector
+from . import fetch
+from .cricbuzz import parse_page
+
+AUCTION_URL = 'https://www.iplt20.com/auction/{}'
+# sold players tables without team name, the team is the h2 heading before each table
+# pattern = f'#autab{id_num} :nth-child(1) tbody' if start_year < 2022 else '.ih-pt-tab-bg :nth-child(1) tbody'
+TABLE_SELECTOR = CSSSelector('.ih-pt-tab-bg :nth-child(1) tbody', translator='html')
+# old teams are merged into the franchises that have taken over for data purity
+TEAM_ALIASES = {
+    'kings-xi-punjab': 'punjab-kings',
+    'deccan-chargers': 'sunrisers-hyderabad',
+    'delhi-daredevils': 'delhi-capitals',
+    'rising-pune-supergiant': 'lucknow-super-giants',
+    'pune-warriors-india': 'lucknow-super-giants',
+    'royal-challengers-bangalore': 'royal-challengers-bengaluru',
+    'gujarat-lions': 'gujarat-titans',
+}
+
+class Sale(NamedTuple):
+    player: str
+    role: str
+    team: str
+    year: int
+    price: int
+
+class TableSchema(NamedTuple):
+    # cells of a table row after the optional serial number cell, None for the cells that are not used
+    cells: tuple
+    # price currency to inr, 2013 prices are in usd
+    rate: int = 1
+
+    def width(self, start):
+        return start + len(self.cells)
+
+SCHEMAS = {
+    # 2013 usd to inr exchange rate 58
+    2013: TableSchema(('player', 'role', 'price'), rate=58),
+    2014: TableSchema(('player', 'role', 'price')),
+    # a nationality column was added in 2022
+    2022: TableSchema(('player', None, 'role', 'price')),
+    # no role since 2025
+    2025: TableSchema(('player', None, 'price', None, None)),
+}
+SCHEMA_YEARS = sorted(SCHEMAS)
+
+def schema_for(year) -> TableSchema:
+    i = bisect.bisect_right(SCHEMA_YEARS, year) - 1
+    if i < 0:
+        raise ValueError(f'No auction table schema for {year}')
+    return SCHEMAS[SCHEMA_YEARS[i]]
+
+def clean_text(text):
+    # remove intermediate spaces (if any)
+    return ' '.join(text.split())
+
+def parse_price(text, rate=1) -> int:
+    text = text.strip()
+    if text.startswith('₹'):
+        text = text[1:]
+    return int(text.replace(',', '')) * rate
+
+def team_name(table, current_teams):
+    heading = table.xpath('preceding::h2[1]')
+    if not heading:
+        return None
+    name = heading[0].text_content().lower().strip().replace(' ', '-')
+    name = TEAM_ALIASES.get(name, name)
+    if name not in current_teams:
+        print(f'Skipping team: {name}')
+        return None
+    return name
+
+def parse_sales(content, year, current_teams):
+    '''
+    Sales of one auction page, in page order
+    '''
+    doc = parse_page(content)
+    if doc is None:
+        return
+    schema = schema_for(year)
+    # the last table is not one of the teams' sold players
+    for table in TABLE_SELECTOR(doc)[:-1]:
+        team = team_name(table, current_teams)
+        if team is None:
+            continue
+        cells = [td.text_content() for td in table.iter('td')]
+        if not cells:
+            continue
+        start = 1 if cells[0].strip().isdigit() else 0
+        width = schema.width(start)
+        for i in range(start, len(cells) - width + start + 1, width):
+            row = dict(zip(schema.cells, cells[i:i + width - start]))
+            yield Sale(
+                clean_text(row['player']),
+                clean_text(row.get('role', '')),
+                team,
+                year,
+                parse_price(row['price'], schema.rate),
+            )
+
+def fetch_sales(year, current_teams) -> list:
+    r = fetch.get(AUCTION_URL.format(year))
+    if r.status_code != 200:
+        return []
+    return list(parse_sales(r.content, year, current_teams))
+
+def iter_sales(years, current_teams, workers=4):
+    '''
+    Sales of every auction year in `years` order, up to `workers` years are fetched and parsed at once
+    '''
+    years = list(years)
+    if workers <= 1 or len(years) <= 1:
+        for year in years:
+            yield from fetch_sales(year, current_teams)
+        return
+    with ThreadPoolExecutor(max_workers=min(workers, len(years))) as executor:
+        for sales in executor.map(lambda year: fetch_sales(year, current_teams), years):
+            yield from sales
+
+def sales_frame(sales) -> pd.DataFrame:
+    # one column per Sale field, an empty frame keeps the columns
+    return pd.DataFrame.from_records(list(sales), columns=Sale._fields)
@@ -0,0 +1,66 @@
+'''
+Concurrent crawl engine to fetch many cricbuzz player profiles in parallel under a per host rate limit
+'''
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .cricbuzz import PROFILE_URL, Player
+from . import identity, ratelimit, trace
+
+def fetch_indexed(name):
+    '''
+    Player of an already resolved name without any search engine call, None when the index can not resolve it
+    '''
+    pid, kind = identity.index.lookup(name)
+    trace.count('identity_lookups', kind=kind)
+    if pid is None:
+        return None
+    p = Player(link=PROFILE_URL.format(pid))
+    if p.info is None:
+        return None
+    # the fetched profile of a fuzzy match has to carry a name of the same player, anything else is searched
+    # instead of being saved as an alias
+    if kind == 'fuzzy' and not identity.same_player(p.name, name):
+        return None
+    identity.index.add(name, p.name, p.id)
+    return p
+
+@trace.traced('crawl.player')
+def fetch_player(name):
+    p = fetch_indexed(name)
+    if p is not None:
+        return p
+    p = Player(name, True)
+    # some players are better searched using their lastnames
+    if p.bat_stats is None or p.bowl_stats is None:
+        last_name = name.split()[-1]
+        if last_name != name:
+            p_tmp = Player(last_name)
+            first_name = p_tmp.name.split()[0]
+            if p.name.startswith(first_name):
+                p = p_tmp
+    if p.id is not None and p.info is not None:
+        identity.index.add(name, p.name, p.id)
+    return p
+
+def crawl_players(names, workers=8, rate=1.0, burst=1, fetch=fetch_player):
+    '''
+    Fetch every unique name with a pool of `workers` threads, at most `rate` requests per second per host.
+    Yields (name, player) in completion order, player is None when the profile could not be fetched.
+    '''
+    # the same player is sold in many auctions, fetch each name only once
+    unique_names = list(dict.fromkeys(names))
+    # bound to the pool threads only, other crawls and the app keep their own limiter
+    limiter = ratelimit.shared(rate, burst)
+
+    def fetch_limited(name):
+        with ratelimit.bound(limiter):
+            return fetch(name)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(fetch_limited, name): name for name in unique_names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                yield name, future.result()
+            except Exception as e:
+                print(f'Unable to fetch player stats: {name}, {e}')
+                yield name, None
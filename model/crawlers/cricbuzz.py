@@ -1,17 +1,94 @@
 '''
 Basic crawler to search a player using name and get player's T20I and IPL stats along with player info from cricbuzz
 '''
-import requests
+import lxml.html
 import pandas as pd
-from bs4 import BeautifulSoup
+from functools import lru_cache
 from googlesearch import search
+from lxml.cssselect import CSSSelector
 # from random import randint
 # from rapidfuzz import fuzz
-import requests
+from . import fetch, ratelimit, trace
+
+PROFILE_URL = 'https://www.cricbuzz.com/profiles/{}'
+SEARCH_URL = 'https://www.google.com/search'
+SERP_URL = 'https://realtime.oxylabs.io/v1/queries'
+
+# selectors are compiled to xpath once, a page is parsed once and every lookup runs in lxml
+# pattern = '.cb-lst-itm-sm:nth-child(13) , .cb-lst-itm-sm:nth-child(11) , .cb-lst-itm-sm:nth-child(9) , .cb-col-60:nth-child(7) , .cb-lst-itm-sm:nth-child(3)'
+INFO_SELECTOR = CSSSelector('.cb-font-40 , .cb-col-60:nth-child(7) , .cb-lst-itm-sm:nth-child(13) , .cb-lst-itm-sm:nth-child(9) , .cb-lst-itm-sm:nth-child(11) , .cb-lst-itm-sm:nth-child(3) , .cb-font-18', translator='html')
+# stats table layouts in the order they are tried, a layout matches when it finds a full batting and bowling table
+STATS_SELECTORS = [CSSSelector(pattern, translator='html') for pattern in (
+    # pattern = '.cb-font-12 .text-right , tr~ tr+ tr .text-right , tr~ tr+ tr .cb-col-8'
+    '.cb-plyr-th , tr~ tr+ tr .text-right , tr~ tr+ tr b',
+    # strange case where for some players the table DOM structure is slightly diff
+    '.cb-font-12 .text-right , tr+ tr .text-right , tr+ tr .cb-col-8',
+    # another case where stats table is not consistent
+    '.cb-plyr-thead .text-right , .cb-col-8',
+)]
+MIN_STATS_CELLS = 79
+# pages are utf-8, libxml2 would otherwise guess latin-1 for pages without a charset meta tag
+UTF8_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+def parse_page(content):
+    try:
+        return lxml.html.document_fromstring(content, parser=UTF8_PARSER)
+    except (lxml.etree.ParserError, ValueError):
+        return None
+
+def select_text(selector, root):
+    return [el.text_content().lower().strip() for el in selector(root)]
+
+@lru_cache(maxsize=None)
+def _layout(columns):
+    # players share the column tuple and position map of every table header they have in common
+    return columns, {c: i for i, c in enumerate(columns)}
+
+class StatTable:
+    '''
+    T20I and IPL rows of a batting or bowling career table, raw cell strings addressed by column name
+
+    Replaces the 2 row DataFrame per table, `to_frame` gives the same DataFrame for code that still wants one
+    '''
+    __slots__ = ('columns', 't20i', 'ipl', '_pos')
+    index = ('t20i', 'ipl')
+
+    def __init__(self, columns, t20i, ipl):
+        columns = tuple(columns)
+        if len(set(columns)) != len(columns):
+            raise ValueError(f'Duplicate stat columns: {columns}')
+        self.columns, self._pos = _layout(columns)
+        self.t20i = tuple(t20i[i] for i in range(len(columns)))
+        self.ipl = tuple(ipl[i] for i in range(len(columns)))
+
+    def row(self, fmt):
+        if fmt not in self.index:
+            raise KeyError(fmt)
+        return getattr(self, fmt)
+
+    def get(self, fmt, col):
+        return self.row(fmt)[self._pos[col]]
+
+    def values(self, fmt, cols) -> list:
+        row, pos = self.row(fmt), self._pos
+        return [row[pos[c]] for c in cols]
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([list(self.t20i), list(self.ipl)], index=list(self.index), columns=list(self.columns))
+
+    @property
+    def loc(self):
+        return self.to_frame().loc
+
+    def equals(self, other):
+        return isinstance(other, StatTable) and (self.columns, self.t20i, self.ipl) == (other.columns, other.t20i, other.ipl)
+
+    def __repr__(self):
+        return repr(self.to_frame())
 
 class Player:
     def __init__(self, name=None, crawl=False, link=None):
-        self._bs = None
+        self._doc = None
         self.id = None
         self.name = name
         self.country = None
@@ -31,7 +108,7 @@ class Player:
             pid = self.get(link=link)
         if pid is not None:
             self.id = pid
-            self._update_soup(pid)
+            self._update_doc(pid)
             self.info = self.get_info()
             self.bat_stats, self.bowl_stats = self.get_stats()
     
@@ -44,13 +121,16 @@ class Player:
         Bowling Stats: {self.bowl_stats}
         '''
     
-    def _update_soup(self, id):
-        url = f'https://www.cricbuzz.com/profiles/{id}'
-        r = requests.get(url)
+    def _update_doc(self, id):
+        url = PROFILE_URL.format(id)
+        with trace.span('crawl.fetch_profile'):
+            r = fetch.get(url)
         print(url, r.status_code)
+        trace.count('crawl_pages', status=r.status_code)
         if r.status_code != 200:
             return None
-        self._bs = BeautifulSoup(r.content, 'lxml')
+        with trace.span('crawl.parse_profile', bytes=len(r.content)):
+            self._doc = parse_page(r.content)
     
     def get_new(self, name):
         try:
@@ -63,9 +143,8 @@ class Player:
             }
 
             # Get response.
-            response = requests.request(
-                'POST',
-                'https://realtime.oxylabs.io/v1/queries',
+            response = fetch.post(
+                SERP_URL,
                 auth=('*****', '*****'),
                 json=payload,
             )
@@ -80,19 +159,35 @@ class Player:
     def get(self, name=None, link=None):
         try:
             if link is None and name is not None:
+                # the search engine is not cached, offline replays can only resolve links
+                if fetch.session.offline:
+                    return None
+                ratelimit.acquire(SEARCH_URL)
                 link = list(search(f'cricbuzz profile: {name}', num_results=1))[0]
             return link.split('profiles/')[-1].split('/', 1)[0]
         except Exception as e:
             print(f"Could not get cricbuzz link: {name}, {e}")
     
+    def _select_info(self):
+        return select_text(INFO_SELECTOR, self._doc)
+
+    def _select_stats(self):
+        # every layout runs on the whole page, their selectors match cells (div grids, ancestor classes) outside
+        # the stats tables. Narrowing them to a region is only exact when the region is found by a page wide scan
+        # for the same classes, which costs as much as the fallback layouts (bench_parse.py --chrome)
+        for selector in STATS_SELECTORS:
+            stats = select_text(selector, self._doc)
+            if len(stats) >= MIN_STATS_CELLS:
+                break
+        return stats
+
+    @trace.traced('crawl.get_info')
     def get_info(self, id=None):
-        if self._bs is None and id is None:
+        if self._doc is None and id is not None:
+            self._update_doc(id)
+        if self._doc is None:
             return None
-        elif self._bs is None and id is not None:
-            self._update_soup(id)
-        # pattern = '.cb-lst-itm-sm:nth-child(13) , .cb-lst-itm-sm:nth-child(11) , .cb-lst-itm-sm:nth-child(9) , .cb-col-60:nth-child(7) , .cb-lst-itm-sm:nth-child(3)'
-        pattern = '.cb-font-40 , .cb-col-60:nth-child(7) , .cb-lst-itm-sm:nth-child(13) , .cb-lst-itm-sm:nth-child(9) , .cb-lst-itm-sm:nth-child(11) , .cb-lst-itm-sm:nth-child(3) , .cb-font-18'
-        info = [i.get_text().lower().strip() for i in self._bs.select(pattern)]
+        info = self._select_info()
         if len(info) < 6:
             return None
         self.name = info[0]
@@ -119,23 +214,14 @@ class Player:
             'bowling_style': info[6].strip() if len(info) == 7 else ''
         }
 
+    @trace.traced('crawl.get_stats')
     def get_stats(self, id=None):
-        if self._bs is None and id is None:
+        if self._doc is None and id is not None:
+            self._update_doc(id)
+        if self._doc is None:
             return None, None
-        elif self._bs is None and id is not None:
-            self._update_soup(id)
         num_bat_stats = 13
-        # pattern = '.cb-font-12 .text-right , tr~ tr+ tr .text-right , tr~ tr+ tr .cb-col-8'
-        pattern = '.cb-plyr-th , tr~ tr+ tr .text-right , tr~ tr+ tr b'
-        stats = [i.get_text().lower().strip() for i in self._bs.select(pattern)]
-        # strange case where for some players the table DOM structure is slightly diff
-        if len(stats) < 79:
-            pattern = '.cb-font-12 .text-right , tr+ tr .text-right , tr+ tr .cb-col-8'
-            stats = [i.get_text().lower().strip() for i in self._bs.select(pattern)]
-        # another case where stats table is not consistent
-        if len(stats) < 79:
-            pattern = '.cb-plyr-thead .text-right , .cb-col-8'
-            stats = [i.get_text().lower().strip() for i in self._bs.select(pattern)]
+        stats = self._select_stats()
         
         # discard players that have no t20 and ipl stats so far
         # NOTE: handle cases where intl / domestic players with good local t20 records
@@ -145,7 +231,6 @@ class Player:
         # extract batting stats only for t20 and ipl
         i = num_bat_stats
         bat_feat_cols = stats[:i]
-        stat_idx = ['t20i', 'ipl']
         if 't20' in stats:
             i += 1
             bat_features = [stats[i:i+num_bat_stats]]
@@ -179,20 +264,7 @@ class Player:
             bowl_features.append(stats[i:i+num_bowl_stats])
         else:
             bowl_features.append([['-'] * num_bowl_stats])
-        # construct bat_df from dict
-        d = {}
-        for i in range(num_bat_stats):
-            for j in range(len(stat_idx)):
-                if bat_feat_cols[i] not in d:
-                    d[bat_feat_cols[i]] = []
-                d[bat_feat_cols[i]].append(bat_features[j][i])
-        bat_df = pd.DataFrame(d, index=stat_idx)
-        # construct bowl_df from dict
-        d = {}
-        for i in range(num_bowl_stats):
-            for j in range(len(stat_idx)):
-                if bowl_feat_cols[i] not in d:
-                    d[bowl_feat_cols[i]] = []
-                d[bowl_feat_cols[i]].append(bowl_features[j][i])
-        bowl_df = pd.DataFrame(d, index=stat_idx)
-        return bat_df, bowl_df
\ No newline at end of file
+        # short headers or rows raise like they did when the DataFrames were built
+        bat_stats = StatTable([bat_feat_cols[i] for i in range(num_bat_stats)], *bat_features)
+        bowl_stats = StatTable([bowl_feat_cols[i] for i in range(num_bowl_stats)], *bowl_features)
+        return bat_stats, bowl_stats
\ No newline at end of file
@@ -0,0 +1,150 @@
+'''
+Feature engineering shared by dataset building, training, serving and the dashboard
+'''
+import numpy as np
+import pandas as pd
+from . import trace
+
+# raw player feature vector as crawled from a cricbuzz profile
+PLAYER_COLUMNS = [
+    "name", "country", "age", "height", "role", "bat_style", "bowl_style", "t20_no", "t20_runs", "t20_avg", "t20_sr", "t20_50", "t20_4s", "t20_6s",
+    "ipl_no", "ipl_runs", "ipl_avg", "ipl_sr", "ipl_50", "ipl_4s", "ipl_6s", "t20_wkts", "t20_bowl_econ", "t20_bowl_avg", "t20_bowl_sr",
+    "ipl_wkts", "ipl_bowl_econ", "ipl_bowl_avg", "ipl_bowl_sr"
+]
+# columns appended for every auction the player was sold in
+AUCTION_COLUMNS = ["team", "year", "price"]
+# raw columns that are not used as model features
+DROP_COLUMNS = [
+    'height', 'bat_style', 'bowl_style', 't20_no', 't20_avg', 't20_50', 't20_4s', 'ipl_no', 'ipl_avg', 'ipl_50', 'ipl_4s',
+    't20_bowl_avg', 'ipl_bowl_avg'
+]
+# stats arrive as strings with '-' for "never played / bowled", parsed into STAT_DTYPE with '-' as 0
+STAT_COLUMNS = [
+    't20_runs', 't20_sr', 't20_6s', 'ipl_runs', 'ipl_sr', 'ipl_6s', 't20_wkts', 't20_bowl_econ', 't20_bowl_sr',
+    'ipl_wkts', 'ipl_bowl_econ', 'ipl_bowl_sr'
+]
+STAT_DTYPE = np.float32
+# merged career stats: t20i and ipl counts are summed, rates are averaged
+MERGED_COLUMNS = {
+    'total_runs': ('sum', 't20_runs', 'ipl_runs'),
+    'total_6s': ('sum', 't20_6s', 'ipl_6s'),
+    'total_sr': ('mean', 't20_sr', 'ipl_sr'),
+    'total_wkts': ('sum', 't20_wkts', 'ipl_wkts'),
+    'total_bowl_econ': ('mean', 't20_bowl_econ', 'ipl_bowl_econ'),
+    'total_bowl_sr': ('mean', 't20_bowl_sr', 'ipl_bowl_sr'),
+}
+# model inputs consumed by the ColumnTransformer of both models
+MODEL_NUM_COLS = ['age', 'year', 'total_runs', 'total_6s', 'total_sr', 'total_wkts', 'total_bowl_econ', 'total_bowl_sr']
+MODEL_ORD_COLS = ['country', 'role']
+
+def player_vector(player, year=None) -> list:
+    '''
+    Raw feature vector (PLAYER_COLUMNS) of a crawled cricbuzz player, age is taken w.r.t. the auction year when known
+    '''
+    features = [
+        player.name,
+        player.country,
+    ]
+    # process player info
+    for k,v in player.info.items():
+        if k == 'age':
+            features.append(year - player.yob if player.yob is not None and year is not None else int(v) if v is not None else None)
+        elif k != 'age' and k != 'height':
+            features.append(v.replace(' ', '-'))
+        else:
+            features.append(v)
+    # process player bat stats
+    bat_stat_cols = ['no', 'runs', 'avg', 'sr', '50', '4s', '6s']
+    features += player.bat_stats.values('t20i', bat_stat_cols)
+    features += player.bat_stats.values('ipl', bat_stat_cols)
+    # process player bowl stats
+    bowl_stat_cols = ['wkts', 'econ', 'avg', 'sr']
+    features += player.bowl_stats.values('t20i', bowl_stat_cols)
+    features += player.bowl_stats.values('ipl', bowl_stat_cols)
+    return features
+
+def parse_stats(values) -> np.ndarray:
+    '''
+    Parse a 2d block of raw stat cells into a STAT_DTYPE array in one pass, '-' becomes 0 and junk becomes NaN
+    '''
+    values = np.asarray(values)
+    if values.dtype.kind in 'fiu':
+        return values.astype(STAT_DTYPE, copy=False)
+    values = np.where(values == '-', 0.0, values.astype(object))
+    try:
+        return values.astype(STAT_DTYPE)
+    except (TypeError, ValueError):
+        # slow path for blocks holding missing or malformed cells
+        flat = pd.to_numeric(pd.Series(values.ravel(), dtype=object), errors='coerce')
+        return flat.to_numpy(STAT_DTYPE).reshape(values.shape)
+
+def merge_stats(stats: np.ndarray) -> np.ndarray:
+    '''
+    MERGED_COLUMNS computed from a parsed (n, len(STAT_COLUMNS)) stats array
+    '''
+    idx = {c: i for i, c in enumerate(STAT_COLUMNS)}
+    merged = np.empty((stats.shape[0], len(MERGED_COLUMNS)), dtype=STAT_DTYPE)
+    for j, (op, t20, ipl) in enumerate(MERGED_COLUMNS.values()):
+        if op == 'sum':
+            merged[:, j] = stats[:, idx[t20]] + stats[:, idx[ipl]]
+        else:
+            merged[:, j] = stats[:, idx[t20]] / 2 + stats[:, idx[ipl]] / 2
+    return merged
+
+@trace.traced('featurize.preprocess')
+def preprocess(df: pd.DataFrame, keep_name=False) -> pd.DataFrame:
+    # Drop unwanted columns, the parsed stats are replaced by their merged totals
+    drop = DROP_COLUMNS + STAT_COLUMNS if keep_name else ['name'] + DROP_COLUMNS + STAT_COLUMNS
+    merged = merge_stats(parse_stats(df[STAT_COLUMNS].to_numpy()))
+    # readers that projected the raw columns may not have loaded the dropped ones
+    processed_df = df.drop(drop, axis=1, errors='ignore')
+    for j, col in enumerate(MERGED_COLUMNS):
+        processed_df[col] = merged[:, j]
+    return processed_df
+
+@trace.traced('featurize.record')
+def featurize_record(record: dict) -> dict:
+    '''
+    Model input columns of a single raw record (PLAYER_COLUMNS + year) without building a DataFrame
+    '''
+    if all(col in record for col in MERGED_COLUMNS):
+        return check_row({col: record[col] for col in MODEL_NUM_COLS + MODEL_ORD_COLS})
+    merged = merge_stats(parse_stats([[record[col] for col in STAT_COLUMNS]]))[0]
+    featurized = {col: record[col] for col in MODEL_NUM_COLS + MODEL_ORD_COLS if col not in MERGED_COLUMNS}
+    featurized.update(zip(MERGED_COLUMNS, merged.tolist()))
+    return check_row(featurized)
+
+def check_row(row: dict) -> dict:
+    '''
+    Model input columns coerced to floats (numeric) and strings (ordinal), None stays missing. A value that is
+    neither raises ValueError / TypeError naming its column, before it can fail a whole batch of records.
+    '''
+    checked = {}
+    for col in MODEL_NUM_COLS + MODEL_ORD_COLS:
+        value = row[col]
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            checked[col] = None
+        elif isinstance(value, bool) or not isinstance(value, (str, int, float, np.number)):
+            raise TypeError(f'{col} must be a {"number" if col in MODEL_NUM_COLS else "string"}, got {value!r}')
+        elif col in MODEL_ORD_COLS:
+            checked[col] = str(value)
+        else:
+            try:
+                checked[col] = float(value)
+            except ValueError:
+                raise ValueError(f'{col} must be a number, got {value!r}') from None
+            # 'nan' strings are missing too, NaN is not valid json in the response
+            if np.isnan(checked[col]):
+                checked[col] = None
+    return checked
+
+def build_preprocessor():
+    '''
+    Unfitted ColumnTransformer that both the price regressor and the team classifier are trained with
+    '''
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import StandardScaler, OrdinalEncoder
+    return ColumnTransformer([
+        ('num_std_scaler', StandardScaler(), MODEL_NUM_COLS),
+        ('str_ord_enc', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1), MODEL_ORD_COLS)
+    ])
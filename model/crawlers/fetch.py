@@ -0,0 +1,196 @@
+'''
+Shared http fetch layer for all crawlers with keep-alive connection pooling, timeouts, retries and conditional GETs
+'''
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from . import ratelimit
+
+# status codes worth retrying, everything else is returned to the caller as is
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+class Page:
+    def __init__(self, url, status_code, content=b'', headers=None, revalidated=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        # servers differ in the case of header names (etag / ETag), lookups ignore it
+        self.headers = CaseInsensitiveDict(headers or {})
+        # True when the content was served from a previous response after a 304
+        self.revalidated = revalidated
+        # True when a cached copy can be served without revalidating it
+        self.fresh = False
+
+    def json(self):
+        return json.loads(self.content)
+
+class FetchStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes = 0
+        self.retries = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.cache_hits = 0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+
+    def observe(self, latency, nbytes):
+        with self._lock:
+            self.requests += 1
+            self.bytes += nbytes
+            self.latency_sum += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    self.latency_buckets[i] += 1
+                    break
+
+    def incr(self, counter, n=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'bytes': self.bytes,
+                'retries': self.retries,
+                'errors': self.errors,
+                'not_modified': self.not_modified,
+                'cache_hits': self.cache_hits,
+                'latency_sum': self.latency_sum,
+                'latency_histogram': dict(zip([str(b) for b in LATENCY_BUCKETS], self.latency_buckets)),
+            }
+
+class ValidatorCache:
+    '''
+    In memory LRU of the last responses that carried an ETag or Last-Modified header
+    '''
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def store(self, url, page):
+        if 'ETag' not in page.headers and 'Last-Modified' not in page.headers:
+            return
+        with self._lock:
+            self._entries[url] = page
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class FetchSession:
+    def __init__(self, timeout=(5, 30), retries=3, backoff=0.5, max_backoff=30, pool_size=32, cache=None, offline=False, headers=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # any object with lookup(key) / store(key, page), e.g. the on disk page_cache.PageCache
+        self.cache = cache if cache is not None else ValidatorCache()
+        # replay only from the cache, misses are answered with a 504 and nothing goes to the network
+        self.offline = offline
+        self.stats = FetchStats()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        if headers:
+            self._session.headers.update(headers)
+
+    def _delay(self, attempt, response=None):
+        # honour Retry-After (in seconds) on 429 / 503, exponential backoff otherwise
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(self.max_backoff, int(retry_after))
+        return min(self.max_backoff, self.backoff * 2 ** attempt)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.retries + 1):
+            ratelimit.acquire(url)
+            start = time.perf_counter()
+            try:
+                r = self._session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self.stats.incr('errors')
+                if attempt == self.retries:
+                    raise
+                self.stats.incr('retries')
+                time.sleep(self._delay(attempt))
+                continue
+            self.stats.observe(time.perf_counter() - start, len(r.content))
+            if r.status_code in RETRY_STATUS and attempt < self.retries:
+                self.stats.incr('retries')
+                time.sleep(self._delay(attempt, r))
+                continue
+            return Page(url, r.status_code, r.content, r.headers)
+
+    def get(self, url, **kwargs):
+        cached = self.cache.lookup(url)
+        if cached is not None and (cached.fresh or self.offline):
+            self.stats.incr('cache_hits')
+            return cached
+        if self.offline:
+            return Page(url, 504)
+        if cached is not None:
+            headers = dict(kwargs.pop('headers', None) or {})
+            if cached.headers.get('ETag'):
+                headers['If-None-Match'] = cached.headers['ETag']
+            if cached.headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = cached.headers['Last-Modified']
+            kwargs['headers'] = headers
+        page = self.request('GET', url, **kwargs)
+        if page.status_code == 304 and cached is not None:
+            self.stats.incr('not_modified')
+            page = Page(url, 200, cached.content, cached.headers, revalidated=True)
+        if page.status_code == 200:
+            self.cache.store(url, page)
+        return page
+
+    def post(self, url, **kwargs):
+        # json queries (search api) are cached by url and payload
+        if 'json' not in kwargs:
+            return self.request('POST', url, **kwargs)
+        body = json.dumps(kwargs['json'], sort_keys=True).encode()
+        key = f'POST {url} {hashlib.sha256(body).hexdigest()}'
+        cached = self.cache.lookup(key)
+        if cached is not None and (cached.fresh or self.offline):
+            self.stats.incr('cache_hits')
+            return cached
+        if self.offline:
+            return Page(url, 504)
+        page = self.request('POST', url, **kwargs)
+        if page.status_code == 200:
+            self.cache.store(key, page)
+        return page
+
+# one pooled session shared by every crawler module
+session = FetchSession()
+
+def configure(**kwargs):
+    global session
+    session = FetchSession(**kwargs)
+    return session
+
+def get(url, **kwargs):
+    return session.get(url, **kwargs)
+
+def post(url, **kwargs):
+    return session.post(url, **kwargs)
@@ -0,0 +1,135 @@
+'''
+Cross validation engine of the feature selection experiments (rfe.py, feature_selection.py)
+
+The fold splits, the preprocessed train / test matrices of every fold and the per fold feature scores (mutual
+information, f statistics, RFE rankings) are computed once and shared by every candidate of a sweep, a sweep over
+the number of selected features k then only fits the final estimator per (k, fold) instead of rescaling,
+re-encoding and rescoring the features for every k. Folds are evaluated in a process pool that receives the fold
+matrices once.
+
+Scores are those of cross_val_score of the equivalent Pipeline(transformer, SelectKBest / RFE, estimator), as long
+as the score functions and estimators are deterministic (a fixed random_state).
+'''
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sklearn.base import clone
+from sklearn.feature_selection import RFE
+from sklearn.metrics import check_scoring
+from sklearn.utils import _safe_indexing
+
+# fold matrices of a pool worker, sent once by the pool initializer instead of with every task
+_folds = None
+
+def _init_worker(folds):
+    global _folds
+    _folds = folds
+
+def _run_on_fold(job):
+    fn, i, args = job
+    return fn(i, _folds[i], *args)
+
+def top_k(scores, k):
+    '''
+    Mask of the `k` best scored features, ties and nan scores are handled like SelectKBest
+    '''
+    scores = np.array(scores, dtype=float)
+    scores[np.isnan(scores)] = np.finfo(scores.dtype).min
+    mask = np.zeros(len(scores), dtype=bool)
+    if k > 0:
+        mask[np.argsort(scores, kind='mergesort')[-k:]] = True
+    return mask
+
+def rfe_ranking(X, y, estimator, step=1):
+    '''
+    Negated RFE ranking of eliminating down to a single feature. With step=1 every RFE(n_features_to_select=k)
+    follows the same elimination, so top_k of this ranking is the support of RFE(n_features_to_select=k)
+    '''
+    return -RFE(clone(estimator), n_features_to_select=1, step=step).fit(X, y).ranking_
+
+def _fold_scores(i, fold, score_func):
+    X_train, _, y_train, _ = fold
+    scores = score_func(X_train, y_train)
+    # f_regression / f_classif return (scores, p values)
+    return np.asarray(scores[0] if isinstance(scores, tuple) else scores, dtype=float)
+
+def _fold_sweep(i, fold, estimator, masks, scoring):
+    X_train, X_test, y_train, y_test = fold
+    scores = {s: [] for s in scoring}
+    for name in masks:
+        mask = masks[name][i]
+        est = clone(estimator).fit(X_train[:, mask], y_train)
+        for s in scoring:
+            scores[s].append(check_scoring(est, s)(est, X_test[:, mask], y_test))
+    return scores
+
+class FoldEngine:
+    def __init__(self, X, y, cv, transformer=None, workers=None):
+        self.splits = list(cv.split(X, y))
+        self.workers = workers or os.cpu_count() or 1
+        self.folds = [self._fold(X, y, train, test, transformer) for train, test in self.splits]
+        self._scores = {}
+        self._executor = None
+
+    @staticmethod
+    def _fold(X, y, train, test, transformer):
+        X_train, X_test = _safe_indexing(X, train), _safe_indexing(X, test)
+        y_train, y_test = np.asarray(_safe_indexing(y, train)), np.asarray(_safe_indexing(y, test))
+        if transformer is not None:
+            # fitted on the training rows of the fold only, like the first step of a Pipeline
+            transformer = clone(transformer)
+            X_train = transformer.fit_transform(X_train, y_train)
+            X_test = transformer.transform(X_test)
+        return np.asarray(X_train), np.asarray(X_test), y_train, y_test
+
+    @property
+    def n_features(self):
+        return self.folds[0][0].shape[1]
+
+    def map_folds(self, fn, *args):
+        '''
+        [fn(i, fold, *args) for every fold], in the process pool when there is more than one worker
+        '''
+        if self.workers == 1:
+            return [fn(i, fold, *args) for i, fold in enumerate(self.folds)]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.folds,))
+        return list(self._executor.map(_run_on_fold, [(fn, i, args) for i in range(len(self.folds))]))
+
+    def feature_scores(self, name, score_func=None):
+        '''
+        Scores of score_func(X_train, y_train) of every fold, computed once per `name`
+        '''
+        if name not in self._scores:
+            if score_func is None:
+                raise KeyError(f'No feature scores named {name}')
+            self._scores[name] = self.map_folds(_fold_scores, score_func)
+        return self._scores[name]
+
+    def sweep(self, estimator, masks, scoring):
+        '''
+        Test scores of `estimator` fitted on every fold for every candidate of `masks` (name -> feature mask per
+        fold). Returns name -> fold scores, or scoring -> name -> fold scores when `scoring` is a list
+        '''
+        scorings = [scoring] if isinstance(scoring, str) else list(scoring)
+        results = self.map_folds(_fold_sweep, estimator, masks, scorings)
+        scores = {s: {name: np.array([r[s][j] for r in results]) for j, name in enumerate(masks)} for s in scorings}
+        return scores[scoring] if isinstance(scoring, str) else scores
+
+    def select_k(self, estimator, name, ks, scoring):
+        '''
+        `sweep` of the top k features of the `name` feature scores for every k of `ks`
+        '''
+        masks = {k: [top_k(scores, k) for scores in self.feature_scores(name)] for k in ks}
+        return self.sweep(estimator, masks, scoring)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,209 @@
+'''
+Persistent player name -> cricbuzz profile id index, names are only searched on google / oxylabs when the index
+can not resolve them
+
+Auction names ("Christopher Morris") are aliases of the cricbuzz name ("chris morris") that owns the profile id.
+A name resolves through its alias, the cricbuzz name itself or a fuzzy match against the cricbuzz names with a
+known id and the same last name (a compatible first name or a near identical spelling).
+
+    python -m crawlers.identity --store ./player_cache.db --data ../data/data.csv --page-cache ./page_cache
+'''
+import argparse
+import difflib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+import pandas as pd
+
+# first names of a fuzzy match have to be more similar than this (mohammed / mohammad), only names with the same
+# last name are compared. Whole names of different players are often as close (sam / tom curran, kuldeep / kuldip
+# yadav), they are never compared
+FUZZY_CUTOFF = 0.8
+
+def normalize(name):
+    '''
+    Case, accent, punctuation and whitespace insensitive form of a player name
+    '''
+    name = unicodedata.normalize('NFKD', str(name))
+    name = ''.join(c for c in name if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', name).split())
+
+def compatible_first_names(a, b):
+    # chris / christopher, ab / abraham, j / jos
+    return a.startswith(b) or b.startswith(a)
+
+def similar_first_names(a, b):
+    # spellings of one first name (mohammed / mohammad, nicholas / nicolas), not kuldeep / kuldip or
+    # mandeep / ramandeep, the initial always has to match
+    return a[:1] == b[:1] and difflib.SequenceMatcher(None, a, b).ratio() > FUZZY_CUTOFF
+
+def same_player(a, b):
+    '''
+    True when two names can be the same player: same last name and a compatible or similarly spelled first name
+    '''
+    a, b = normalize(a).split(), normalize(b).split()
+    if not a or not b or a[-1] != b[-1]:
+        return False
+    return compatible_first_names(a[0], b[0]) or similar_first_names(a[0], b[0])
+
+class IdentityIndex:
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.RLock()
+        # every crawler process of a work queue shares the index file: readers never block the writer and a
+        # writer waits for the lock instead of failing with 'database is locked'
+        self._db = sqlite3.connect(path or ':memory:', timeout=60, check_same_thread=False)
+        if path:
+            self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS ids (name TEXT PRIMARY KEY, pid TEXT)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS aliases (alias TEXT PRIMARY KEY, name TEXT NOT NULL)')
+        self._db.commit()
+        # normalized cricbuzz name -> profile id (None while unknown), normalized alias -> normalized cricbuzz name
+        self._ids = dict(self._db.execute('SELECT name, pid FROM ids'))
+        self._aliases = dict(self._db.execute('SELECT alias, name FROM aliases'))
+        self._by_last_name = {}
+        for name in self._ids:
+            self._by_last_name.setdefault(name.split()[-1], set()).add(name)
+        self.stats = {'alias': 0, 'exact': 0, 'fuzzy': 0, 'miss': 0}
+
+    def __len__(self):
+        return sum(pid is not None for pid in self._ids.values())
+
+    def _add(self, alias, name, pid):
+        alias, name = normalize(alias), normalize(name)
+        if not name:
+            return
+        pid = None if pid is None else str(pid)
+        # a known id is never dropped by a later add without one
+        if name not in self._ids or (pid is not None and self._ids[name] != pid):
+            self._ids[name] = pid if pid is not None else self._ids.get(name)
+            self._db.execute('INSERT OR REPLACE INTO ids VALUES (?, ?)', (name, self._ids[name]))
+            self._by_last_name.setdefault(name.split()[-1], set()).add(name)
+        if alias and alias != name and self._aliases.get(alias) != name:
+            self._aliases[alias] = name
+            self._db.execute('INSERT OR REPLACE INTO aliases VALUES (?, ?)', (alias, name))
+
+    def add(self, alias, name, pid=None):
+        '''
+        Record that `alias` is the cricbuzz player `name`, with its profile id when known
+        '''
+        with self._lock, self._db:
+            self._add(alias, name, pid)
+
+    def add_many(self, rows):
+        '''
+        `add` every (alias, name, profile id) in one transaction
+        '''
+        rows = list(rows)
+        with self._lock, self._db:
+            for alias, name, pid in rows:
+                self._add(alias, name, pid)
+
+    def _fuzzy(self, key):
+        parts = key.split()
+        known = [name for name in self._by_last_name.get(parts[-1], ()) if self._ids.get(name) is not None]
+        # same last name and a first name that is a prefix of the other, else a near identical first name,
+        # it has to be unambiguous
+        for same_first_name in (compatible_first_names, similar_first_names):
+            matches = [name for name in known if same_first_name(name.split()[0], parts[0])]
+            if matches:
+                return matches[0] if len(matches) == 1 else None
+        return None
+
+    def lookup(self, name):
+        '''
+        (profile id, how it was resolved) of `name`, the id is None when only an external search can find it
+        '''
+        key = normalize(name)
+        with self._lock:
+            if self._ids.get(self._aliases.get(key)) is not None:
+                kind, pid = 'alias', self._ids[self._aliases[key]]
+            elif self._ids.get(key) is not None:
+                kind, pid = 'exact', self._ids[key]
+            else:
+                match = self._fuzzy(key) if key else None
+                kind, pid = ('miss', None) if match is None else ('fuzzy', self._ids[match])
+            self.stats[kind] += 1
+        return pid, kind
+
+    def resolve(self, name):
+        return self.lookup(name)[0]
+
+    def preload_store(self, store):
+        '''
+        Aliases of every crawled player in a `PlayerStore`, the auction name maps to the cricbuzz name
+        '''
+        self.add_many((alias, features[0], None) for alias, (features, _) in store.items())
+
+    def preload_names(self, names):
+        # cricbuzz names without ids (e.g. data.csv) still become known canonical names
+        self.add_many((name, name, None) for name in names)
+
+    def preload_pages(self, page_cache):
+        '''
+        Profile ids of every cricbuzz profile saved in a `PageCache`, named by the page's player name
+        '''
+        from . import cricbuzz
+        known = set(pid for pid in self._ids.values() if pid is not None)
+        rows = []
+        for key in page_cache.keys(cricbuzz.PROFILE_URL.format('%')):
+            pid = key.split('profiles/')[-1].split('/', 1)[0]
+            if pid in known:
+                continue
+            page = page_cache.lookup(key)
+            doc = None if page is None else cricbuzz.parse_page(page.content)
+            names = [] if doc is None else cricbuzz.INFO_SELECTOR(doc)
+            if names:
+                rows.append((names[0].text_content(), names[0].text_content(), pid))
+                known.add(pid)
+        # parsed before the write, the index is locked for one short transaction only
+        self.add_many(rows)
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def summary(self):
+        return {'aliases': len(self._aliases), 'players': len(self._ids), 'profile_ids': len(self), **self.stats}
+
+# shared by every crawl thread, in memory until a persistent index is configured
+index = IdentityIndex()
+
+def configure(path='./player_ids.db'):
+    '''
+    Replace the shared index by a persistent one, the previous index is returned
+    '''
+    global index
+    previous = index
+    index = IdentityIndex(path)
+    return previous
+
+def preload(store=None, page_cache=None, data_file=None, path='./player_ids.db'):
+    '''
+    Configure the shared index at `path` and fill it from a player store, a page cache and a data.csv
+    '''
+    configure(path)
+    if store is not None:
+        index.preload_store(store)
+    if data_file is not None and os.path.isfile(data_file):
+        index.preload_names(pd.read_csv(data_file, usecols=['name'])['name'].unique())
+    if page_cache is not None:
+        index.preload_pages(page_cache)
+    print(f'Identity index: {index.summary()}')
+    return index
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Preload the player identity index from existing crawls')
+    parser.add_argument('--index', default='./player_ids.db')
+    parser.add_argument('--store', default='./player_cache.db', help='player store (imports player_cache.json)')
+    parser.add_argument('--data', default='../data/data.csv')
+    parser.add_argument('--page-cache', default='./page_cache')
+    args = parser.parse_args()
+    from .page_cache import PageCache
+    from .store import PlayerStore
+    with PlayerStore(args.store) as store:
+        page_cache = PageCache(args.page_cache) if os.path.isdir(args.page_cache) else None
+        preload(store, page_cache, args.data, args.index).close()
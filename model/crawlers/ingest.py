@@ -0,0 +1,113 @@
+'''
+Incremental season ingestion, a post auction refresh only fetches the auction years and player profiles that are
+not materialized yet instead of rebuilding auction_data.csv and data.csv from scratch
+
+Materialized seasons are recorded in the player store, a dataset built before they were recorded is seeded from
+the years present in auction_data.csv. Refreshed seasons replace their rows in auction_data.csv (upsert by year).
+
+    python -m crawlers.ingest
+    python -m crawlers.ingest --years 2026 --workers 8
+    python -m crawlers.ingest --years 2026 --refresh-players    # also recrawl the returning players
+'''
+import argparse
+import json
+import os
+import time
+import pandas as pd
+from datetime import datetime
+from . import fetch, identity, storage
+from .ipl import assemble_dataset, auction_years, get_sold_players, update_players
+from .page_cache import PageCache
+from .store import PlayerStore
+
+SEASONS_KEY = 'seasons'
+
+def materialized_seasons(player_cache: PlayerStore, auction_df=None) -> set:
+    seasons = player_cache.meta(SEASONS_KEY)
+    if seasons is not None:
+        return set(json.loads(seasons))
+    if auction_df is None:
+        return set()
+    return set(int(y) for y in auction_df.year.unique())
+
+def record_seasons(player_cache: PlayerStore, seasons):
+    player_cache.meta(SEASONS_KEY, json.dumps(sorted(int(y) for y in seasons)))
+
+def pending_seasons(seasons) -> list:
+    # the running year is fetched again until its auction is over, revalidation keeps an unchanged page cheap
+    current_year = datetime.now().year
+    return [y for y in auction_years() if y not in seasons or y == current_year]
+
+def upsert_seasons(auction_df, season_df):
+    '''
+    Replace the rows of every season in `season_df`, rows stay ordered by auction year
+    '''
+    if auction_df is None:
+        return season_df.reset_index(drop=True)
+    kept = auction_df[~auction_df.year.isin(season_df.year.unique())]
+    df = pd.concat([kept, season_df], ignore_index=True)
+    return df.sort_values('year', kind='stable').reset_index(drop=True)
+
+def changed_players(auction_df, season_df) -> set:
+    '''
+    Players of `season_df` whose sales rows (team, year, price) are not in `auction_df` yet, e.g. new buys of the
+    running auction, the sales of a season fetched again are otherwise unchanged
+    '''
+    keys = ['player', 'team', 'year', 'price']
+    if auction_df is None:
+        return set(season_df.player)
+    rows = season_df[keys].merge(auction_df[keys].drop_duplicates(), on=keys, how='left', indicator=True)
+    return set(rows.player[rows['_merge'] == 'left_only'])
+
+def refresh(years=None, workers=8, rate=1.0, cache_dir='./page_cache', offline=False, refresh_players=False,
+            auction_fname='auction_data.csv', data_fname='data.csv') -> dict:
+    '''
+    Fetch the missing (or the given) auction years, crawl the players that are not in the player store or whose
+    sales changed and write the updated auction and feature datasets. With `refresh_players` every player sold in
+    those seasons is recrawled, their career stats have changed since they were first crawled.
+    '''
+    start = time.perf_counter()
+    page_cache = PageCache(cache_dir)
+    fetch.configure(cache=page_cache, offline=offline)
+    player_cache = PlayerStore()
+    # names resolved by earlier crawls are fetched by profile id without a search engine lookup
+    identity.preload(player_cache, page_cache, data_fname)
+    auction_df = pd.read_csv(auction_fname) if os.path.isfile(auction_fname) else None
+    seasons = materialized_seasons(player_cache, auction_df)
+    years = pending_seasons(seasons) if years is None else sorted(years)
+    summary = {'seasons': [], 'rows': 0, 'players': 0}
+
+    season_df = get_sold_players(years, workers)
+    # a season without sold players (no auction yet or a failed fetch) keeps its current rows
+    fetched = sorted(int(y) for y in season_df.year.unique())
+    if fetched:
+        changed = changed_players(auction_df, season_df)
+        auction_df = upsert_seasons(auction_df, season_df)
+        storage.save(auction_df, auction_fname)
+        # the running season is fetched on every refresh, its unchanged sales crawl nobody
+        stale = season_df.player[~season_df.player.isin(list(player_cache)) | season_df.player.isin(changed)]
+        names = season_df.player if refresh_players else stale
+        summary['players'] = update_players(auction_df, names, player_cache, workers, rate)
+        df = assemble_dataset(auction_df, player_cache)
+        storage.save(df, data_fname)
+        print(f'Assembled {df.shape[0]} / {auction_df.shape[0]} auction rows')
+        summary.update(seasons=fetched, rows=int(season_df.shape[0]))
+    record_seasons(player_cache, seasons | set(fetched))
+    player_cache.close()
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+    print(f'Refreshed seasons {fetched or "none"} of {years}: {summary}')
+    print(f'Fetch stats: {fetch.session.stats.snapshot()}')
+    print(f'Identity index: {identity.index.summary()}')
+    return summary
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fetch new IPL auction seasons into auction_data.csv / data.csv')
+    parser.add_argument('--years', type=int, nargs='+', help='seasons to (re)fetch, defaults to the missing ones')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent profile fetches')
+    parser.add_argument('--rate', type=float, default=1.0, help='requests per second per host')
+    parser.add_argument('--cache-dir', default='./page_cache')
+    parser.add_argument('--offline', action='store_true', help='serve pages from the page cache only')
+    parser.add_argument('--refresh-players', action='store_true',
+                        help='recrawl every player sold in the fetched seasons, not only new and changed ones')
+    args = parser.parse_args()
+    refresh(args.years, args.workers, args.rate, args.cache_dir, args.offline, args.refresh_players)
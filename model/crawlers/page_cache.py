@@ -0,0 +1,124 @@
+'''
+Persistent compressed cache of raw crawled pages keyed by url, with per domain TTLs and LRU eviction under a size cap
+'''
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from urllib.parse import urlparse
+from .fetch import Page
+
+DAY = 24 * 60 * 60
+# lower case name -> canonical name of the response headers kept with a page, the validators of a revalidation
+CACHED_HEADERS = {'etag': 'ETag', 'last-modified': 'Last-Modified', 'content-type': 'Content-Type'}
+
+class TTLPolicy:
+    '''
+    Seconds a cached page stays fresh, None means it never expires
+    '''
+    auction_url = re.compile(r'iplt20\.com/auction/(\d{4})')
+
+    def __init__(self, domain_ttls=None, default=DAY):
+        self.domain_ttls = {
+            # profiles change every match during the season
+            'www.cricbuzz.com': DAY,
+            # search results for a player name rarely change
+            'realtime.oxylabs.io': 30 * DAY,
+            'www.iplt20.com': DAY,
+        }
+        self.domain_ttls.update(domain_ttls or {})
+        self.default = default
+
+    def __call__(self, url):
+        m = self.auction_url.search(url)
+        # results of past auctions never change
+        if m is not None and int(m.group(1)) < datetime.now().year:
+            return None
+        return self.domain_ttls.get(urlparse(url).netloc, self.default)
+
+class PageCache:
+    def __init__(self, root='./page_cache', max_bytes=512 * 1024 * 1024, ttl=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl or TTLPolicy()
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, 'index.sqlite'), check_same_thread=False)
+        self._db.execute('''CREATE TABLE IF NOT EXISTS pages (
+            key TEXT PRIMARY KEY, url TEXT, digest TEXT, size INTEGER, headers TEXT,
+            fetched_at REAL, accessed_at REAL, expires_at REAL)''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)')
+        self._db.commit()
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest[2:])
+
+    def lookup(self, key):
+        with self._lock:
+            row = self._db.execute('SELECT url, digest, headers, expires_at FROM pages WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            url, digest, headers, expires_at = row
+            try:
+                with open(self._blob_path(digest), 'rb') as f:
+                    content = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                self._db.execute('DELETE FROM pages WHERE key = ?', (key,))
+                self._db.commit()
+                return None
+            self._db.execute('UPDATE pages SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            self._db.commit()
+        page = Page(url, 200, content, json.loads(headers))
+        page.fresh = expires_at is None or expires_at > time.time()
+        return page
+
+    def keys(self, url_like='%'):
+        with self._lock:
+            return [key for key, in self._db.execute('SELECT key FROM pages WHERE url LIKE ? ORDER BY key', (url_like,))]
+
+    def store(self, key, page):
+        # identical bodies (e.g. the same profile under two urls) share one compressed blob
+        digest = hashlib.sha256(page.content).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(zlib.compress(page.content, 6))
+            os.replace(tmp, path)
+        ttl = self.ttl(page.url)
+        now = time.time()
+        # header names are case insensitive, they are stored under their canonical spelling
+        headers = {CACHED_HEADERS[k.lower()]: v for k, v in page.headers.items() if k.lower() in CACHED_HEADERS}
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)', (
+                key, page.url, digest, os.path.getsize(path), json.dumps(headers), now, now,
+                None if ttl is None else now + ttl
+            ))
+            self._db.commit()
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, digest, size in self._db.execute('SELECT key, digest, size FROM pages ORDER BY accessed_at').fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute('DELETE FROM pages WHERE key = ?', (key,))
+            if self._db.execute('SELECT 1 FROM pages WHERE digest = ? LIMIT 1', (digest,)).fetchone() is None:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+            total -= size
+        self._db.commit()
+
+    def size(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages').fetchone()
@@ -0,0 +1,123 @@
+'''
+Shared cache of player predictions keyed by (cricbuzz profile id, auction year, model version)
+
+Entries expire after `ttl` seconds (career stats change after every match) and the least recently used entry is
+evicted beyond `max_entries`. Concurrent misses of the same key are computed once, the other callers wait for that
+result instead of fetching the profile and running the models again, e.g. many analysts scoring the same marquee
+player during an auction.
+'''
+import re
+import threading
+import time
+from collections import OrderedDict
+
+PROFILE_ID = re.compile(r'profiles/(\d+)(?:[/?#]|$)')
+
+def profile_id(url):
+    '''
+    Numeric cricbuzz profile id of a profile link (any host, scheme, slug or query), None for other links
+    '''
+    match = PROFILE_ID.search(str(url or '').strip())
+    return match.group(1) if match else None
+
+def cache_key(url, year, model_version):
+    pid = profile_id(url)
+    return None if pid is None else (pid, int(year), model_version)
+
+class PredictionCache:
+    def __init__(self, max_entries=1024, ttl=3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        # key -> (expires at, value), oldest access first
+        self._entries = OrderedDict()
+        # key -> Event of the computation in flight
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= self.clock():
+            del self._entries[key]
+            self.expired += 1
+            entry = None
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def get(self, key):
+        with self._lock:
+            value = self._lookup(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if value is None:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        '''
+        Cached value of `key`, or compute() once for every concurrent caller. None results are not cached
+        '''
+        if key is None:
+            return compute()
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not None:
+                    self.hits += 1
+                    return value
+                event = self._inflight.get(key)
+                if event is None:
+                    self.misses += 1
+                    event = self._inflight[key] = threading.Event()
+                    break
+            # another caller computes this key, its result is read from the cache once it is done
+            event.wait()
+            with self._lock:
+                value = self._lookup(key)
+                if value is not None:
+                    self.hits += 1
+                    return value
+            # it failed or returned None, compute it here
+        try:
+            value = compute()
+            self.put(key, value)
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'expired': self.expired,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,115 @@
+'''
+Low latency predictions for the price regressor and team classifier pipelines
+
+The fitted `feat_pre` ColumnTransformer of each pipeline is compiled into plain numpy arrays so that a single
+player record is transformed once, without a DataFrame, and the transformed vector is shared by both models
+'''
+import numpy as np
+import pandas as pd
+from . import trace
+from .features import featurize_record
+
+class CompiledTransform:
+    '''
+    StandardScaler / OrdinalEncoder steps of a fitted ColumnTransformer as numpy arrays and lookup dicts
+    '''
+    def __init__(self, column_transformer):
+        self.steps = []
+        for name, transformer, columns in column_transformer.transformers_:
+            if transformer == 'drop' or len(columns) == 0:
+                continue
+            kind = type(transformer).__name__
+            if kind == 'StandardScaler':
+                n = len(columns)
+                mean = transformer.mean_ if transformer.mean_ is not None else np.zeros(n)
+                scale = transformer.scale_ if transformer.scale_ is not None else np.ones(n)
+                self.steps.append(('num', list(columns), (np.asarray(mean, dtype=float), np.asarray(scale, dtype=float))))
+            elif kind == 'OrdinalEncoder' and transformer.handle_unknown == 'use_encoded_value':
+                if any(pd.isna(c).any() for c in transformer.categories_):
+                    raise ValueError('OrdinalEncoder fitted with missing values can not be compiled')
+                lookups = [{c: float(i) for i, c in enumerate(cats)} for cats in transformer.categories_]
+                self.steps.append(('ord', list(columns), (lookups, list(transformer.categories_), float(transformer.unknown_value))))
+            else:
+                raise ValueError(f'Can not compile {kind} step {name}')
+
+    def __eq__(self, other):
+        if len(self.steps) != len(other.steps):
+            return False
+        for (kind, cols, params), (o_kind, o_cols, o_params) in zip(self.steps, other.steps):
+            if kind != o_kind or cols != o_cols:
+                return False
+            if kind == 'num' and not (np.allclose(params[0], o_params[0]) and np.allclose(params[1], o_params[1])):
+                return False
+            if kind == 'ord' and (params[0] != o_params[0] or params[2] != o_params[2]):
+                return False
+        return True
+
+    def transform_record(self, record: dict) -> np.ndarray:
+        row = []
+        for kind, cols, params in self.steps:
+            if kind == 'num':
+                mean, scale = params
+                # missing values (no birth date on the profile) are NaN, as in the DataFrame `transform`
+                values = [np.nan if record[c] is None else float(record[c]) for c in cols]
+                row.extend(((np.array(values) - mean) / scale).tolist())
+            else:
+                lookups, _, unknown = params
+                row.extend(lookup.get(record[c], unknown) for c, lookup in zip(cols, lookups))
+        return np.array([row])
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        blocks = []
+        for kind, cols, params in self.steps:
+            if kind == 'num':
+                mean, scale = params
+                blocks.append((df[cols].to_numpy(dtype=float) - mean) / scale)
+            else:
+                _, categories, unknown = params
+                block = np.empty((df.shape[0], len(cols)))
+                for j, (c, cats) in enumerate(zip(cols, categories)):
+                    codes = pd.Categorical(df[c], categories=cats).codes.astype(float)
+                    codes[codes < 0] = unknown
+                    block[:, j] = codes
+                blocks.append(block)
+        return np.hstack(blocks)
+
+class Predictor:
+    def __init__(self, reg, clf):
+        # both models are sklearn Pipelines: ('feat_pre', ColumnTransformer) followed by the estimator
+        self.reg = reg
+        self.clf = clf
+        self._reg_est = reg.steps[-1][1]
+        self._clf_est = clf.steps[-1][1]
+        try:
+            self._reg_pre = CompiledTransform(reg.steps[0][1])
+            self._clf_pre = CompiledTransform(clf.steps[0][1])
+        except (AttributeError, ValueError) as e:
+            print(f'Falling back to pipeline transforms: {e}')
+            self._reg_pre = self._clf_pre = None
+        # both transformers are fitted on the same rows, in that case transform once for both models
+        self.shared = self._reg_pre is not None and self._reg_pre == self._clf_pre
+
+    def _transform(self, X, record):
+        if self._reg_pre is None:
+            X = pd.DataFrame([X]) if record else X
+            return self.reg.steps[0][1].transform(X), self.clf.steps[0][1].transform(X)
+        fn = 'transform_record' if record else 'transform'
+        Xt_reg = getattr(self._reg_pre, fn)(X)
+        Xt_clf = Xt_reg if self.shared else getattr(self._clf_pre, fn)(X)
+        return Xt_reg, Xt_clf
+
+    @trace.traced('predict.predict')
+    def predict(self, record: dict):
+        '''
+        (price, team) of one raw player record, see features.featurize_record
+        '''
+        Xt_reg, Xt_clf = self._transform(featurize_record(record), True)
+        return self._reg_est.predict(Xt_reg)[0], self._clf_est.predict(Xt_clf)[0]
+
+    @trace.traced('predict.predict_batch')
+    def predict_batch(self, df: pd.DataFrame):
+        '''
+        (prices, teams) arrays of an already preprocessed frame, see features.preprocess
+        '''
+        Xt_reg, Xt_clf = self._transform(df, False)
+        return self._reg_est.predict(Xt_reg), self._clf_est.predict(Xt_clf)
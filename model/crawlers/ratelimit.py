@@ -0,0 +1,89 @@
+'''
+Per host token bucket rate limiter shared by all crawlers
+'''
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        # `rate` tokens are added every second, at most `burst` tokens can be saved up
+        self.rate = float(rate)
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class HostRateLimiter:
+    def __init__(self, rate=None, burst=1, host_rates=None):
+        # rate of None means requests to that host are never throttled
+        self.rate = rate
+        self.burst = burst
+        self.host_rates = host_rates or {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        rate = self.host_rates.get(host, self.rate)
+        if rate is None:
+            return None
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(rate, self.burst)
+            return self._buckets[host]
+
+    def acquire(self, url):
+        bucket = self.bucket(urlparse(url).netloc)
+        if bucket is not None:
+            bucket.acquire()
+
+# unthrottled by default so that single lookups from the app are never delayed
+limiter = HostRateLimiter()
+# limiter bound to the current thread by a crawl, see `bound`
+_local = threading.local()
+# (rate, burst) -> limiter, concurrent crawls with the same settings share their per host buckets
+_shared = {}
+_shared_lock = threading.Lock()
+
+def configure(rate=None, burst=1, host_rates=None):
+    '''
+    Replace the process wide limiter, meant to be called once at startup
+    '''
+    global limiter
+    previous = limiter
+    limiter = HostRateLimiter(rate, burst, host_rates)
+    return previous
+
+def shared(rate=None, burst=1):
+    with _shared_lock:
+        if (rate, burst) not in _shared:
+            _shared[(rate, burst)] = HostRateLimiter(rate, burst)
+        return _shared[(rate, burst)]
+
+@contextmanager
+def bound(host_limiter):
+    '''
+    Requests of the current thread go through `host_limiter` instead of the process wide limiter
+    '''
+    previous = getattr(_local, 'limiter', None)
+    _local.limiter = host_limiter
+    try:
+        yield host_limiter
+    finally:
+        _local.limiter = previous
+
+def acquire(url):
+    (getattr(_local, 'limiter', None) or limiter).acquire(url)
@@ -0,0 +1,219 @@
+'''
+Async prediction service core behind service.py, independent of the http framework
+
+Profiles are fetched on a thread pool so the event loop never waits on a crawl, and concurrent requests are micro
+batched: records that arrive while a batch is being collected (up to `max_batch` records or `max_wait` seconds
+after the first one) are predicted with a single `Predictor.predict_batch` call. Profile links are answered from a
+shared `PredictionCache` when one is given, concurrent requests of the same profile share one crawl.
+'''
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from .features import featurize_record
+from .fetch import LATENCY_BUCKETS
+from .prediction_cache import cache_key
+from .utils import get_player_record
+
+class ServiceMetrics:
+    '''
+    Request counters and per stage latency histograms (fetch, predict, request) of a `PredictionService`
+    '''
+    STAGES = ('fetch', 'predict', 'request')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_records = 0
+        self.latency_buckets = {stage: [0] * len(LATENCY_BUCKETS) for stage in self.STAGES}
+        self.latency_sum = {stage: 0.0 for stage in self.STAGES}
+
+    def observe(self, stage, latency):
+        with self._lock:
+            self.latency_sum[stage] += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    self.latency_buckets[stage][i] += 1
+                    break
+
+    def incr(self, counter, n=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def snapshot(self):
+        with self._lock:
+            uptime = time.time() - self.started
+            return {
+                'uptime_seconds': uptime,
+                'requests': self.requests,
+                'errors': self.errors,
+                'requests_per_second': self.requests / uptime if uptime > 0 else 0.0,
+                'batches': self.batches,
+                'mean_batch_size': self.batched_records / self.batches if self.batches else 0.0,
+                'latency_sum': dict(self.latency_sum),
+                'latency_histogram': {
+                    stage: dict(zip([str(b) for b in LATENCY_BUCKETS], buckets))
+                    for stage, buckets in self.latency_buckets.items()
+                },
+            }
+
+class MicroBatcher:
+    '''
+    Collects the featurized records of concurrent `submit` calls into one `predict_batch(df)` call
+    '''
+    def __init__(self, predict_batch, max_batch=32, max_wait=0.005, metrics=None):
+        self.predict_batch = predict_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.metrics = metrics or ServiceMetrics()
+        self._queue = None
+        self._task = None
+        # predictions run off the event loop, one batch at a time
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='predict')
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, row: dict):
+        '''
+        (price, team) of one featurized record, see features.featurize_record
+        '''
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            start = time.perf_counter()
+            results = await loop.run_in_executor(self._executor, self._predict_rows, [row for row, _ in batch])
+            self.metrics.observe('predict', time.perf_counter() - start)
+            self.metrics.incr('batches')
+            self.metrics.incr('batched_records', len(batch))
+            for (_, future), result in zip(batch, results):
+                # requests cancelled by their client while waiting for the batch
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _predict_rows(self, rows):
+        '''
+        (price, team) or the exception of every row. A failed batch is retried row by row, so a bad record only
+        fails its own request.
+        '''
+        try:
+            prices, teams = self.predict_batch(pd.DataFrame(rows))
+            return [(float(price), str(team)) for price, team in zip(prices, teams)]
+        except Exception as e:
+            if len(rows) == 1:
+                return [e]
+        return [self._predict_rows([row])[0] for row in rows]
+
+class PredictionService:
+    def __init__(self, predictor, workers=8, max_batch=32, max_wait=0.005, cache=None, model_version=None):
+        self.predictor = predictor
+        self.cache = cache
+        self.model_version = model_version
+        # cache key -> task of the request in flight
+        self._inflight = {}
+        self.metrics = ServiceMetrics()
+        self.batcher = MicroBatcher(predictor.predict_batch, max_batch, max_wait, self.metrics)
+        # crawls are blocking (requests, lxml), they run on their own pool
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fetch')
+
+    async def start(self):
+        self.batcher.start()
+
+    async def stop(self):
+        await self.batcher.stop()
+        self._executor.shutdown(wait=False)
+
+    async def _predict(self, row, start, **extra):
+        price, team = await self.batcher.submit(row)
+        self.metrics.observe('request', time.perf_counter() - start)
+        return {**extra, 'price': price, 'team': team, 'features': row}
+
+    async def predict_record(self, record: dict) -> dict:
+        '''
+        Prediction of a raw player record (PLAYER_COLUMNS + year) or of its featurized columns
+        '''
+        start = time.perf_counter()
+        self.metrics.incr('requests')
+        try:
+            row = featurize_record(record)
+            return await self._predict(row, start)
+        except Exception:
+            self.metrics.incr('errors')
+            raise
+
+    async def _predict_url(self, url, year, start):
+        loop = asyncio.get_running_loop()
+        record, player = await loop.run_in_executor(self._executor, get_player_record, url, year)
+        self.metrics.observe('fetch', time.perf_counter() - start)
+        if record is None:
+            raise LookupError(f'Could not fetch player: {url}')
+        return await self._predict(featurize_record(record), start, name=player.name, year=year)
+
+    async def predict_url(self, url, year) -> dict:
+        '''
+        Prediction of a cricbuzz profile link for an auction year, LookupError when the profile can not be fetched
+        '''
+        start = time.perf_counter()
+        self.metrics.incr('requests')
+        key = None if self.cache is None else cache_key(url, year, self.model_version)
+        try:
+            if key is None:
+                return await self._predict_url(url, year, start)
+            result = self.cache.get(key)
+            if result is not None:
+                self.metrics.observe('request', time.perf_counter() - start)
+                return {**result, 'cached': True}
+            task = self._inflight.get(key)
+            if task is None:
+                task = self._inflight[key] = asyncio.ensure_future(self._predict_url(url, year, start))
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            # shielded, a client that disconnects does not cancel the crawl the other requests wait for
+            result = await asyncio.shield(task)
+            self.cache.put(key, result)
+            return {**result, 'cached': False}
+        except Exception:
+            self.metrics.incr('errors')
+            raise
+
+    def stats(self):
+        stats = self.metrics.snapshot()
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        return stats
@@ -0,0 +1,157 @@
+'''
+Typed columnar storage of the auction and player datasets, Parquet files with one row group per auction year
+
+Stats are parsed once when a dataset is written (STAT_DTYPE with '-' as 0) and the string columns are dictionary
+encoded, so readers get typed columns without any text parsing and read only the columns (and years) they use.
+The Parquet copy lives next to its CSV (data.csv -> data.parquet), CSV stays the export format. Years are row
+groups of a single file rather than hive directories, at a few hundred rows per season the per file overhead
+of a directory per year costs more than the whole read.
+pyarrow is only required for the Parquet copies, without it every reader falls back to the CSV.
+
+    python -m crawlers.storage ../data/data.csv ../data/auction_data.csv
+    python -m crawlers.storage --to-csv --force ../data/data.csv
+
+--to-csv exports the typed values of the Parquet copy, it does not reproduce the original CSV text: '-' stat cells
+come back as 0.0, counts as floats (4 -> 4.0) and age / height at float32 precision. Readers load both alike, but
+the file differs from the crawled one, so an existing CSV is only overwritten with --force.
+'''
+import argparse
+import os
+import pandas as pd
+from .features import PLAYER_COLUMNS, STAT_DTYPE, parse_stats
+
+# dictionary encoded string columns
+CATEGORY_COLUMNS = ['country', 'role', 'team', 'bat_style', 'bowl_style']
+# every raw stat cell of a player vector, batting and bowling of t20i and ipl
+RAW_STAT_COLUMNS = PLAYER_COLUMNS[7:]
+FLOAT_COLUMNS = ['age', 'height']
+PARTITION_COLUMN = 'year'
+
+def available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def parquet_path(csv_path):
+    return f'{os.path.splitext(csv_path)[0]}.parquet'
+
+def is_fresh(csv_path) -> bool:
+    '''
+    True when the Parquet copy of `csv_path` can be read, i.e. it exists and the CSV was not written after it
+    '''
+    path = parquet_path(csv_path)
+    if not (os.path.isfile(path) and available()):
+        return False
+    return not os.path.isfile(csv_path) or os.path.getmtime(path) >= os.path.getmtime(csv_path)
+
+def source(csv_path):
+    # the file a reader of `csv_path` actually reads
+    return parquet_path(csv_path) if is_fresh(csv_path) else csv_path
+
+def typed(df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Raw dataset frame in the storage schema, schema columns missing from `df` are skipped
+    '''
+    df = df.copy()
+    stats = [c for c in RAW_STAT_COLUMNS if c in df.columns]
+    if stats:
+        parsed = parse_stats(df[stats].to_numpy())
+        for j, col in enumerate(stats):
+            df[col] = parsed[:, j]
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(STAT_DTYPE)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    if PARTITION_COLUMN in df.columns:
+        df[PARTITION_COLUMN] = df[PARTITION_COLUMN].astype('int16')
+    return df
+
+def write_parquet(df: pd.DataFrame, path):
+    '''
+    Write `df` in the storage schema with one row group per run of rows of the same auction year
+    '''
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    df = typed(df)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    years = df[PARTITION_COLUMN].to_numpy()
+    bounds = [0] + [i for i in range(1, len(years)) if years[i] != years[i - 1]] + [len(years)]
+    # readers never see a half written file
+    tmp = f'{path}.tmp'
+    with pq.ParquetWriter(tmp, table.schema) as writer:
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            writer.write_table(table.slice(start, end - start))
+    os.replace(tmp, path)
+
+def year_row_groups(parquet_file, years) -> list:
+    # row groups whose year statistics overlap `years`
+    years = set(int(y) for y in years)
+    col = parquet_file.metadata.schema.names.index(PARTITION_COLUMN)
+    groups = []
+    for i in range(parquet_file.metadata.num_row_groups):
+        stats = parquet_file.metadata.row_group(i).column(col).statistics
+        if stats is None or not stats.has_min_max or any(stats.min <= y <= stats.max for y in years):
+            groups.append(i)
+    return groups
+
+def read_parquet(path, columns=None, years=None) -> pd.DataFrame:
+    '''
+    Read a file written by `write_parquet`, only `columns` are decoded and row groups of other `years` are skipped
+    '''
+    import pyarrow.parquet as pq
+    f = pq.ParquetFile(path)
+    # single threaded, at this size the thread pool costs more than it saves
+    if years is None:
+        table = f.read(columns, use_threads=False)
+    else:
+        table = f.read_row_groups(year_row_groups(f, years), columns, use_threads=False)
+    return table.to_pandas()
+
+def write_csv(df, csv_path):
+    # readers never see a half written file
+    tmp = f'{csv_path}.tmp'
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, csv_path)
+
+def save(df: pd.DataFrame, csv_path):
+    '''
+    Write the CSV export of a dataset and, when pyarrow is installed, its typed Parquet copy after it
+    '''
+    write_csv(df, csv_path)
+    if available():
+        write_parquet(df, parquet_path(csv_path))
+
+def load(csv_path, columns=None, years=None) -> pd.DataFrame:
+    '''
+    Read a dataset by its CSV path, from the typed Parquet copy when it is fresh and from the CSV otherwise
+    '''
+    if is_fresh(csv_path):
+        return read_parquet(parquet_path(csv_path), columns, years)
+    if not os.path.isfile(csv_path):
+        return None
+    df = pd.read_csv(csv_path, usecols=columns)
+    if years is not None:
+        df = df[df[PARTITION_COLUMN].isin(years)].reset_index(drop=True)
+    return df[columns] if columns else df
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert dataset CSVs into typed Parquet datasets and back')
+    parser.add_argument('csv', nargs='+', help='dataset csv paths, the parquet copies are written next to them')
+    parser.add_argument('--to-csv', action='store_true',
+                        help="export the typed parquet copies back to csv, '-' cells become 0.0 and counts floats")
+    parser.add_argument('--force', action='store_true', help='let --to-csv overwrite an existing csv')
+    args = parser.parse_args()
+    for csv_path in args.csv:
+        if args.to_csv:
+            if os.path.isfile(csv_path) and not args.force:
+                print(f'Not overwriting {csv_path} with the typed export of {parquet_path(csv_path)}, use --force')
+                continue
+            write_csv(read_parquet(parquet_path(csv_path)), csv_path)
+            print(f'Exported {parquet_path(csv_path)} -> {csv_path}')
+        else:
+            write_parquet(pd.read_csv(csv_path), parquet_path(csv_path))
+            print(f'Converted {csv_path} -> {parquet_path(csv_path)}')
@@ -0,0 +1,129 @@
+'''
+Player feature store backed by sqlite with an in memory index, crawled players are committed in atomic batches
+'''
+import json
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+
+class PlayerStore:
+    def __init__(self, path='./player_cache.db', json_path='./player_cache.json', batch_size=50):
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        self._pending = {}
+        self._frame = None
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # WAL keeps readers unblocked and an interrupted commit never corrupts committed batches
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS players (name TEXT PRIMARY KEY, features TEXT NOT NULL, yob INTEGER, updated_at REAL)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self._db.commit()
+        # name -> (feature vector without auction data, year of birth)
+        self._index = {
+            name: (json.loads(features), yob)
+            for name, features, yob in self._db.execute('SELECT name, features, yob FROM players')
+        }
+        # existing json caches are imported once, later edits to the json are ignored
+        if json_path is not None and os.path.isfile(json_path) and self.meta('imported_json') is None:
+            self.import_json(json_path)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __getitem__(self, name):
+        return self._index[name]
+
+    def __iter__(self):
+        return iter(list(self._index))
+
+    def __len__(self):
+        return len(self._index)
+
+    def get(self, name, default=None):
+        return self._index.get(name, default)
+
+    def items(self):
+        return list(self._index.items())
+
+    def to_frame(self, columns):
+        '''
+        Feature vectors as a DataFrame indexed by player name with an extra `yob` column, values keep their python types
+        '''
+        with self._lock:
+            if self._frame is None or list(self._frame.columns[:-1]) != list(columns):
+                mismatched = [name for name, (features, _) in self._index.items() if len(features) != len(columns)]
+                if mismatched:
+                    raise ValueError(f'Feature vectors of {mismatched} do not match {len(columns)} columns')
+                frame = pd.DataFrame([features for features, _ in self._index.values()], index=list(self._index), columns=columns, dtype=object)
+                frame['yob'] = pd.Series([yob for _, yob in self._index.values()], index=frame.index, dtype=object)
+                self._frame = frame
+            return self._frame
+
+    def meta(self, key, value=None):
+        with self._lock:
+            if value is None:
+                row = self._db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+                return None if row is None else row[0]
+            with self._db:
+                self._db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, str(value)))
+
+    def put(self, name, features, yob):
+        with self._lock:
+            self._index[name] = (list(features), yob)
+            self._pending[name] = self._index[name]
+            self._frame = None
+            if len(self._pending) >= self.batch_size:
+                self.commit()
+
+    def commit(self):
+        with self._lock:
+            if not self._pending:
+                return
+            now = time.time()
+            with self._db:
+                self._db.executemany('INSERT OR REPLACE INTO players VALUES (?, ?, ?, ?)', [
+                    (name, json.dumps(features), yob, now) for name, (features, yob) in self._pending.items()
+                ])
+            self._pending.clear()
+
+    def compact(self):
+        with self._lock:
+            self.commit()
+            self._db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self._db.execute('VACUUM')
+
+    def import_json(self, json_path):
+        with open(json_path) as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                data = {}
+        with self._lock:
+            for name, (features, yob) in data.items():
+                self._index[name] = (list(features), yob)
+                self._pending[name] = self._index[name]
+            self._frame = None
+            self.commit()
+            self.meta('imported_json', json_path)
+        print(f'Imported {len(data)} players from {json_path}')
+
+    def export_json(self, json_path):
+        self.commit()
+        tmp = f'{json_path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._index, f, indent=4)
+        os.replace(tmp, json_path)
+
+    def close(self):
+        with self._lock:
+            self.commit()
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,225 @@
+'''
+Lightweight spans and counters for the crawl, featurize, train and predict stages
+
+Tracing is off by default, `span` then returns one shared no-op context manager and `count` returns after a
+single check, so instrumented code pays close to nothing. When enabled every finished span updates a per name
+latency histogram and is appended to a JSON lines file (when configured), counters and histograms are served in
+the Prometheus text format by `prometheus_text` / `serve`.
+
+Enabled from the environment when the module is imported (e.g. for the Streamlit app and the crawl scripts):
+
+    IPL_TRACE=trace.jsonl IPL_TRACE_PORT=9108 streamlit run main.py
+    curl localhost:9108/metrics
+'''
+import itertools
+import json
+import os
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# upper bounds (seconds) of the span latency histogram buckets
+SPAN_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 60.0, float('inf'))
+METRIC_PREFIX = 'ipl'
+
+enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_ids = itertools.count(1)
+_jsonl = None
+# span name -> [bucket counts, sum, count, errors]
+_spans = {}
+# (counter name, sorted label items) -> value
+_counters = {}
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class Span:
+    __slots__ = ('name', 'attrs', 'id', 'parent', 'start', 'wall')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.id = next(_ids)
+        self.parent = stack[-1].id if stack else None
+        stack.append(self)
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _local.stack.pop()
+        record(self.name, duration, exc_type is not None)
+        if _jsonl is not None:
+            line = {
+                'name': self.name, 'id': self.id, 'parent': self.parent, 'start': self.wall, 'duration': duration,
+                'thread': threading.current_thread().name, 'error': None if exc_type is None else exc_type.__name__,
+            }
+            if self.attrs:
+                line['attrs'] = self.attrs
+            with _lock:
+                if _jsonl is not None:
+                    _jsonl.write(json.dumps(line, default=str) + '\n')
+        return False
+
+def span(name, **attrs):
+    '''
+    Context manager timing the enclosed block as `name`, nested spans of a thread record their parent
+    '''
+    if not enabled:
+        return NOOP_SPAN
+    return Span(name, attrs)
+
+def traced(name):
+    '''
+    Decorator wrapping every call of a function in a span, the check is done per call so tracing can be
+    enabled after the function was decorated
+    '''
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            with Span(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def record(name, duration, error=False):
+    # a span timed by the caller, e.g. a stage that is not a single block
+    if not enabled:
+        return
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = [[0] * len(SPAN_BUCKETS), 0.0, 0, 0]
+        for i, bound in enumerate(SPAN_BUCKETS):
+            if duration <= bound:
+                stats[0][i] += 1
+                break
+        stats[1] += duration
+        stats[2] += 1
+        stats[3] += error
+
+def count(name, n=1, **labels):
+    if not enabled:
+        return
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+def snapshot():
+    with _lock:
+        return {
+            'spans': {name: {'count': s[2], 'sum': s[1], 'errors': s[3]} for name, s in _spans.items()},
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in _counters.items()],
+        }
+
+def _metric_name(name):
+    return f'{METRIC_PREFIX}_' + ''.join(c if c.isalnum() else '_' for c in name)
+
+def _labels(items):
+    escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{k}="{escape(v)}"' for k, v in items)
+
+def prometheus_text():
+    '''
+    Counters and span histograms in the Prometheus text exposition format
+    '''
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        spans = sorted((name, [list(s[0]), s[1], s[2], s[3]]) for name, s in _spans.items())
+    seen = set()
+    for (name, labels), value in counters:
+        metric = _metric_name(name) + '_total'
+        if metric not in seen:
+            lines.append(f'# TYPE {metric} counter')
+            seen.add(metric)
+        lines.append(f'{metric}{{{_labels(labels)}}} {value}' if labels else f'{metric} {value}')
+    if spans:
+        metric = _metric_name('span_seconds')
+        lines.append(f'# TYPE {metric} histogram')
+        for name, (buckets, total, n, errors) in spans:
+            cumulative = 0
+            for bound, bucket in zip(SPAN_BUCKETS, buckets):
+                cumulative += bucket
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{metric}_bucket{{span="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{span="{name}"}} {total}')
+            lines.append(f'{metric}_count{{span="{name}"}} {n}')
+        metric = _metric_name('span_errors')
+        lines.append(f'# TYPE {metric}_total counter')
+        for name, (_, _, _, errors) in spans:
+            lines.append(f'{metric}_total{{span="{name}"}} {errors}')
+    return '\n'.join(lines) + '\n'
+
+def serve(port, host='0.0.0.0'):
+    '''
+    Serve prometheus_text() on http://host:port/metrics from a daemon thread
+    '''
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name='trace-metrics').start()
+    return server
+
+def configure(enable=True, jsonl=None):
+    '''
+    Turn tracing on or off, spans are appended to the `jsonl` file when one is given
+    '''
+    global enabled, _jsonl
+    with _lock:
+        if _jsonl is not None:
+            _jsonl.close()
+        # line buffered, a crashed process keeps every finished span
+        _jsonl = open(jsonl, 'a', buffering=1) if enable and jsonl else None
+        enabled = enable
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+if os.environ.get('IPL_TRACE'):
+    configure(jsonl=None if os.environ['IPL_TRACE'] in ('1', 'true') else os.environ['IPL_TRACE'])
+    if os.environ.get('IPL_TRACE_PORT'):
+        try:
+            serve(int(os.environ['IPL_TRACE_PORT']))
+        except OSError as e:
+            # e.g. a worker process of a traced parent, the parent serves the port
+            print(f'Not serving trace metrics: {e}')
@@ -0,0 +1,392 @@
+'''
+Durable player resolution queue in sqlite, several crawler processes (on one or more hosts) share one rebuild
+
+Every auction player is a task. A worker leases a batch of tasks, keeps the leases alive with heartbeats while it
+makes progress crawling them and stores each feature vector as the task's result. The lease of a crashed or hung
+worker (or of a single hung fetch, after a bounded number of heartbeats) expires and its tasks are handed to the next worker that claims, a task that keeps failing (or whose lease keeps expiring) is
+moved to the dead letters after `max_attempts`. Players with empty stats are dead lettered at once, the same as
+build_dataset skipping them. A killed rebuild restarts where it stopped, finished players are never crawled again.
+
+The dataset is assembled from the finished tasks into the player store and data.csv once the queue is drained.
+Workers on other hosts need the queue file on a file system with working sqlite locking (a local disk shared
+over the network by a sqlite aware mount, not plain NFS).
+
+    python -m crawlers.workqueue enqueue
+    python -m crawlers.workqueue work --workers 8 --rate 1.0      # on every crawler process / host
+    python -m crawlers.workqueue status
+    python -m crawlers.workqueue assemble
+    python -m crawlers.workqueue retry-dead
+'''
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import pandas as pd
+from contextlib import contextmanager
+from typing import NamedTuple
+from . import fetch, identity, storage, trace
+from .crawl import crawl_players
+from .features import player_vector
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+DEAD = 'dead'
+STATES = (PENDING, LEASED, DONE, DEAD)
+
+class Task(NamedTuple):
+    name: str
+    first_year: int
+    attempts: int
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+class WorkQueue:
+    def __init__(self, path='./crawl_queue.db', lease=120, max_attempts=3, retry_delay=30, clock=time.time):
+        self.path = path
+        # seconds a claimed task stays with its worker without a heartbeat
+        self.lease = lease
+        self.max_attempts = max_attempts
+        # a failed task waits retry_delay * 2 ** (attempts - 1) seconds before it can be claimed again
+        self.retry_delay = retry_delay
+        self.clock = clock
+        self._lock = threading.RLock()
+        # autocommit, every write below is its own (IMMEDIATE) transaction so processes never interleave a claim
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('''CREATE TABLE IF NOT EXISTS tasks (
+            name TEXT PRIMARY KEY, first_year INTEGER, state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,
+            available_at REAL NOT NULL DEFAULT 0, worker TEXT, lease_expires REAL, features TEXT, yob INTEGER,
+            error TEXT, created_at REAL, started_at REAL, finished_at REAL)''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, available_at)')
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, two processes never read the same pending tasks
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def _write(self, sql, params=()):
+        with self._transaction() as db:
+            return db.execute(sql, params).rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+
+    def enqueue(self, tasks) -> int:
+        '''
+        Add (name, first auction year) tasks, names that are already queued (in any state) are skipped
+        '''
+        now = self.clock()
+        rows = [(name, int(year), PENDING, now) for name, year in tasks]
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany('INSERT OR IGNORE INTO tasks (name, first_year, state, created_at) VALUES (?, ?, ?, ?)', rows)
+            added = db.total_changes - before
+        trace.count('queue_tasks', added, event='enqueued')
+        return added
+
+    def claim(self, worker, n=1) -> list:
+        '''
+        Lease up to `n` claimable tasks to `worker`, expired leases of other workers are reclaimed first
+        '''
+        now = self.clock()
+        with trace.span('queue.claim', n=n), self._transaction() as db:
+            # the worker holding these died or hung, the lease counts as a failed attempt
+            expired = db.execute(
+                'UPDATE tasks SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, worker = NULL, '
+                "error = 'lease expired', available_at = ? WHERE state = ? AND lease_expires < ?",
+                (self.max_attempts, DEAD, PENDING, now, LEASED, now)).rowcount
+            rows = db.execute(
+                'SELECT name, first_year, attempts FROM tasks WHERE state = ? AND available_at <= ? '
+                'ORDER BY available_at, rowid LIMIT ?', (PENDING, now, n)).fetchall()
+            db.executemany(
+                'UPDATE tasks SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, started_at = ? '
+                'WHERE name = ?', [(LEASED, worker, now + self.lease, now, name) for name, _, _ in rows])
+        if expired:
+            print(f'Reclaimed {expired} tasks of expired leases')
+            trace.count('queue_tasks', expired, event='reclaimed')
+        return [Task(name, year, attempts + 1) for name, year, attempts in rows]
+
+    def heartbeat(self, worker, names) -> int:
+        '''
+        Extend the leases `worker` still holds on `names`, returns how many it still holds
+        '''
+        names = list(names)
+        if not names:
+            return 0
+        marks = ','.join('?' * len(names))
+        return self._write(
+            f'UPDATE tasks SET lease_expires = ? WHERE state = ? AND worker = ? AND name IN ({marks})',
+            (self.clock() + self.lease, LEASED, worker, *names))
+
+    def complete(self, worker, name, features, yob) -> bool:
+        '''
+        Store the result of a leased task, False when the lease was lost (the task was reclaimed meanwhile)
+        '''
+        done = self._write(
+            'UPDATE tasks SET state = ?, features = ?, yob = ?, error = NULL, finished_at = ?, lease_expires = NULL '
+            'WHERE name = ? AND state = ? AND worker = ?',
+            (DONE, json.dumps(list(features)), yob, self.clock(), name, LEASED, worker)) == 1
+        trace.count('queue_tasks', event='done' if done else 'lost')
+        return done
+
+    def fail(self, worker, name, error, retry=True) -> str:
+        '''
+        Give a leased task back for a retry after a backoff, or dead letter it. Returns the new state, None when
+        the lease was lost
+        '''
+        with self._transaction() as db:
+            row = db.execute('SELECT attempts FROM tasks WHERE name = ? AND state = ? AND worker = ?',
+                             (name, LEASED, worker)).fetchone()
+            if row is None:
+                # the lease was lost, the task belongs to another worker now
+                return None
+            state = PENDING if retry and row[0] < self.max_attempts else DEAD
+            db.execute('UPDATE tasks SET state = ?, error = ?, available_at = ?, worker = NULL, lease_expires = NULL '
+                       'WHERE name = ?', (state, str(error), self.clock() + self.retry_delay * 2 ** (row[0] - 1), name))
+        trace.count('queue_tasks', event='retried' if state == PENDING else 'dead')
+        return state
+
+    def retry_dead(self) -> int:
+        # e.g. after the search engine quota was raised, dead letters get max_attempts fresh attempts
+        return self._write('UPDATE tasks SET state = ?, attempts = 0, available_at = 0, error = NULL WHERE state = ?',
+                           (PENDING, DEAD))
+
+    def counts(self) -> dict:
+        with self._lock:
+            counts = dict(self._db.execute('SELECT state, COUNT(*) FROM tasks GROUP BY state'))
+        return {state: counts.get(state, 0) for state in STATES}
+
+    def drained(self) -> bool:
+        # nothing left to claim now or after a lease expires
+        counts = self.counts()
+        return counts[PENDING] == 0 and counts[LEASED] == 0
+
+    def results(self):
+        '''
+        (name, feature vector, year of birth) of every finished task
+        '''
+        with self._lock:
+            rows = self._db.execute('SELECT name, features, yob FROM tasks WHERE state = ? ORDER BY rowid', (DONE,)).fetchall()
+        return [(name, json.loads(features), yob) for name, features, yob in rows]
+
+    def dead_letters(self) -> list:
+        with self._lock:
+            return self._db.execute('SELECT name, attempts, error FROM tasks WHERE state = ? ORDER BY rowid', (DEAD,)).fetchall()
+
+    def throughput(self, window=None) -> dict:
+        '''
+        Finished tasks per second overall and per worker, over the last `window` seconds when given
+        '''
+        since = 0 if window is None else self.clock() - window
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT worker, COUNT(*), MIN(started_at), MAX(finished_at) FROM tasks '
+                'WHERE state = ? AND finished_at >= ? GROUP BY worker', (DONE, since)).fetchall()
+        def rate(n, start, end):
+            return n / (end - start) if end and start and end > start else 0.0
+        workers = {worker: {'done': n, 'tasks_per_second': rate(n, start, end)} for worker, n, start, end in rows}
+        done = sum(n for _, n, _, _ in rows)
+        start = min((s for _, _, s, _ in rows), default=None)
+        end = max((e for _, _, _, e in rows), default=None)
+        report = {'done': done, 'seconds': (end - start) if rows else 0.0, 'tasks_per_second': rate(done, start, end),
+                  'workers': workers}
+        counts = self.counts()
+        remaining = counts[PENDING] + counts[LEASED]
+        report['eta_seconds'] = remaining / report['tasks_per_second'] if report['tasks_per_second'] else None
+        return report
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Heartbeat:
+    '''
+    Daemon thread extending the leases of the tasks a worker is crawling every `interval` seconds, as long as the
+    worker makes progress. A beat without any task finished since the previous one renews nothing, and a task is
+    renewed at most `max_renewals` times, so a hung fetch loses its lease like a crashed worker.
+    '''
+    def __init__(self, queue: WorkQueue, worker, interval=None, max_renewals=6):
+        self.queue = queue
+        self.worker = worker
+        self.interval = interval or queue.lease / 3
+        self.max_renewals = max_renewals
+        # held task name -> renewals of its lease so far
+        self.held = {}
+        self._progress = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='queue-heartbeat')
+
+    def hold(self, names):
+        with self._lock:
+            self.held.update((name, 0) for name in names)
+            self._progress = True
+
+    def release(self, name):
+        with self._lock:
+            self.held.pop(name, None)
+            self._progress = True
+
+    def _beat(self):
+        with self._lock:
+            if not self._progress:
+                return []
+            self._progress = False
+            names = [name for name, renewals in self.held.items() if renewals < self.max_renewals]
+            for name in names:
+                self.held[name] += 1
+        return names
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            names = self._beat()
+            try:
+                self.queue.heartbeat(self.worker, names)
+            except sqlite3.Error as e:
+                # the lease outlives a few missed beats
+                print(f'Heartbeat failed: {e}')
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def run_worker(queue: WorkQueue, worker=None, workers=8, rate=1.0, batch=None, poll=5.0, fetch_player=None,
+               max_renewals=6) -> dict:
+    '''
+    Claim, crawl and finish tasks until the queue is drained, returns the counts of this worker. A task is held for
+    at most about `max_renewals` / 3 + 1 leases, longer fetches are given to another worker.
+    '''
+    worker = worker or worker_id()
+    batch = batch or 2 * max(1, workers)
+    kwargs = {} if fetch_player is None else {'fetch': fetch_player}
+    summary = {'done': 0, 'retried': 0, 'dead': 0, 'lost': 0}
+    start = time.perf_counter()
+    with Heartbeat(queue, worker, max_renewals=max_renewals) as heartbeat:
+        while True:
+            tasks = queue.claim(worker, batch)
+            if not tasks:
+                if queue.drained():
+                    break
+                # the remaining tasks are leased by other workers or waiting for a retry
+                time.sleep(poll)
+                continue
+            heartbeat.hold(task.name for task in tasks)
+            first_year = {task.name: task.first_year for task in tasks}
+            for name, p in crawl_players(list(first_year), workers, rate, **kwargs):
+                if p is None or p.id is None or p.info is None:
+                    # a failed search or profile fetch (Player swallows both), worth another attempt after a backoff
+                    state = queue.fail(worker, name, 'profile could not be fetched')
+                elif p.bowl_stats is None or p.bat_stats is None:
+                    # the profile parsed but has no stats tables, retrying does not give it its missing stats
+                    state = queue.fail(worker, name, 'empty stats', retry=False)
+                else:
+                    state = DONE if queue.complete(worker, name, player_vector(p, first_year[name]), p.yob) else None
+                summary[{DONE: 'done', PENDING: 'retried', DEAD: 'dead', None: 'lost'}[state]] += 1
+                heartbeat.release(name)
+            elapsed = time.perf_counter() - start
+            print(f'{worker}: {summary}, {summary["done"] / elapsed:.2f} players / s, queue {queue.counts()}')
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+    return summary
+
+def enqueue_auction(queue: WorkQueue, auction_df: pd.DataFrame, skip=()) -> int:
+    '''
+    Queue every auction player not in `skip` (e.g. the player store), with the year of their first auction
+    '''
+    # age is computed w.r.t the first auction year of a player
+    first_auction_year = dict(zip(auction_df.player[::-1], auction_df.year[::-1]))
+    skip = set(skip)
+    return queue.enqueue((name, year) for name, year in first_auction_year.items() if name not in skip)
+
+def assemble(queue: WorkQueue, auction_df: pd.DataFrame, player_cache) -> pd.DataFrame:
+    '''
+    Put every finished task into the player store and build the dataset from it
+    '''
+    from .ipl import assemble_dataset
+    for name, features, yob in queue.results():
+        player_cache.put(name, features, yob)
+    player_cache.commit()
+    return assemble_dataset(auction_df, player_cache)
+
+def report(queue: WorkQueue):
+    print(f'Tasks: {queue.counts()}')
+    throughput = queue.throughput()
+    print(f'Throughput: {throughput["done"]} players in {throughput["seconds"]:.1f} s, '
+          f'{throughput["tasks_per_second"]:.2f} players / s, eta {throughput["eta_seconds"]}')
+    for worker, stats in sorted(throughput['workers'].items()):
+        print(f'  {worker}: {stats["done"]} players, {stats["tasks_per_second"]:.2f} / s')
+    dead = queue.dead_letters()
+    if dead:
+        print(f'Dead letters ({len(dead)}): ' + ', '.join(f'{name} ({error}, {attempts} attempts)' for name, attempts, error in dead[:20]))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild data.csv with several crawler processes sharing a queue')
+    parser.add_argument('command', choices=['enqueue', 'work', 'status', 'assemble', 'retry-dead'])
+    parser.add_argument('--queue', default='./crawl_queue.db')
+    parser.add_argument('--lease', type=float, default=120, help='seconds before an unresponsive worker loses its tasks')
+    parser.add_argument('--max-renewals', type=int, default=6, help='heartbeats a task is held for, every lease / 3 seconds')
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=8, help='concurrent profile fetches of this process')
+    parser.add_argument('--rate', type=float, default=1.0, help='requests per second per host of this process')
+    parser.add_argument('--cache-dir', default='./page_cache')
+    parser.add_argument('--offline', action='store_true', help='serve pages from the page cache only')
+    parser.add_argument('--reparse', action='store_true', help='enqueue players that are already in the player store')
+    args = parser.parse_args()
+    from .ipl import get_sold_players
+    from .page_cache import PageCache
+    from .store import PlayerStore
+    auction_fname, data_fname = 'auction_data.csv', 'data.csv'
+    with WorkQueue(args.queue, args.lease, args.max_attempts) as queue:
+        if args.command == 'enqueue':
+            if not os.path.isfile(auction_fname):
+                storage.save(get_sold_players(), auction_fname)
+            with PlayerStore() as player_cache:
+                skip = () if args.reparse else list(player_cache)
+                # filled once before the workers start, their own preload only adds what is new since
+                page_cache = PageCache(args.cache_dir) if os.path.isdir(args.cache_dir) else None
+                identity.preload(player_cache, page_cache, data_fname).close()
+            print(f'Queued {enqueue_auction(queue, pd.read_csv(auction_fname), skip)} players: {queue.counts()}')
+        elif args.command == 'work':
+            page_cache = PageCache(args.cache_dir)
+            fetch.configure(cache=page_cache, offline=args.offline)
+            with PlayerStore() as player_cache:
+                # names resolved by earlier crawls are fetched by profile id without a search engine lookup
+                identity.preload(player_cache, page_cache, data_fname)
+            print(f'Worker done: {run_worker(queue, workers=args.workers, rate=args.rate, max_renewals=args.max_renewals)}')
+            print(f'Fetch stats: {fetch.session.stats.snapshot()}')
+            report(queue)
+        elif args.command == 'status':
+            report(queue)
+        elif args.command == 'assemble':
+            if not queue.drained():
+                print(f'Assembling before the queue is drained: {queue.counts()}')
+            auction_df = pd.read_csv(auction_fname)
+            with PlayerStore() as player_cache:
+                df = assemble(queue, auction_df, player_cache)
+            storage.save(df, data_fname)
+            print(f'Assembled {df.shape[0]} / {auction_df.shape[0]} auction rows')
+            report(queue)
+        elif args.command == 'retry-dead':
+            print(f'Requeued {queue.retry_dead()} dead letters: {queue.counts()}')
@@ -0,0 +1,68 @@
+'''
+Distill the autosklearn ensembles into compact gradient boosted students trained on the ensembles' outputs
+
+The students reuse the teacher's fitted `feat_pre` ColumnTransformer and are plain sklearn pipelines, so the
+app can serve them without importing autosklearn
+
+    python distill.py
+'''
+import copy
+import numpy as np
+# scikit-learn < 1.0 keeps the histogram gradient boosting behind this flag
+from sklearn.experimental import enable_hist_gradient_boosting  # noqa: F401
+from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+from sklearn.metrics import accuracy_score, mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from crawlers.artifacts import export_artifact, load_artifact
+from crawlers.features import preprocess
+from crawlers.utils import load_data
+
+STUDENTS = {
+    # histogram boosting handles the missing ages the ensembles impute internally
+    'reg': ('student_reg', lambda: HistGradientBoostingRegressor(max_iter=300, learning_rate=0.05, max_leaf_nodes=15, random_state=42)),
+    'clf': ('student_clf', lambda: HistGradientBoostingClassifier(max_iter=200, learning_rate=0.1, max_leaf_nodes=15, random_state=42)),
+}
+
+def fidelity(kind, teacher_out, student_out, y_true=None):
+    if kind == 'reg':
+        report = {
+            'fidelity_r2': r2_score(teacher_out, student_out),
+            'fidelity_mae': mean_absolute_error(teacher_out, student_out),
+        }
+        if y_true is not None:
+            report['teacher_mae'] = mean_absolute_error(y_true, teacher_out)
+            report['student_mae'] = mean_absolute_error(y_true, student_out)
+    else:
+        report = {'fidelity_agreement': accuracy_score(teacher_out, student_out)}
+        if y_true is not None:
+            report['teacher_accuracy'] = accuracy_score(y_true, teacher_out)
+            report['student_accuracy'] = accuracy_score(y_true, student_out)
+    return {k: float(v) for k, v in report.items()}
+
+def distill(teacher, X, kind, y_true=None, path=None, test_size=0.2):
+    '''
+    Fit a student of `kind` ('reg' / 'clf') on the teacher's predictions of X, report the fidelity gap on a
+    held out split and export the student fitted on all rows to `path`
+    '''
+    pre = copy.deepcopy(teacher.steps[0][1])
+    Xt = pre.transform(X)
+    teacher_out = teacher.steps[-1][1].predict(Xt)
+    step_name, make_student = STUDENTS[kind]
+
+    idx_train, idx_test = train_test_split(np.arange(Xt.shape[0]), test_size=test_size, random_state=42)
+    student = make_student().fit(Xt[idx_train], teacher_out[idx_train])
+    report = fidelity(kind, teacher_out[idx_test], student.predict(Xt[idx_test]),
+                      None if y_true is None else np.asarray(y_true)[idx_test])
+    print(f'[{kind}] fidelity on {len(idx_test)} held out rows: {report}')
+
+    pipe = Pipeline([('feat_pre', pre), (step_name, make_student().fit(Xt, teacher_out))])
+    if path is not None:
+        export_artifact(pipe, path, extra={'teacher_fidelity': report})
+    return pipe, report
+
+if __name__ == '__main__':
+    df = preprocess(load_data('../data/data.csv'))
+    X = df.drop(['team', 'price'], axis=1)
+    distill(load_artifact('auto_reg_v1.joblib'), X, 'reg', df['price'], 'student_reg_v1.joblib')
+    distill(load_artifact('auto_clf_v1.joblib'), X, 'clf', df['team'], 'student_clf_v1.joblib')
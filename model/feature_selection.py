@@ -1,21 +1,27 @@
 # example of correlation feature selection for numerical data
-import pandas as pd
+import functools
+import os
 import joblib
 from sklearn.model_selection import train_test_split
 from sklearn.feature_selection import SelectKBest
 from sklearn.feature_selection import f_regression, mutual_info_regression
-from sklearn.model_selection import RepeatedKFold, GridSearchCV, cross_val_score
-from sklearn.pipeline import Pipeline
+from sklearn.model_selection import RepeatedKFold
 from sklearn.linear_model import LinearRegression
 from matplotlib import pyplot
-from model import load_data, preprocess
+from crawlers.features import build_preprocessor, preprocess
+from crawlers.folds import FoldEngine
+from crawlers.utils import load_data
 from sklearn.metrics import mean_absolute_error
 import numpy
+
+# fixed, the mutual information scores of a fold are then shared by every k
+RANDOM_STATE = 1
+mutual_info = functools.partial(mutual_info_regression, random_state=RANDOM_STATE)
  
 # feature selection
-def select_features(X_train, y_train, X_test, fs_method):
-	# configure to select all features
-	fs = SelectKBest(score_func=fs_method, k=20)
+def select_features(X_train, y_train, X_test, fs_method, k=20):
+	# configure to select the top k (at most all) features
+	fs = SelectKBest(score_func=fs_method, k=min(k, X_train.shape[1]))
 	# learn relationship from training data
 	fs.fit(X_train, y_train)
 	# transform train input data
@@ -40,80 +46,65 @@ def model_train(X_train, y_train, X_test, y_test):
 	mae = mean_absolute_error(y_test, y_hat)
 	print('MAE: %.3f' % mae)
 
-df = preprocess(load_data('../data/data.csv'))
-# shuffle rows
-df = df.sample(frac=1)
-# train test split
-train_data, test_data = train_test_split(df, test_size=0.1)
-# print(f'Train Data: {train_data.shape}, Test Data: {test_data.shape}')
-# Drop y_target column
-y_train = train_data.price
-X_train = train_data.drop(['price'], axis=1)
-# predict on test data
-y_test = test_data.price
-X_test = test_data.drop(['price'], axis=1)
-# model train with all features
-model_train(X_train, y_train, X_test, y_test)
-# load autosklearn.regressor model
-auto_reg = joblib.load('auto_regressor.joblib')
-model_eval(auto_reg, X_test, y_test)
-# feature selection f_regression correlation features top 20
-X_train_fs, X_test_fs, fs = select_features(X_train, y_train, X_test, f_regression)
-# model train with top 20 correlation features
-model_train(X_train_fs, y_train, X_test_fs, y_test)
-model_eval(auto_reg, X_test_fs, y_test)
-# feature selection mutual_info features top 20
-X_train_fs, X_test_fs, fs = select_features(X_train, y_train, X_test, mutual_info_regression)
-# model train with top 20 mutual_info features
-model_train(X_train_fs, y_train, X_test_fs, y_test)
-model_eval(auto_reg, X_test_fs, y_test)
-
-y_train = df.price
-X_train = df.drop(['price'], axis=1)
-# define the evaluation method
-cv = RepeatedKFold(n_splits=10, n_repeats=3, random_state=1)
-# define the pipeline to evaluate
-model = LinearRegression()
-fs = SelectKBest(score_func=mutual_info_regression)
-pipeline = Pipeline(steps=[('sel', fs), ('lr', model)])
+def holdout(df):
+	# train test split
+	train_data, test_data = train_test_split(df, test_size=0.1)
+	# Drop y_target column
+	y_train = train_data.price
+	X_train = train_data.drop(['team', 'price'], axis=1)
+	# predict on test data
+	y_test = test_data.price
+	X_test = test_data.drop(['team', 'price'], axis=1)
+	# load autosklearn.regressor model, it transforms the raw columns itself
+	if os.path.isfile('auto_regressor.joblib'):
+		model_eval(joblib.load('auto_regressor.joblib'), X_test, y_test)
+	pre = build_preprocessor()
+	X_train, X_test = pre.fit_transform(X_train), pre.transform(X_test)
+	# model train with all features
+	model_train(X_train, y_train, X_test, y_test)
+	# model train with top 20 correlation features
+	X_train_fs, X_test_fs, fs = select_features(X_train, y_train, X_test, f_regression)
+	model_train(X_train_fs, y_train, X_test_fs, y_test)
+	# model train with top 20 mutual_info features
+	X_train_fs, X_test_fs, fs = select_features(X_train, y_train, X_test, mutual_info)
+	model_train(X_train_fs, y_train, X_test_fs, y_test)
 
-# define the grid
-grid = dict()
-grid['sel__k'] = [i for i in range(X_train.shape[1]-20, X_train.shape[1]+1)]
-# define the grid search
-search = GridSearchCV(pipeline, grid, scoring='neg_mean_squared_error', n_jobs=-1, cv=cv)
-# perform the search
-results = search.fit(X_train, y_train)
-# summarize best
-print('Best MAE: %.3f' % results.best_score_)
-print('Best Config: %s' % results.best_params_)
-# summarize all
-means = results.cv_results_['mean_test_score']
-params = results.cv_results_['params']
-for mean, param in zip(means, params):
-    print(">%.3f with: %r" % (mean, param))
+def sweep(df):
+	y_train = df.price
+	X_train = df.drop(['team', 'price'], axis=1)
+	# define the evaluation method
+	cv = RepeatedKFold(n_splits=10, n_repeats=3, random_state=RANDOM_STATE)
+	# the folds are scaled, encoded and scored with mutual information once, then shared by every k and metric
+	with FoldEngine(X_train, y_train, cv, build_preprocessor()) as engine:
+		n_features = engine.n_features
+		engine.feature_scores('mutual_info', mutual_info)
+		# number of features of the grid search, the last 21 and the last 16 counts
+		ks = range(max(1, n_features - 20), n_features + 1)
+		scores = engine.select_k(LinearRegression(), 'mutual_info', ks, ['neg_mean_squared_error', 'neg_mean_absolute_error'])
+	# summarize best
+	means = {k: numpy.mean(s) for k, s in scores['neg_mean_squared_error'].items()}
+	best = max(means, key=means.get)
+	print('Best MSE: %.3f' % means[best])
+	print('Best Config: %s' % {'sel__k': best})
+	# summarize all
+	for k, mean in means.items():
+		print(">%.3f with: %r" % (mean, {'sel__k': k}))
+	# enumerate each number of features
+	num_features = [k for k in ks if k >= n_features - 15]
+	results = list()
+	for k in num_features:
+		results.append(scores['neg_mean_absolute_error'][k])
+		# summarize the results
+		print(f'{k}, {numpy.mean(results[-1])}, {numpy.std(results[-1])}')
+	# plot model performance for comparison
+	pyplot.boxplot(results, labels=num_features, showmeans=True)
+	pyplot.show()
 
-# define number of features to evaluate
-num_features = [i for i in range(X_train.shape[1]-15, X_train.shape[1]+1)]
-# enumerate each number of features
-results = list()
-for k in num_features:
-	# create pipeline
-	model = LinearRegression()
-	fs = SelectKBest(score_func=mutual_info_regression, k=k)
-	pipeline = Pipeline(steps=[('sel', fs), ('lr', model)])
-	# evaluate the model
-	cv = RepeatedKFold(n_splits=10, n_repeats=3, random_state=1)
-	scores = cross_val_score(pipeline, X_train, y_train, scoring='neg_mean_absolute_error', cv=cv, n_jobs=-1)
-	results.append(scores)
-	# summarize the results
-	print(f'{k}, {numpy.mean(scores)}, {numpy.std(scores)}')
-# plot model performance for comparison
-pyplot.boxplot(results, labels=num_features, showmeans=True)
-pyplot.show()
-# what are scores for the features
-# for i in range(len(fs.scores_)):
-# 	print('Feature %d: %f' % (i, fs.scores_[i]))
-# plot the scores
-# pyplot.bar([i for i in range(len(fs.scores_))], fs.scores_)
-# pyplot.show()
\ No newline at end of file
+if __name__ == '__main__':
+	df = preprocess(load_data('../data/data.csv'))
+	# LinearRegression does not accept missing values
+	df.dropna(inplace=True)
+	# shuffle rows
+	df = df.sample(frac=1)
+	holdout(df)
+	sweep(df)
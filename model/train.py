@@ -0,0 +1,188 @@
+'''
+Nightly retrain of the price regressor and the team classifier in one time budget
+
+data.csv is loaded and featurized once, both autosklearn searches then run concurrently in their own process
+with half of the cpus each. Every task checkpoints into the run directory:
+
+    runs/<run id>/
+        data.pkl              featurized and shuffled training frame shared by both searches
+        state.json            status, attempts and timings of every task
+        <task>/attempt-<n>/   autosklearn tmp folder of every attempt (models, smac run history)
+        metrics.json          timings, leaderboard and statistics of every finished task
+
+A crashed or killed run is resumed with --resume, finished tasks are skipped and an interrupted search is warm
+started with the best configurations its earlier attempts evaluated, within what is left of the time budget.
+
+    python train.py --budget 600
+    python train.py --resume runs/20251117-020000
+'''
+import argparse
+import fcntl
+import glob
+import json
+import multiprocessing
+import os
+import time
+from crawlers import trace
+from crawlers.features import preprocess
+from crawlers.utils import load_data
+
+TASKS = {
+    'reg': 'regression',
+    'clf': 'classification',
+}
+# configurations of interrupted attempts that warm start the next one
+WARM_START_CONFIGS = 10
+
+def read_json(path, default=None):
+    if not os.path.isfile(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+def write_json(path, data):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=4, default=str)
+    os.replace(tmp, path)
+
+def update_state(run_dir, task, **values):
+    # the orchestrator and both task processes update their own entry, the file lock serializes them
+    with open(os.path.join(run_dir, 'state.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        state = read_json(os.path.join(run_dir, 'state.json'), {})
+        state.setdefault(task, {}).update(values)
+        write_json(os.path.join(run_dir, 'state.json'), state)
+        return state
+
+def previous_configs(task_dir, limit=WARM_START_CONFIGS):
+    '''
+    Best successful configurations of the smac run histories of earlier attempts, lowest cost first
+    '''
+    scored = {}
+    for path in glob.glob(os.path.join(task_dir, 'attempt-*', 'smac3-output', 'run_*', 'runhistory.json')):
+        history = read_json(path, {})
+        configs = history.get('configs', {})
+        for key, value in history.get('data', []):
+            config_id, cost, status = str(key[0]), value[0], value[2]
+            status = status.get('__enum__', '') if isinstance(status, dict) else str(status)
+            if 'SUCCESS' not in status or config_id not in configs:
+                continue
+            config = json.dumps(configs[config_id], sort_keys=True)
+            scored[config] = min(cost, scored.get(config, float('inf')))
+    return [json.loads(config) for config, _ in sorted(scored.items(), key=lambda item: item[1])[:limit]]
+
+def warm_start_callback(configs):
+    '''
+    get_smac_object_callback that evaluates `configs` before the meta learning suggestions
+    '''
+    def get_smac_object(**smac_args):
+        from ConfigSpace import Configuration
+        from autosklearn.smbo import get_smac_object as default_smac_object
+        space = smac_args['scenario_dict']['cs']
+        warm = []
+        for values in configs:
+            try:
+                warm.append(Configuration(space, values=values))
+            except Exception as e:
+                # the search space changed since the interrupted attempt
+                print(f'Skipping warm start configuration: {e}')
+        smac_args['metalearning_configurations'] = warm + list(smac_args.get('metalearning_configurations') or [])
+        return default_smac_object(**smac_args)
+    return get_smac_object
+
+def run_task(run_dir, task, deadline, n_jobs, margin, seed):
+    import pandas as pd
+    module = __import__(TASKS[task])
+    df = pd.read_pickle(os.path.join(run_dir, 'data.pkl'))
+    task_dir = os.path.join(run_dir, task)
+    os.makedirs(task_dir, exist_ok=True)
+    attempt = len(glob.glob(os.path.join(task_dir, 'attempt-*'))) + 1
+    warm = previous_configs(task_dir)
+    # the export and distillation of the fitted model have to fit in the budget as well
+    time_left = int(deadline - time.time() - margin)
+    if time_left < 30:
+        update_state(run_dir, task, status='failed', error=f'only {time_left}s of the budget left')
+        return
+    update_state(run_dir, task, status='running', attempt=attempt, warm_start_configs=len(warm), time_left=time_left, n_jobs=n_jobs)
+    start = time.time()
+    try:
+        with trace.span('train.task', task=task, attempt=attempt, n_jobs=n_jobs):
+            _, automl = module.train(
+                df, time_left_for_this_task=time_left, n_jobs=n_jobs, seed=seed,
+                tmp_folder=os.path.join(task_dir, f'attempt-{attempt}'),
+                get_smac_object_callback=warm_start_callback(warm) if warm else None,
+            )
+    except Exception as e:
+        update_state(run_dir, task, status='failed', error=repr(e), seconds=time.time() - start)
+        raise
+    leaderboard = automl.leaderboard()
+    update_state(run_dir, task, status='done', seconds=time.time() - start, metrics={
+        'leaderboard': leaderboard.reset_index().to_dict('records'),
+        'models': int(leaderboard.shape[0]),
+        'sprint_statistics': automl.sprint_statistics(),
+    })
+
+@trace.traced('train.featurize')
+def featurize(run_dir, data_file, seed):
+    start = time.time()
+    df = preprocess(load_data(data_file))
+    # shuffle rows, both models are trained on the same order
+    df = df.sample(frac=1, random_state=seed)
+    df.to_pickle(os.path.join(run_dir, 'data.pkl'))
+    return time.time() - start
+
+def orchestrate(run_dir, data_file='../data/data.csv', budget=600, cpus=None, margin=60, seed=1, tasks=tuple(TASKS)):
+    os.makedirs(run_dir, exist_ok=True)
+    state = read_json(os.path.join(run_dir, 'state.json'), {})
+    meta = state.get('run', {})
+    # a resumed run only gets what is left of the budget, the heartbeat below records the time spent so far
+    spent = meta.get('seconds', 0)
+    start = time.time()
+    update_state(run_dir, 'run', budget=budget, seed=seed, resumes=meta.get('resumes', -1) + 1,
+                 started=meta.get('started', time.strftime('%Y-%m-%dT%H:%M:%S')))
+    if not os.path.isfile(os.path.join(run_dir, 'data.pkl')):
+        update_state(run_dir, 'run', featurize_seconds=featurize(run_dir, data_file, seed))
+
+    pending = [task for task in tasks if state.get(task, {}).get('status') != 'done']
+    cpus = cpus or os.cpu_count() or 1
+    deadline = start + budget - spent
+    print(f'Training {pending} with {cpus} cpus, {int(deadline - time.time())}s left of the {budget}s budget')
+    # autosklearn starts its own worker processes, the searches can not run in daemonic pool workers
+    ctx = multiprocessing.get_context('spawn')
+    procs = []
+    for n, task in enumerate(pending):
+        # cpus are split evenly, the first tasks get the remainder
+        n_jobs = max(1, cpus // len(pending) + (1 if n < cpus % len(pending) else 0))
+        proc = ctx.Process(target=run_task, args=(run_dir, task, deadline, n_jobs, margin, seed), name=task)
+        proc.start()
+        procs.append(proc)
+    while any(proc.is_alive() for proc in procs):
+        for proc in procs:
+            proc.join(timeout=5)
+        update_state(run_dir, 'run', seconds=spent + time.time() - start)
+    for proc in procs:
+        if proc.exitcode != 0:
+            update_state(run_dir, proc.name, status='failed', exitcode=proc.exitcode)
+
+    state = update_state(run_dir, 'run', seconds=spent + time.time() - start)
+    metrics = {task: state.get(task, {}) for task in ('run',) + tuple(tasks)}
+    write_json(os.path.join(run_dir, 'metrics.json'), metrics)
+    for task in tasks:
+        print(f'{task}: {state.get(task, {}).get("status")} in {state.get(task, {}).get("seconds", 0):.0f}s')
+    return all(state.get(task, {}).get('status') == 'done' for task in tasks)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the price regressor and team classifier concurrently')
+    parser.add_argument('--resume', metavar='RUN_DIR', help='resume an interrupted run')
+    parser.add_argument('--runs', default='./runs', help='directory of the run directories')
+    parser.add_argument('--data', default='../data/data.csv')
+    parser.add_argument('--budget', type=int, default=600, help='seconds for the whole run, both searches included')
+    parser.add_argument('--margin', type=int, default=60, help='seconds of the budget kept for export and distillation')
+    parser.add_argument('--cpus', type=int, help='cpus shared by both searches, all by default')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--tasks', nargs='+', choices=list(TASKS), default=list(TASKS))
+    args = parser.parse_args()
+    run_dir = args.resume or os.path.join(args.runs, time.strftime('%Y%m%d-%H%M%S'))
+    ok = orchestrate(run_dir, args.data, args.budget, args.cpus, args.margin, args.seed, tuple(args.tasks))
+    raise SystemExit(0 if ok else 1)
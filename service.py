@@ -0,0 +1,85 @@
+'''
+Async http prediction service next to the Streamlit app, the models are loaded once per process
+
+    uvicorn service:app --port 8000
+
+    POST /predict/url      {"url": "https://www.cricbuzz.com/profiles/1413/virat-kohli", "year": 2026}
+    POST /predict/record   {"record": {...raw data.csv columns or the featurized model columns...}}
+    GET  /metrics          request counts, batch sizes, latency histograms and prediction cache hits / misses
+    GET  /metrics/prometheus   crawl / featurize / predict spans and counters (with IPL_TRACE set), text format
+    GET  /health
+
+Configured through the environment: MODEL_DIR (./model), FETCH_WORKERS (8), MAX_BATCH (32), MAX_WAIT_MS (5),
+CACHE_SIZE (1024) and CACHE_TTL (3600 seconds) of the prediction cache, and CRICBUZZ_PROFILE_URL to serve the
+profiles from another host (e.g. the benchmarks' stub server).
+'''
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from model.crawlers import artifacts, cricbuzz, prediction_cache, predictor, serving, trace
+
+class UrlRequest(BaseModel):
+    url: str
+    year: Optional[int] = None
+
+class RecordRequest(BaseModel):
+    record: dict
+
+def create_service():
+    if os.environ.get('CRICBUZZ_PROFILE_URL'):
+        cricbuzz.PROFILE_URL = os.environ['CRICBUZZ_PROFILE_URL']
+    reg_path, clf_path = artifacts.model_paths(os.environ.get('MODEL_DIR', './model'))
+    with trace.span('predict.load_models'):
+        model = predictor.Predictor(artifacts.load_artifact(reg_path), artifacts.load_artifact(clf_path))
+    return serving.PredictionService(
+        model,
+        workers=int(os.environ.get('FETCH_WORKERS', 8)),
+        max_batch=int(os.environ.get('MAX_BATCH', 32)),
+        max_wait=float(os.environ.get('MAX_WAIT_MS', 5)) / 1000,
+        cache=prediction_cache.PredictionCache(int(os.environ.get('CACHE_SIZE', 1024)), float(os.environ.get('CACHE_TTL', 3600))),
+        model_version='-'.join(artifacts.model_version(path) for path in (reg_path, clf_path)),
+    )
+
+def create_app(service=None):
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.service = service or create_service()
+        await app.state.service.start()
+        yield
+        await app.state.service.stop()
+
+    app = FastAPI(title='IPL Auction Prediction', lifespan=lifespan)
+
+    @app.post('/predict/url')
+    async def predict_url(request: UrlRequest):
+        try:
+            return await app.state.service.predict_url(request.url, request.year or datetime.now().year)
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+    @app.post('/predict/record')
+    async def predict_record(request: RecordRequest):
+        try:
+            return await app.state.service.predict_record(request.record)
+        except (KeyError, TypeError, ValueError) as e:
+            raise HTTPException(status_code=422, detail=f'Invalid player record: {e!r}')
+
+    @app.get('/metrics')
+    async def metrics():
+        return app.state.service.stats()
+
+    @app.get('/metrics/prometheus', response_class=PlainTextResponse)
+    async def prometheus_metrics():
+        return trace.prometheus_text()
+
+    @app.get('/health')
+    async def health():
+        return {'status': 'ok'}
+
+    return app
+
+app = create_app()
@@ -0,0 +1,108 @@
+'''
+Sales parsed from one auction page of every `crawlers.auction.SCHEMAS` era
+
+    python -m pytest tests
+'''
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+from model.crawlers import auction
+from model.crawlers.auction import Sale
+from stub import auction_page
+
+CURRENT_TEAMS = ['chennai-super-kings', 'mumbai-indians', 'punjab-kings', 'delhi-capitals', 'sunrisers-hyderabad',
+                 'lucknow-super-giants', 'royal-challengers-bengaluru', 'gujarat-titans']
+
+def page(tables):
+    '''
+    Auction page of (team heading, rows of cells) tables in the iplt20.com DOM, the last table is the unsold players
+    '''
+    html = ''
+    for team, rows in tables:
+        body = ''.join('<tr>' + ''.join(f'<td>{cell}</td>' for cell in row) + '</tr>' for row in rows)
+        html += f'<h2 class="ih-t-name">{team}</h2><div class="ih-td-tab"><table><tbody>{body}</tbody></table></div>'
+    return f'<html><head><meta charset="utf-8"></head><body><div class="ih-pt-tab-bg">{html}</div></body></html>'.encode()
+
+# the unsold players are never a team's sales, whatever the heading before them
+UNSOLD = ('Chennai Super Kings', [['Unsold  Player', 'Bowler', '2,000,000']])
+
+PAGES = {
+    # serial numbers, usd prices at 58 inr, an old team merged into its franchise and a defunct team
+    2013: page([
+        ('Kings XI Punjab', [['1', 'Glenn  Maxwell', 'All-Rounder', '1,000,000'], ['2', 'Ajit Chandila', 'Bowler', '20,000']]),
+        ('Kochi Tuskers Kerala', [['1', 'Brendon McCullum', 'Batsman', '500,000']]),
+        ('Deccan Chargers', [['1', 'Dale Steyn', 'Bowler', '1,200,000']]),
+        ('Chennai Super Kings', [['1', 'Unsold  Player', 'Bowler', '50,000']]),
+    ]),
+    # inr prices, no serial column
+    2014: page([
+        ('Royal Challengers Bangalore', [['Yuvraj Singh', 'All-Rounder', '140,000,000']]),
+        ('Mumbai Indians', [['Corey Anderson', 'All-Rounder', '45,000,000'], ['Aditya Tare', 'Wicket Keeper', '1,000,000']]),
+        UNSOLD,
+    ]),
+    # a nationality cell between the player and the role, rupee signs
+    2022: page([
+        ('Gujarat Titans', [['1', 'Lockie Ferguson', 'Overseas', ' Bowler\n', '₹100,000,000']]),
+        ('Lucknow Super Giants', [['1', 'Avesh Khan', 'Indian', 'Bowler', '100,000,000'], ['2', 'Jason  Holder', 'Overseas', 'All-Rounder', '₹87,500,000']]),
+        UNSOLD,
+    ]),
+    # no role, capped / uncapped, type and retained cells after the price
+    2025: page([
+        ('Delhi Capitals', [['Mitchell Starc', 'Capped', '₹117,500,000', 'Bowler', '0']]),
+        ('Punjab Kings', [['Shreyas Iyer', 'Capped', '268,000,000', 'Batter', '0'], ['Priyansh Arya', 'Uncapped', '₹3,800,000', 'Batter', '0']]),
+        UNSOLD,
+    ]),
+}
+
+EXPECTED = {
+    2013: [
+        Sale('Glenn Maxwell', 'All-Rounder', 'punjab-kings', 2013, 58000000),
+        Sale('Ajit Chandila', 'Bowler', 'punjab-kings', 2013, 1160000),
+        Sale('Dale Steyn', 'Bowler', 'sunrisers-hyderabad', 2013, 69600000),
+    ],
+    2014: [
+        Sale('Yuvraj Singh', 'All-Rounder', 'royal-challengers-bengaluru', 2014, 140000000),
+        Sale('Corey Anderson', 'All-Rounder', 'mumbai-indians', 2014, 45000000),
+        Sale('Aditya Tare', 'Wicket Keeper', 'mumbai-indians', 2014, 1000000),
+    ],
+    2022: [
+        Sale('Lockie Ferguson', 'Bowler', 'gujarat-titans', 2022, 100000000),
+        Sale('Avesh Khan', 'Bowler', 'lucknow-super-giants', 2022, 100000000),
+        Sale('Jason Holder', 'All-Rounder', 'lucknow-super-giants', 2022, 87500000),
+    ],
+    2025: [
+        Sale('Mitchell Starc', '', 'delhi-capitals', 2025, 117500000),
+        Sale('Shreyas Iyer', '', 'punjab-kings', 2025, 268000000),
+        Sale('Priyansh Arya', '', 'punjab-kings', 2025, 3800000),
+    ],
+}
+
+def test_every_era_has_a_page():
+    assert sorted(PAGES) == auction.SCHEMA_YEARS
+
+@pytest.mark.parametrize('year', sorted(PAGES))
+def test_sales_of_each_era(year):
+    assert list(auction.parse_sales(PAGES[year], year, CURRENT_TEAMS)) == EXPECTED[year]
+
+@pytest.mark.parametrize('year', [2016, 2023, 2026])
+def test_later_years_use_their_era(year):
+    era = max(y for y in auction.SCHEMA_YEARS if y <= year)
+    assert [s._replace(year=era) for s in auction.parse_sales(PAGES[era], year, CURRENT_TEAMS)] == EXPECTED[era]
+
+def test_years_before_the_first_era():
+    with pytest.raises(ValueError):
+        list(auction.parse_sales(PAGES[2013], 2012, CURRENT_TEAMS))
+
+@pytest.mark.parametrize('year', [2013, 2018, 2022, 2025])
+def test_stub_pages(year):
+    # every row of every team table but the unsold players, prices in inr
+    sales = list(auction.parse_sales(auction_page(year), year, CURRENT_TEAMS + ['kolkata-knight-riders', 'rajasthan-royals']))
+    assert sales and all(s.year == year and s.team and s.player.startswith('Player ') for s in sales)
+    assert all(s.price >= 20 * 100000 - 58 for s in sales) and '  ' not in ''.join(s.player for s in sales)
+    if year < 2025:
+        assert {s.role for s in sales} <= {'Batsman', 'Bowler', 'All-Rounder', 'Wicket Keeper'}
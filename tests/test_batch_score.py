@@ -0,0 +1,36 @@
+'''
+Parquet output of `batch_score` keeps one schema when a chunk has no scored rows
+
+    python -m pytest tests
+'''
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# batch_score is a script of model/, it imports `crawlers`
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'model')]
+
+import batch_score
+
+class FakePredictor:
+    def predict_batch(self, X):
+        return np.full(len(X), 1e6), np.array(['Chennai Super Kings'] * len(X))
+
+def test_failed_chunk_then_scored_chunk(tmp_path, monkeypatch):
+    raw = pd.read_csv(os.path.join(ROOT, 'data', 'data.csv')).head(2)
+    chunk = pd.DataFrame({'url': ['a', 'b'], 'year': [2025, 2025]})
+    writer = batch_score.ChunkWriter(str(tmp_path / 'out.parquet'))
+    # every profile of the first chunk fails to fetch, so its prediction columns are all missing
+    monkeypatch.setattr(batch_score, 'resolve_urls', lambda chunk, workers, rate: (raw.iloc[:0], [False, False]))
+    writer.write(batch_score.score_chunk(FakePredictor(), chunk, 1, None))
+    monkeypatch.setattr(batch_score, 'resolve_urls', lambda chunk, workers, rate: (raw, [True, True]))
+    writer.write(batch_score.score_chunk(FakePredictor(), chunk, 1, None))
+    writer.close()
+    df = pq.read_table(str(tmp_path / 'out.parquet')).to_pandas()
+    assert list(df['status']) == ['failed', 'failed', 'ok', 'ok']
+    assert df['predicted_price'].isna().sum() == 2 and list(df['predicted_price'][2:]) == [1e6, 1e6]
+    assert list(df['predicted_team'][2:]) == ['Chennai Super Kings'] * 2
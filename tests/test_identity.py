@@ -0,0 +1,96 @@
+'''
+Fuzzy name resolution of `crawlers.identity` on players of the real auction data that share a last name
+
+    python -m pytest tests
+'''
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from model.crawlers import crawl, identity
+from model.crawlers.identity import IdentityIndex, normalize
+
+# different players, the second name must never resolve to the first one's profile
+COLLIDING = [
+    ('Sam Curran', 'Tom Curran'),
+    ('Kuldeep Yadav', 'Kuldip Yadav'),
+    ('Mandeep Singh', 'Ramandeep Singh'),
+    ('Abhishek Sharma', 'Ashok Sharma'),
+    ('Akash Singh', 'Avinash Singh'),
+    ('Ankit Sharma', 'Ishant Sharma'),
+    ('Arshdeep Singh', 'Mandeep Singh'),
+    ('Fabian Allen', 'Finn Allen'),
+    ('Jayant Yadav', 'Mayank Yadav'),
+    ('Jhye Richardson', 'Kane Richardson'),
+    ('R Ashwin', 'M Ashwin'),
+    ('Mukesh Kumar', 'Ramesh Kumar'),
+]
+# spellings of one player
+SAME = [
+    ('Mohammed Siraj', 'Mohammad Siraj'),
+    ('Ben Stokes', 'Benjamin Stokes'),
+    ('Chris Morris', 'Christopher Morris'),
+    ('Nicholas Pooran', 'Nicolas Pooran'),
+    ('Dushmantha Chameera', 'Dushmanta Chameera'),
+    ('Gurkeerat Singh Mann', 'Gurkirat Singh Mann'),
+    ('R Ashwin', 'Ravichandran Ashwin'),
+]
+
+def index_of(*names):
+    index = IdentityIndex()
+    for i, name in enumerate(names):
+        index.add(name, name, i + 1)
+    return index
+
+@pytest.mark.parametrize('known,name', COLLIDING + [(b, a) for a, b in COLLIDING])
+def test_colliding_names_are_misses(known, name):
+    assert index_of(known).lookup(name) == (None, 'miss')
+    assert not identity.same_player(known, name)
+
+@pytest.mark.parametrize('known,name', SAME + [(b, a) for a, b in SAME])
+def test_spellings_resolve_fuzzy(known, name):
+    assert index_of(known).lookup(name) == ('1', 'fuzzy')
+    assert identity.same_player(known, name)
+
+def test_ambiguous_first_names_are_misses():
+    # m ashwin is a prefix of murugan ashwin and of mohit ashwin
+    assert index_of('Murugan Ashwin', 'Mohit Ashwin').lookup('M Ashwin') == (None, 'miss')
+
+def test_auction_players_never_resolve_to_another_player():
+    # every pair of auction names with the same last name, one known: a fuzzy hit has to be a spelling of one player
+    names = sorted(set(normalize(n) for n in pd.read_csv(os.path.join(ROOT, 'data', 'auction_data.csv'))['player']))
+    by_last_name = {}
+    for name in names:
+        by_last_name.setdefault(name.split()[-1], []).append(name)
+    colliding = {tuple(sorted(normalize(n) for n in pair)) for pair in COLLIDING}
+    for group in by_last_name.values():
+        for known in group:
+            index = index_of(known)
+            for name in group:
+                if name != known and index.lookup(name)[1] == 'fuzzy':
+                    assert tuple(sorted((known, name))) not in colliding
+
+class FakePlayer:
+    def __init__(self, name=None, *args, link=None):
+        self.name, self.id, self.info = PROFILES[link], link.split('/')[-1], {}
+
+PROFILES = {}
+
+def test_fetched_profile_of_another_player_is_not_saved(monkeypatch):
+    # an index whose fuzzy match still lands on another player's profile, e.g. filled by an older version
+    index = index_of('Sam Curran')
+    monkeypatch.setattr(index, '_fuzzy', lambda key: 'sam curran')
+    monkeypatch.setattr(identity, 'index', index)
+    monkeypatch.setattr(crawl, 'Player', FakePlayer)
+    monkeypatch.setattr(crawl, 'PROFILE_URL', 'profiles/{}')
+    monkeypatch.setitem(PROFILES, 'profiles/1', 'Sam Curran')
+    assert crawl.fetch_indexed('Tom Curran') is None
+    assert index.lookup('Tom Curran') == ('1', 'fuzzy')
+    assert 'tom curran' not in index._aliases
+    p = crawl.fetch_indexed('Samuel Curran')
+    assert p.name == 'Sam Curran' and index._aliases['samuel curran'] == 'sam curran'
@@ -0,0 +1,64 @@
+'''
+Records of one micro batch fail independently: a bad record never fails the other requests of its batch
+
+    python -m pytest tests
+'''
+import asyncio
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from model.crawlers import features, serving
+
+def raw_records(n):
+    df = pd.read_csv(os.path.join(ROOT, 'data', 'data.csv'))
+    return df[features.PLAYER_COLUMNS + ['year']].head(n).to_dict('records')
+
+class FakePredictor:
+    def predict_batch(self, df):
+        # fails on a value the record checks let through, like a category the model can not encode
+        if (df['country'] == 'Atlantis').any():
+            raise ValueError('unknown country')
+        return df['age'].fillna(0).to_numpy() * 1000, df['country'].to_numpy()
+
+async def predict_concurrently(records):
+    service = serving.PredictionService(FakePredictor(), max_batch=8, max_wait=0.05)
+    await service.start()
+    try:
+        return await asyncio.gather(*(service.predict_record(r) for r in records), return_exceptions=True), service.stats()
+    finally:
+        await service.stop()
+
+def test_invalid_record_fails_alone():
+    records = raw_records(3)
+    records[1] = {**records[1], 'age': 'abc'}
+    results, stats = asyncio.run(predict_concurrently(records))
+    assert isinstance(results[1], ValueError) and 'age' in str(results[1])
+    assert [r['team'] for r in (results[0], results[2])] == [records[0]['country'], records[2]['country']]
+    assert stats['errors'] == 1
+
+def test_failed_batch_is_retried_per_record():
+    records = raw_records(3)
+    records[0] = {**records[0], 'country': 'Atlantis'}
+    results, stats = asyncio.run(predict_concurrently(records))
+    assert isinstance(results[0], ValueError)
+    assert results[1]['price'] == records[1]['age'] * 1000 and results[2]['price'] == records[2]['age'] * 1000
+    assert stats['batches'] == 1 and stats['errors'] == 1
+
+@pytest.mark.parametrize('col,value,error', [('age', 'abc', ValueError), ('year', [2025], TypeError),
+                                             ('country', {'name': 'India'}, TypeError), ('age', True, TypeError)])
+def test_record_values_are_checked(col, value, error):
+    record = {**raw_records(1)[0], col: value}
+    with pytest.raises(error, match=col):
+        features.featurize_record(record)
+
+def test_record_values_are_coerced():
+    record = {**raw_records(1)[0], 'age': '31', 'year': 2025}
+    row = features.featurize_record(record)
+    assert row['age'] == 31.0 and row['year'] == 2025.0 and isinstance(row['country'], str)
+    assert features.featurize_record({**record, 'age': None})['age'] is None
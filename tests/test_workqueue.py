@@ -0,0 +1,78 @@
+'''
+Lease renewal of `crawlers.workqueue.Heartbeat`: only while the worker makes progress and a bounded number of times,
+and which failed players `run_worker` retries
+
+    python -m pytest tests
+'''
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from model.crawlers.workqueue import Heartbeat, WorkQueue, run_worker
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def leased_queue(tmp_path, names):
+    clock = Clock()
+    queue = WorkQueue(str(tmp_path / 'queue.db'), lease=30, clock=clock)
+    queue.enqueue((name, 2025) for name in names)
+    assert len(queue.claim('w', len(names))) == len(names)
+    return queue, clock
+
+def beat(heartbeat, queue, clock):
+    clock.now += heartbeat.interval
+    return queue.heartbeat(heartbeat.worker, heartbeat._beat())
+
+def test_no_renewal_without_progress(tmp_path):
+    queue, clock = leased_queue(tmp_path, ['a', 'b'])
+    heartbeat = Heartbeat(queue, 'w')
+    heartbeat.hold(['a', 'b'])
+    assert beat(heartbeat, queue, clock) == 2
+    # a hung worker: nothing finished since the last beat
+    assert beat(heartbeat, queue, clock) == 0
+    queue.complete('w', 'a', [], None)
+    heartbeat.release('a')
+    assert beat(heartbeat, queue, clock) == 1
+    clock.now += queue.lease + 1
+    # the lease of the stalled task ran out, the next claim gives it to another worker
+    assert [task.name for task in queue.claim('other', 2)] == ['b']
+    queue.close()
+
+def test_renewals_are_capped_per_task(tmp_path):
+    queue, clock = leased_queue(tmp_path, ['hung', 'x', 'y', 'z'])
+    heartbeat = Heartbeat(queue, 'w', max_renewals=2)
+    heartbeat.hold(['hung'])
+    renewed = []
+    for name in ['x', 'y', 'z']:
+        # other tasks keep finishing, the hung one is renewed max_renewals times only
+        heartbeat.hold([name])
+        renewed.append(heartbeat._beat())
+    assert renewed == [['hung', 'x'], ['hung', 'x', 'y'], ['y', 'z']]
+    queue.close()
+
+class FakePlayer:
+    def __init__(self, id=None, info=None):
+        self.id, self.info, self.bat_stats, self.bowl_stats = id, info, None, None
+
+def test_fetch_failures_are_retried_and_empty_stats_are_not(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.db'), max_attempts=3, retry_delay=0)
+    queue.enqueue([('nobody', 2025), ('no stats', 2025)])
+    fetched = []
+
+    def fetch(name):
+        fetched.append(name)
+        # a failed search leaves the player without an id, a parsed profile without stats tables has its info
+        return FakePlayer() if name == 'nobody' else FakePlayer('1', {'age': '30'})
+
+    summary = run_worker(queue, 'w', workers=1, rate=None, poll=0.01, fetch_player=fetch)
+    assert sorted(queue.dead_letters()) == [('no stats', 1, 'empty stats'), ('nobody', 3, 'profile could not be fetched')]
+    assert fetched.count('nobody') == 3 and fetched.count('no stats') == 1
+    assert summary['retried'] == 2 and summary['dead'] == 2
+    queue.close()